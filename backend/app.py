@@ -15,6 +15,7 @@ from routes.bvc import bvc_bp
 from routes.paypal import paypal_bp
 from routes.settings import settings_bp
 from routes.admin import admin_bp
+from services.orders import OrderEngine, ORDER_ENGINE_EMBEDDED
 
 
 def create_app():
@@ -53,6 +54,15 @@ def create_app():
     def health():
         return {"status": "ok"}
     
+    # Moteur SL/TP/limite embarqué (ORDER_ENGINE_EMBEDDED=1, dev): démarré à la première requête
+    # (après le fork des workers gunicorn); en production il tourne dans order_engine.py
+    order_engine = OrderEngine(app)
+
+    @app.before_request
+    def start_order_engine():
+        if ORDER_ENGINE_EMBEDDED:
+            order_engine.start()
+
     @app.before_request
     def log_request_info():
         if request.path.startswith('/api/'):
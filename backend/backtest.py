@@ -0,0 +1,82 @@
+"""
+Backtest et balayage de paramètres des stratégies de signaux (services/backtest.py).
+
+    python backtest.py AAPL [--strategy sma] [--period 2y] [--interval 1h]
+                            [--param fast=2:30] [--param slow=10:200:5]
+                            [--rank pnl|hit_rate|return_pct|max_drawdown]
+                            [--top 20] [--workers N]
+    python backtest.py --synthetic 500000 --strategy sma   # série synthétique (benchmark)
+
+Les bougies viennent du store local (synchronisé depuis Yahoo si besoin).
+Une valeur de --param est une liste (5,10,20) ou un intervalle début:fin[:pas] inclus.
+"""
+import sys
+import time
+import numpy as np
+from services.backtest import sweep, load_candles, DEFAULT_GRIDS, BACKTEST_WORKERS
+
+
+def parse_values(spec: str) -> list:
+    if ":" in spec:
+        parts = [float(p) for p in spec.split(":")]
+        start, stop, step = parts[0], parts[1], parts[2] if len(parts) > 2 else 1
+        values = np.arange(start, stop + step / 2, step)
+    else:
+        values = [float(v) for v in spec.split(",")]
+    return [int(v) if float(v).is_integer() else float(v) for v in values]
+
+
+def pop_option(args: list, name: str, default=None):
+    if name not in args:
+        return default
+    i = args.index(name)
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
+
+
+def main():
+    args = sys.argv[1:]
+    strategy = pop_option(args, "--strategy", "sma")
+    period = pop_option(args, "--period", "1y")
+    interval = pop_option(args, "--interval", "1h")
+    rank_by = pop_option(args, "--rank", "pnl")
+    top = int(pop_option(args, "--top", "20"))
+    workers = int(pop_option(args, "--workers", str(BACKTEST_WORKERS)))
+    synthetic = pop_option(args, "--synthetic")
+    grid = {}
+    while "--param" in args:
+        name, spec = pop_option(args, "--param").split("=", 1)
+        grid[name] = parse_values(spec)
+
+    if strategy not in DEFAULT_GRIDS or (not args and synthetic is None):
+        print(__doc__)
+        sys.exit(1)
+    grid = {**DEFAULT_GRIDS[strategy], **grid}
+
+    if synthetic is not None:
+        rng = np.random.default_rng(42)
+        label = f"synthétique ({int(synthetic):,} bougies)"
+        candles = {"close": 100 * np.exp(np.cumsum(rng.normal(0, 0.002, int(synthetic))))}
+    else:
+        ticker = args[0].upper()
+        label = f"{ticker} {period} {interval}"
+        candles = load_candles(ticker, period, interval)
+
+    started = time.perf_counter()
+    results = sweep(candles, strategy, grid, workers=workers, rank_by=rank_by)
+    elapsed = time.perf_counter() - started
+
+    print("=" * 90)
+    print(f"BACKTEST {strategy.upper()} - {label}")
+    print(f"{len(results)} configurations, {len(candles['close']):,} bougies, {workers} processus: {elapsed:.2f} s")
+    print("=" * 90)
+    print(f"{'rang':>4}  {'paramètres':32s} {'trades':>7} {'réussite':>9} {'P&L':>12} {'rend.':>8} {'drawdown':>9}")
+    for r in results[:top]:
+        params = " ".join(f"{k}={v}" for k, v in r["params"].items())
+        print(f"{r['rank']:>4}  {params:32s} {r['trades']:>7} {r['hit_rate'] * 100:>8.1f}% "
+              f"{r['pnl']:>12.2f} {r['return_pct']:>7.1f}% {r['max_drawdown_pct']:>8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
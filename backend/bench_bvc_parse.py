@@ -0,0 +1,109 @@
+"""
+Micro-benchmark du parsing des pages instrument BVC.
+
+Compare l'ancien parsing (html.parser complet, regex recompilées à chaque
+appel) à services.bvc.parse_bvc_price sur des pages HTML sauvegardées, et vérifie que le chemin rapide de
+parse_bvc_price rend le même cours que son parsing complet (code 1 sinon).
+
+    python bench_bvc_parse.py                 # fixtures/bvc/*.html + pages générées
+    python bench_bvc_parse.py --save IAM ATW  # sauvegarde des pages réelles dans fixtures/bvc/
+"""
+import glob
+import os
+import re
+import sys
+import timeit
+from bs4 import BeautifulSoup
+from services.bvc import parse_bvc_price, _soup_parse_price, _get_session, BVC_BASE_URL, BVC_TIMEOUT
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "bvc")
+REPEAT = 20
+
+
+def legacy_parse(html):
+    """Parsing d'origine de _fetch_real_bvc_price"""
+    soup = BeautifulSoup(html, "html.parser")
+    price_element = None
+    price_patterns = [
+        {'class': re.compile(r'cours|price|dernier|last.*price', re.I)},
+        {'id': re.compile(r'cours|price|dernier|last.*price', re.I)},
+    ]
+    for pattern in price_patterns:
+        price_element = soup.find('span', pattern) or soup.find('div', pattern)
+        if price_element:
+            break
+    if not price_element:
+        for table in soup.find_all('table'):
+            for row in table.find_all('tr'):
+                cells = row.find_all(['td', 'th'])
+                for i, cell in enumerate(cells[:-1]):
+                    text = cell.get_text(strip=True).lower()
+                    if 'dernier' in text or 'cours' in text or 'last price' in text:
+                        price_element = cells[i + 1]
+                        break
+                if price_element:
+                    break
+            if price_element:
+                break
+    if price_element:
+        price_text = price_element.get_text(strip=True).replace(" ", "").replace(",", ".")
+        price_match = re.search(r'([0-9]+\.?[0-9]*)', price_text)
+        if price_match:
+            return float(price_match.group(1))
+    return None
+
+
+def generated_pages():
+    """Pages de la taille d'une page instrument (~60 Ko de navigation et tableaux)"""
+    nav = "".join(f'<li class="menu-item"><a href="/fr/page-{i}">Rubrique {i}</a></li>' for i in range(400))
+    rows = "".join(f"<tr><td>Séance {i}</td><td>{100 + i},00</td><td>{i * 10}</td></tr>" for i in range(600))
+    body = f"<html><head><title>BVC</title></head><body><ul>{nav}</ul>{{price}}<table>{rows}</table></body></html>"
+    return {
+        "generated_span": body.format(price='<div class="instrument-header"><span class="instrument-price">1 234,50</span></div>'),
+        "generated_table": body.format(price='<table><tr><td>Dernier cours</td><td>98,10</td></tr></table>'),
+    }
+
+
+def save(symbols):
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for symbol in symbols:
+        r = _get_session().get(f"{BVC_BASE_URL}/fr/live-market/instruments/{symbol}", timeout=BVC_TIMEOUT, verify=False)
+        path = os.path.join(FIXTURES_DIR, f"{symbol}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(r.text)
+        print(f"✅ {symbol}: {path} ({len(r.text) // 1024} Ko)")
+
+
+def main():
+    pages = generated_pages()
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages[os.path.basename(path)] = f.read()
+
+    print("=" * 70)
+    print("BENCHMARK PARSING BVC (latence par cotation)")
+    print("=" * 70)
+    mismatches = []
+    for name, html in pages.items():
+        before = min(timeit.repeat(lambda: legacy_parse(html), number=1, repeat=REPEAT))
+        after = min(timeit.repeat(lambda: parse_bvc_price(html), number=1, repeat=REPEAT))
+        fast, full = parse_bvc_price(html), _soup_parse_price(html)
+        print(f"{name:30s} {len(html) // 1024:5d} Ko  avant {before * 1000:8.2f} ms  "
+              f"après {after * 1000:8.2f} ms  x{before / after:6.1f}  "
+              f"prix {legacy_parse(html)} -> {fast}")
+        # le chemin rapide doit rendre le même cours que le parsing complet
+        if fast != full:
+            mismatches.append(f"{name}: rapide {fast} != complet {full}")
+
+    for mismatch in mismatches:
+        print(f"❌ {mismatch}")
+    if mismatches:
+        sys.exit(1)
+    print(f"✅ {len(pages)} pages: chemin rapide identique au parsing complet")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--save":
+        save([s.upper() for s in sys.argv[2:]])
+    else:
+        main()
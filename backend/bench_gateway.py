@@ -0,0 +1,70 @@
+"""
+Test de charge local de la passerelle WebSocket (gateway.py).
+
+Lance la passerelle avec des cotations synthétiques, connecte N abonnés et
+mesure le débit de ticks reçus et la latence de diffusion.
+
+    python bench_gateway.py [nb_clients] [durée_s]
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+from websockets.asyncio.client import connect
+from gateway import MarketGateway
+
+HOST, PORT = "127.0.0.1", 8799
+SYMBOLS = ["AAPL", "TSLA", "BTC-USD", "MSFT", "IAM", "ATW", "BCP", "GAZ"]
+INTERVAL = 0.5
+
+
+def synthetic_fetch(symbols):
+    now = time.time()
+    return [{"symbol": s, "price": round(100 + random.random(), 4), "sent_at": now} for s in symbols]
+
+
+async def subscriber(stats, duration):
+    symbols = random.sample(SYMBOLS, 3)
+    async with connect(f"ws://{HOST}:{PORT}", max_queue=None) as ws:
+        await ws.send(json.dumps({"action": "subscribe", "symbols": symbols}))
+        stats["connected"] += 1
+        deadline = time.time() + duration
+        while time.time() < deadline:
+            try:
+                raw = await asyncio.wait_for(ws.recv(), timeout=deadline - time.time())
+            except asyncio.TimeoutError:
+                break
+            msg = json.loads(raw)
+            stats["ticks"] += 1
+            stats["latency"].append(time.time() - msg["sent_at"])
+
+
+async def main(n_clients, duration):
+    gateway = MarketGateway(synthetic_fetch, INTERVAL)
+    ready = asyncio.Event()
+    server = asyncio.ensure_future(gateway.serve(HOST, PORT, ready))
+    await ready.wait()
+
+    stats = {"connected": 0, "ticks": 0, "latency": []}
+    start = time.time()
+    results = await asyncio.gather(*(subscriber(stats, duration) for _ in range(n_clients)),
+                                   return_exceptions=True)
+    elapsed = time.time() - start
+    server.cancel()
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    latency = sorted(stats["latency"]) or [0.0]
+    print("=" * 60)
+    print("TEST DE CHARGE PASSERELLE WEBSOCKET")
+    print("=" * 60)
+    print(f"Abonnés connectés : {stats['connected']}/{n_clients} ({len(errors)} erreurs)")
+    print(f"Ticks reçus       : {stats['ticks']} en {elapsed:.1f}s ({stats['ticks'] / elapsed:.0f}/s)")
+    print(f"Latence p50       : {latency[len(latency) // 2] * 1000:.1f} ms")
+    print(f"Latence p99       : {latency[int(len(latency) * 0.99)] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    d = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(main(n, d))
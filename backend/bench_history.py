@@ -0,0 +1,61 @@
+"""
+Benchmark de la sérialisation de l'historique (limit=5000).
+
+Compare l'ancienne conversion iterrows() ligne par ligne à la conversion
+vectorisée de services.prices, et la taille JSON points vs colonnes.
+
+    python bench_history.py [nb_bougies]
+"""
+import json
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from services.prices import _frame_rows
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+REPEAT = 20
+
+idx = pd.date_range("2024-01-02 14:30", periods=N, freq="1min", tz="America/New_York")
+close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 0.1, N))
+hist = pd.DataFrame({
+    "Open": close, "High": close + 0.2, "Low": close - 0.2, "Close": close, "Volume": 1000.0,
+}, index=idx)
+
+
+def iterrows_points():
+    points = []
+    for i, row in hist.iterrows():
+        points.append({
+            "time": int(i.to_pydatetime().timestamp()),
+            "open": float(row["Open"]),
+            "high": float(row["High"]),
+            "low": float(row["Low"]),
+            "close": float(row["Close"])
+        })
+    return points
+
+
+def vectorized_points():
+    return [
+        {"time": ts, "open": o, "high": h, "low": l, "close": c}
+        for ts, o, h, l, c, _ in _frame_rows(hist)
+    ]
+
+
+def vectorized_columns():
+    times, opens, highs, lows, closes, _ = zip(*_frame_rows(hist))
+    return {"time": times, "open": opens, "high": highs, "low": lows, "close": closes}
+
+
+print("=" * 60)
+print(f"BENCHMARK SÉRIALISATION HISTORIQUE ({N} bougies)")
+print("=" * 60)
+assert iterrows_points() == vectorized_points()
+
+for name, fn in [("iterrows + dict", iterrows_points),
+                 ("vectorisé + dict", vectorized_points),
+                 ("vectorisé colonnes", vectorized_columns)]:
+    t = min(timeit.repeat(fn, number=1, repeat=REPEAT))
+    size = len(json.dumps(fn()))
+    print(f"{name:20s} {t * 1000:8.2f} ms   JSON {size / 1024:8.1f} KiB")
@@ -0,0 +1,90 @@
+"""
+Benchmark du carnet d'ordres en attente (services.orders.OrderBook).
+
+Compare, sur une marche aléatoire de cotations, le dépilage des tas triés
+par seuil au parcours de tous les ordres à chaque tick, et vérifie que les
+deux déclenchent exactement les mêmes ordres.
+
+    python bench_orders.py                 # 100 000 ordres, 50 symboles, 200 ticks
+    python bench_orders.py 1000000 500 100
+"""
+import sys
+import time
+import numpy as np
+from services.orders import OrderBook, crossed
+
+def synthetic_orders(n, symbols, seed=42):
+    """(id, key, direction, seuil) autour d'un prix de 100, à ±20%"""
+    rng = np.random.default_rng(seed)
+    sym = rng.integers(0, symbols, n)
+    above = rng.random(n) < 0.5
+    trigger = np.where(above, 100 * (1 + rng.uniform(0.001, 0.2, n)), 100 * (1 - rng.uniform(0.001, 0.2, n)))
+    return [(i, ("YAHOO", f"S{s}"), "above" if a else "below", float(t))
+            for i, (s, a, t) in enumerate(zip(sym, above, trigger))]
+
+
+def synthetic_ticks(ticks, symbols, seed=7):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.005, (ticks, symbols)), axis=0))
+
+
+def run_book(orders, prices):
+    book = OrderBook()
+    for order_id, key, direction, trigger in orders:
+        book.add(order_id, key, direction, trigger)
+    keys = [("YAHOO", f"S{s}") for s in range(prices.shape[1])]
+    matched = []
+    start = time.perf_counter()
+    for row in prices:
+        for key, price in zip(keys, row.tolist()):
+            matched.extend(book.match(key, price))
+    return time.perf_counter() - start, matched
+
+
+def run_scan(orders, prices):
+    pending = list(orders)
+    symbol = {("YAHOO", f"S{s}"): s for s in range(prices.shape[1])}
+    matched = []
+    start = time.perf_counter()
+    for row in prices:
+        quotes = row.tolist()
+        still = []
+        for order in pending:
+            if crossed(order[2], order[3], quotes[symbol[order[1]]]):
+                matched.append(order[0])
+            else:
+                still.append(order)
+        pending = still
+    return time.perf_counter() - start, matched
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    symbols = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    ticks = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    orders = synthetic_orders(n, symbols)
+    prices = synthetic_ticks(ticks, symbols)
+
+    start = time.perf_counter()
+    book = OrderBook()
+    for order_id, key, direction, trigger in orders:
+        book.add(order_id, key, direction, trigger)
+    load = time.perf_counter() - start
+
+    heap_time, heap_matched = run_book(orders, prices)
+    scan_time, scan_matched = run_scan(orders, prices)
+    ok = sorted(heap_matched) == sorted(scan_matched)
+
+    print("=" * 70)
+    print(f"CARNET D'ORDRES: {n:,} ordres, {symbols} symboles, {ticks} ticks")
+    print("=" * 70)
+    print(f"Chargement du carnet: {load * 1000:.1f} ms")
+    print(f"Ordres déclenchés: {len(heap_matched):,}")
+    print(f"{'tas par symbole':20s} {heap_time / ticks * 1000:9.3f} ms/tick")
+    print(f"{'parcours complet':20s} {scan_time / ticks * 1000:9.3f} ms/tick  (x{scan_time / heap_time:.0f})")
+    print("✅ Mêmes ordres déclenchés" if ok else "❌ Déclenchements différents")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
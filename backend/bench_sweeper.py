@@ -0,0 +1,110 @@
+"""
+Benchmark de l'évaluation des challenges (services.challenge_engine).
+
+Crée N challenges actifs (référence journalière d'hier, un tiers avec une
+position ouverte) dans une base SQLite temporaire, puis compare sweep_challenges (UPDATE ensemblistes) à
+evaluate_challenge appelé challenge par challenge sur un échantillon, et
+vérifie les statuts contre les règles recalculées en Python.
+
+    python bench_sweeper.py            # 100 000 challenges
+    python bench_sweeper.py 500000
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_sweeper.db")
+os.environ["DATABASE_URL"] = "sqlite:///" + DB_PATH
+os.environ.setdefault("ORDER_ENGINE_EMBEDDED", "0")
+
+import numpy as np
+from app import create_app
+from models import db, User, Plan, UserChallenge, Trade
+from services.challenge_engine import (evaluate_challenge, sweep_challenges,
+                                       DAILY_LOSS_LIMIT, TOTAL_LOSS_LIMIT, PROFIT_TARGET)
+
+SAMPLE = 2000
+
+
+def expected_status(value, day_start, starting):
+    """Règles d'evaluate_challenge sur la valeur du compte (liquidités + fonds bloqués)"""
+    if value <= day_start * (1 - DAILY_LOSS_LIMIT) or value <= starting * (1 - TOTAL_LOSS_LIMIT):
+        return "failed"
+    if value >= starting * (1 + PROFIT_TARGET):
+        return "passed"
+    return "active"
+
+
+def populate(app, n, seed=42):
+    """
+    n challenges de valeur aléatoire; un sur trois a une position ouverte (jusqu'à
+    80% de sa valeur) dont le coût est déduit de l'equity, comme dans open_trade.
+    """
+    rng = np.random.default_rng(seed)
+    starting = 10_000.0
+    value = starting * (1 + rng.normal(0, 0.06, n))
+    day_start = value * (1 + rng.normal(0, 0.03, n))
+    notional = np.where(np.arange(n) % 3 == 0, value * rng.uniform(0, 0.8, n), 0.0)
+    yesterday = date.today() - timedelta(days=1)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(email="bench@tradesense.local", password_hash="-")
+        plan = Plan(name="Bench", price_dh=0, starting_balance=starting)
+        db.session.add_all([user, plan])
+        db.session.commit()
+        # insertion directe (hors journal d'equity): seules les règles sont mesurées
+        db.session.execute(UserChallenge.__table__.insert(), [
+            {"id": i + 1, "user_id": user.id, "plan_id": plan.id, "status": "active", "starting_balance": starting,
+             "equity": float(v - b), "day_start_equity": float(d), "day_start_date": yesterday}
+            for i, (v, d, b) in enumerate(zip(value, day_start, notional))
+        ])
+        db.session.execute(Trade.__table__.insert(), [
+            {"challenge_id": i + 1, "symbol": "AAPL", "market": "YAHOO", "side": "BUY", "qty": 10.0,
+             "entry_price": float(b) / 10, "status": "OPEN"}
+            for i, b in enumerate(notional) if b > 0
+        ])
+        db.session.commit()
+    return [expected_status(v, d, starting) for v, d in zip(value, day_start)]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    app = create_app()
+
+    expected = populate(app, SAMPLE)
+    with app.app_context():
+        ids = [row.id for row in db.session.query(UserChallenge.id).order_by(UserChallenge.id)]
+        start = time.perf_counter()
+        for challenge_id in ids:
+            evaluate_challenge(challenge_id)
+        loop_time = time.perf_counter() - start
+        loop_ok = [ch.status for ch in UserChallenge.query.order_by(UserChallenge.id)] == expected
+
+    expected = populate(app, n)
+    with app.app_context():
+        start = time.perf_counter()
+        result = sweep_challenges()
+        sweep_time = time.perf_counter() - start
+        statuses = [row.status for row in db.session.query(UserChallenge.status).order_by(UserChallenge.id)]
+        sweep_ok = statuses == expected
+        again = sweep_challenges()
+    os.remove(DB_PATH)
+
+    print("=" * 70)
+    print(f"ÉVALUATION DES CHALLENGES: {n:,} challenges actifs")
+    print("=" * 70)
+    print(f"Nouvelles journées: {result['rolled_over']:,}  terminés: {result['decided']:,} "
+          f"(failed {statuses.count('failed'):,}, passed {statuses.count('passed'):,})")
+    print(f"{'evaluate_challenge x N':26s} {loop_time / SAMPLE * n:8.2f} s  (extrapolé de {SAMPLE:,})")
+    print(f"{'sweep_challenges':26s} {sweep_time:8.2f} s  (x{loop_time / SAMPLE * n / sweep_time:.0f})")
+    print(f"Second passage: {again['rolled_over']} nouvelles journées, {again['decided']} terminés")
+    ok = loop_ok and sweep_ok and again == {"rolled_over": 0, "decided": 0}
+    print("✅ Statuts conformes aux règles" if ok else "❌ Statuts incorrects")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Évaluation planifiée de tous les challenges actifs (services/challenge_engine.py).
+
+Bascule journalière de day_start_equity et règles de perte / objectif en
+UPDATE ensemblistes, y compris pour les challenges sans clôture de trade:
+
+    python challenge_sweeper.py            # un passage (cron)
+    python challenge_sweeper.py --every 60 # en boucle (SWEEP_INTERVAL par défaut)
+"""
+import os
+import sys
+import time
+from app import create_app
+from services.challenge_engine import sweep_challenges
+
+SWEEP_INTERVAL = float(os.getenv("SWEEP_INTERVAL", "60"))
+
+
+def main():
+    args = sys.argv[1:]
+    every = None
+    if "--every" in args:
+        i = args.index("--every")
+        every = float(args[i + 1]) if i + 1 < len(args) else SWEEP_INTERVAL
+    app = create_app()
+    while True:
+        started = time.perf_counter()
+        with app.app_context():
+            try:
+                result = sweep_challenges()
+                print(f"[SWEEPER] {result['rolled_over']} nouvelles journées, {result['decided']} challenges "
+                      f"terminés ({(time.perf_counter() - started) * 1000:.0f} ms)", flush=True)
+            except Exception as e:
+                print(f"[SWEEPER] Passage échoué: {e}", flush=True)
+        if every is None:
+            break
+        time.sleep(every)
+
+
+if __name__ == "__main__":
+    main()
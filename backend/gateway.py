@@ -0,0 +1,165 @@
+"""
+Passerelle WebSocket de données de marché (process séparé de Flask/gunicorn).
+
+Protocole (JSON):
+    client -> {"action": "subscribe", "symbols": ["AAPL", "IAM"]}
+    client -> {"action": "unsubscribe", "symbols": ["AAPL"]}
+    serveur -> {"type": "quote", "symbol": "AAPL", "price": 187.2, ...}
+
+Lancement:
+    python gateway.py   # GATEWAY_HOST / GATEWAY_PORT / STREAM_INTERVAL / STREAM_MAX_SYMBOLS
+"""
+import asyncio
+import json
+import os
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+# Taille de la file d'envoi par client; au-delà on jette les ticks les plus anciens
+CLIENT_QUEUE_SIZE = 64
+# Un client qui a perdu autant de ticks d'affilée est déconnecté
+MAX_DROPPED = 1000
+
+
+class Client:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.symbols = set()
+        self.dropped = 0
+
+    def offer(self, message: str) -> bool:
+        """Ajoute sans bloquer la boucle de diffusion; False si le client est trop lent"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            if self.dropped >= MAX_DROPPED:
+                return False
+        else:
+            self.dropped = 0
+        self.queue.put_nowait(message)
+        return True
+
+    async def writer(self):
+        while True:
+            message = await self.queue.get()
+            await self.websocket.send(message)
+
+
+class MarketGateway:
+    """
+    Table d'abonnements symbole -> clients et diffusion des ticks.
+
+    fetch(symbols) -> list[dict] est appelé dans un thread une fois par
+    intervalle pour tous les symboles ayant au moins un abonné.
+    """
+
+    def __init__(self, fetch, interval: float, max_symbols: int = 50):
+        self.fetch = fetch
+        self.interval = interval
+        self.max_symbols = max_symbols
+        self.subscriptions = {}   # symbol -> set(Client)
+        self.last = {}            # symbol -> dernier message JSON
+        self.clients = set()
+
+    def subscribe(self, client: Client, symbols):
+        for symbol in symbols:
+            self.subscriptions.setdefault(symbol, set()).add(client)
+            client.symbols.add(symbol)
+            if symbol in self.last:
+                client.offer(self.last[symbol])
+
+    def unsubscribe(self, client: Client, symbols):
+        for symbol in symbols:
+            subs = self.subscriptions.get(symbol)
+            if subs is not None:
+                subs.discard(client)
+                if not subs:
+                    del self.subscriptions[symbol]
+                    self.last.pop(symbol, None)
+            client.symbols.discard(symbol)
+
+    def broadcast(self, event: dict):
+        symbol = event["symbol"]
+        subs = self.subscriptions.get(symbol)
+        if not subs:
+            return
+        message = json.dumps({"type": "quote", **event})
+        self.last[symbol] = message
+        for client in list(subs):
+            if not client.offer(message):
+                print(f"[GATEWAY] Client trop lent, déconnexion ({len(client.symbols)} symboles)")
+                self.unsubscribe(client, list(client.symbols))
+                asyncio.ensure_future(client.websocket.close(code=1013, reason="too slow"))
+
+    async def poll(self):
+        while True:
+            symbols = list(self.subscriptions.keys())
+            if symbols:
+                try:
+                    events = await asyncio.to_thread(self.fetch, symbols)
+                    for event in events:
+                        self.broadcast(event)
+                except Exception as e:
+                    print(f"[GATEWAY] Erreur fetch: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def handler(self, websocket):
+        client = Client(websocket)
+        self.clients.add(client)
+        writer = asyncio.ensure_future(client.writer())
+        try:
+            async for raw in websocket:
+                try:
+                    msg = json.loads(raw)
+                    symbols = msg.get("symbols", [])
+                except (ValueError, AttributeError):
+                    await websocket.send(json.dumps({"type": "error", "error": "invalid message"}))
+                    continue
+                # une chaîne serait itérée lettre par lettre: seule une liste est acceptée
+                if not isinstance(symbols, list):
+                    await websocket.send(json.dumps({"type": "error", "error": "symbols must be a list"}))
+                    continue
+                if len(symbols) > self.max_symbols:
+                    await websocket.send(json.dumps({
+                        "type": "error", "error": f"at most {self.max_symbols} symbols per message"}))
+                    continue
+                symbols = [str(s).strip().upper() for s in symbols if str(s).strip()]
+                if msg.get("action") == "subscribe":
+                    if len(client.symbols | set(symbols)) > self.max_symbols:
+                        await websocket.send(json.dumps({
+                            "type": "error", "error": f"at most {self.max_symbols} symbols per connection"}))
+                        continue
+                    self.subscribe(client, symbols)
+                elif msg.get("action") == "unsubscribe":
+                    self.unsubscribe(client, symbols)
+                else:
+                    await websocket.send(json.dumps({"type": "error", "error": "unknown action"}))
+        except ConnectionClosed:
+            pass
+        finally:
+            writer.cancel()
+            self.unsubscribe(client, list(client.symbols))
+            self.clients.discard(client)
+
+    async def serve(self, host: str, port: int, ready=None):
+        poller = asyncio.ensure_future(self.poll())
+        try:
+            async with serve(self.handler, host, port, max_queue=16, ping_interval=20):
+                if ready is not None:
+                    ready.set()
+                await asyncio.Future()
+        finally:
+            poller.cancel()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from services.stream import fetch_quotes, STREAM_INTERVAL, STREAM_MAX_SYMBOLS
+
+    host = os.environ.get("GATEWAY_HOST", "0.0.0.0")
+    port = int(os.environ.get("GATEWAY_PORT", 8765))
+    gateway = MarketGateway(fetch_quotes, STREAM_INTERVAL, STREAM_MAX_SYMBOLS)
+    print(f">>> Market gateway starting on ws://{host}:{port}", flush=True)
+    asyncio.run(gateway.serve(host, port))
@@ -0,0 +1,31 @@
+import hashlib
+from flask import request, jsonify
+
+
+def conditional_json(payload, version=None, max_age=0):
+    """
+    Réponse JSON avec ETag fort, support If-None-Match (304)
+    et Cache-Control public pour qu'un CDN ou reverse proxy absorbe le polling.
+
+    Args:
+        payload: Données JSON-sérialisables
+        version: Version des données (ex: dernière bougie); si absente, l'ETag
+            est calculé sur le corps de la réponse
+        max_age: Durée de fraîcheur en secondes (Cache-Control max-age)
+    """
+    resp = None
+    if version is not None:
+        etag = hashlib.sha1(repr(version).encode()).hexdigest()
+        # version connue du client: 304 sans sérialiser le corps
+        if request.if_none_match.contains(etag):
+            resp = jsonify(None)
+            resp.set_data(b"")
+    if resp is None:
+        resp = jsonify(payload)
+        if version is None:
+            etag = hashlib.sha1(resp.get_data()).hexdigest()
+
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = int(max_age)
+    return resp.make_conditional(request)
@@ -0,0 +1,43 @@
+"""
+Journal d'equity (services/ledger.py): snapshots, reconstruction et réconciliation.
+
+    python ledger.py snapshot [--every 60]     # snapshots (en boucle toutes les N s avec --every)
+    python ledger.py equity 12 [2026-01-31T18:00]
+    python ledger.py reconcile                 # equity en base vs journal, tous les challenges
+"""
+import sys
+import time
+from datetime import datetime
+from app import create_app
+from services import ledger
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ("snapshot", "equity", "reconcile"):
+        print(__doc__)
+        sys.exit(1)
+    app = create_app()
+    with app.app_context():
+        if args[0] == "snapshot":
+            every = float(args[args.index("--every") + 1]) if "--every" in args else None
+            while True:
+                started = time.perf_counter()
+                count = ledger.take_snapshots()
+                print(f"[LEDGER] {count} snapshots ({(time.perf_counter() - started) * 1000:.0f} ms)", flush=True)
+                if every is None:
+                    break
+                time.sleep(every)
+        elif args[0] == "equity":
+            at = datetime.fromisoformat(args[2]) if len(args) > 2 else None
+            print(ledger.equity_at(int(args[1]), at))
+        else:
+            mismatches = ledger.reconcile()
+            for m in mismatches:
+                print(f"❌ Challenge {m['challenge_id']}: equity {m['equity']}, journal {m['ledger_equity']}")
+            print("✅ Journal cohérent" if not mismatches else f"{len(mismatches)} challenges incohérents")
+            sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
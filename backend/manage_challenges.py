@@ -85,14 +85,18 @@ def delete_challenge(challenge_id):
     """Supprimer un challenge"""
     app = create_app()
     with app.app_context():
-        from models import Trade
+        from models import Trade, RestingOrder, EquityEvent, EquitySnapshot
         
         ch = UserChallenge.query.get(challenge_id)
         if not ch:
             print(f"✗ Challenge {challenge_id} non trouvé")
             return
         
-        # Supprimer les trades associés
+        # Supprimer d'abord les lignes qui référencent les trades ou le challenge:
+        # ordres en attente (trade_id), journal d'equity, puis les trades
+        RestingOrder.query.filter_by(challenge_id=challenge_id).delete()
+        EquitySnapshot.query.filter_by(challenge_id=challenge_id).delete()
+        EquityEvent.query.filter_by(challenge_id=challenge_id).delete()
         Trade.query.filter_by(challenge_id=challenge_id).delete()
         
         db.session.delete(ch)
@@ -0,0 +1,20 @@
+"""Open the equity ledger of existing challenges with their current equity"""
+from datetime import datetime
+from sqlalchemy import insert, literal, select
+from app import create_app, db
+from models import UserChallenge, EquityEvent
+
+def migrate():
+    app = create_app()
+    with app.app_context():
+        # un événement ADJUST par challenge sans journal, en un seul INSERT ... SELECT
+        missing = select(UserChallenge.id, literal("ADJUST"), UserChallenge.equity, literal(datetime.utcnow())) \
+            .where(~UserChallenge.id.in_(select(EquityEvent.challenge_id)))
+        result = db.session.execute(insert(EquityEvent).from_select(
+            ["challenge_id", "kind", "amount", "created_at"], missing))
+        db.session.commit()
+        print(f"✓ Opened the ledger of {result.rowcount} challenges")
+        print("\n✅ Migration completed successfully!")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,31 @@
+"""
+Add the (challenge_id, opened_at, id) index used by the paginated trade history,
+and normalize existing rows for it: uppercase symbols (compared on the raw column)
+and backfill missing opened_at (rows without one are left out of the history)
+"""
+from app import create_app, db
+
+def migrate():
+    app = create_app()
+    with app.app_context():
+        try:
+            db.session.execute(db.text(
+                "CREATE INDEX IF NOT EXISTS ix_trade_challenge_opened ON trade (challenge_id, opened_at, id)"))
+            db.session.commit()
+            print("✓ Added ix_trade_challenge_opened index")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Index already exists or error: {e}")
+
+        for table in ("trade", "resting_order"):
+            result = db.session.execute(db.text(
+                f"UPDATE {table} SET symbol = UPPER(symbol) WHERE symbol <> UPPER(symbol)"))
+            print(f"✓ Uppercased {result.rowcount} {table} symbols")
+        result = db.session.execute(db.text(
+            "UPDATE trade SET opened_at = COALESCE(closed_at, CURRENT_TIMESTAMP) WHERE opened_at IS NULL"))
+        print(f"✓ Backfilled opened_at on {result.rowcount} trades")
+        db.session.commit()
+        print("\n✅ Migration completed successfully!")
+
+if __name__ == '__main__':
+    migrate()
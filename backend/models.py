@@ -50,6 +50,49 @@ class Trade(db.Model):
     opened_at = db.Column(db.DateTime, default=datetime.utcnow)
     closed_at = db.Column(db.DateTime, nullable=True)
 
+    # pagination par clé de GET /api/trades (migrate_trade_index.py pour une base existante)
+    __table_args__ = (db.Index("ix_trade_challenge_opened", "challenge_id", "opened_at", "id"),)
+
+class RestingOrder(db.Model):
+    """Ordre en attente exécuté par le moteur de déclenchement (services/orders.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey("user_challenge.id"), nullable=False, index=True)
+    trade_id = db.Column(db.Integer, db.ForeignKey("trade.id"), nullable=True, index=True)  # SL/TP: trade à clôturer
+    kind = db.Column(db.String(20), nullable=False)    # STOP_LOSS|TAKE_PROFIT|LIMIT
+    symbol = db.Column(db.String(30), nullable=False)
+    market = db.Column(db.String(20), nullable=False)  # YAHOO|BVC
+    side = db.Column(db.String(10), nullable=False)    # LIMIT: sens de l'entrée; SL/TP: sens du trade
+    qty = db.Column(db.Float, nullable=False)
+    trigger_price = db.Column(db.Float, nullable=False)
+
+    status = db.Column(db.String(10), default="PENDING", index=True)  # PENDING|FILLED|CANCELLED|REJECTED
+    fill_price = db.Column(db.Float, nullable=True)
+    result_trade_id = db.Column(db.Integer, nullable=True)  # LIMIT: trade ouvert à l'exécution
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    filled_at = db.Column(db.DateTime, nullable=True)
+
+class EquityEvent(db.Model):
+    """Mouvement d'equity d'un challenge (journal append-only, services/ledger.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey("user_challenge.id"), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # DEPOSIT|TRADE_OPEN|TRADE_CLOSE|UPGRADE|ADJUST|DEBIT|CREDIT
+    amount = db.Column(db.Float, nullable=False)     # variation signée de l'equity
+    trade_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.Index("ix_equity_event_challenge", "challenge_id", "id"),)
+
+class EquitySnapshot(db.Model):
+    """Equity d'un challenge après l'événement event_id (point de départ des relectures du journal)"""
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey("user_challenge.id"), nullable=False)
+    event_id = db.Column(db.Integer, nullable=False)
+    equity = db.Column(db.Float, nullable=False)
+    as_of = db.Column(db.DateTime, nullable=False)  # date du dernier événement inclus
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index("ix_equity_snapshot_challenge", "challenge_id", "event_id"),)
+
 class Setting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(80), unique=True, nullable=False)
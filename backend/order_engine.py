@@ -0,0 +1,16 @@
+"""
+Moteur de déclenchement des ordres en attente (process séparé de Flask/gunicorn).
+
+Exécute les stop loss, take profit et ordres limite dès que la cotation
+franchit leur seuil (services/orders.py). À lancer avec
+ORDER_ENGINE_EMBEDDED=0 côté web pour qu'un seul process fasse le travail:
+
+    python order_engine.py   # ORDER_MATCH_INTERVAL / ORDER_RELOAD_INTERVAL / ORDER_RESCAN_OVERLAP
+"""
+from app import create_app
+from services.orders import OrderEngine, ORDER_MATCH_INTERVAL
+
+if __name__ == "__main__":
+    engine = OrderEngine(create_app())
+    print(f">>> Order engine started (tick {ORDER_MATCH_INTERVAL}s)", flush=True)
+    engine.run()
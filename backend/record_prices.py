@@ -0,0 +1,27 @@
+"""
+Enregistre des bougies 1m Yahoo pour le provider replay (services/providers.py).
+
+    python record_prices.py AAPL TSLA BTC-USD [--period 5d]
+
+Puis lancer le backend hors ligne avec YAHOO_PROVIDER=replay (REPLAY_DIR, REPLAY_SPEED).
+"""
+import sys
+from services.providers import record_history, REPLAY_DIR
+
+args = sys.argv[1:]
+period = "5d"
+if "--period" in args:
+    i = args.index("--period")
+    period = args[i + 1]
+    del args[i:i + 2]
+
+if not args:
+    print(__doc__)
+    sys.exit(1)
+
+for symbol in args:
+    try:
+        path = record_history(symbol.upper(), period=period, directory=REPLAY_DIR)
+        print(f"✅ {symbol.upper()}: {path}")
+    except Exception as e:
+        print(f"❌ {symbol.upper()}: {e}")
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from services.bvc import get_bvc_price, get_bvc_symbols
+from services.bvc import get_bvc_quote, get_bvc_symbols, get_bvc_snapshot
+from services.resilience import CircuitOpenError
 
 bvc_bp = Blueprint("bvc", __name__, url_prefix="/api/prices")
 
@@ -10,8 +11,11 @@ def bvc_price():
     if not symbol:
         return jsonify({"error": "symbol is required"}), 400
     try:
-        price = get_bvc_price(symbol)
-        return jsonify({"symbol": symbol, "price": price, "currency": "MAD"})
+        quote = get_bvc_quote(symbol)
+        return jsonify({"symbol": symbol, "price": quote["price"], "currency": "MAD",
+                        "age": quote["age"], "stale": quote["stale"]})
+    except CircuitOpenError as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -23,3 +27,15 @@ def bvc_symbols():
         return jsonify({"symbols": symbols})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@bvc_bp.get("/bvc/all")
+def bvc_all():
+    """Cotations de tous les symboles BVC depuis le snapshot du marché"""
+    try:
+        snapshot = get_bvc_snapshot()
+        return jsonify({"quotes": snapshot["quotes"], "age": snapshot["age"],
+                        "stale": snapshot["stale"], "currency": "MAD"})
+    except CircuitOpenError as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,5 +1,6 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
 from models import UserChallenge, User
+from http_cache import conditional_json
 
 leader_bp = Blueprint("leaderboard", __name__, url_prefix="/api/leaderboard")
 
@@ -32,4 +33,4 @@ def leaderboard():
         })
 
     data.sort(key=lambda x: x["pct"], reverse=True)
-    return jsonify(data[:10])
+    return conditional_json(data[:10], max_age=30)
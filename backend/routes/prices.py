@@ -1,5 +1,16 @@
-from flask import Blueprint, request, jsonify
-from services.prices import get_yahoo_price, get_yahoo_history
+import json
+import queue
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from services.prices import get_yahoo_quote, get_yahoo_prices, get_yahoo_history, get_yahoo_history_columns
+from services.stream import quote_hub, STREAM_MAX_SYMBOLS
+from services.resilience import CircuitOpenError, get_sources_health
+from services.providers import NoDataError
+from http_cache import conditional_json
+
+# Intervalle des commentaires keep-alive SSE (secondes)
+STREAM_KEEPALIVE = 15
+# Fraîcheur HTTP de l'historique (secondes), alignée sur la synchro du store
+HISTORY_MAX_AGE = 5
 
 prices_bp = Blueprint("prices", __name__, url_prefix="/api/prices")
 
@@ -9,8 +20,23 @@ def yahoo_price():
     if not ticker:
         return jsonify({"error": "ticker is required"}), 400
     try:
-        price = get_yahoo_price(ticker)
-        return jsonify({"ticker": ticker, "price": price})
+        quote = get_yahoo_quote(ticker)
+        return jsonify({"ticker": ticker, "price": quote["price"], "age": quote["age"], "stale": quote["stale"]})
+    except CircuitOpenError as e:
+        return jsonify({"error": str(e)}), 503
+    except NoDataError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@prices_bp.get("/yahoo/batch")
+def yahoo_batch():
+    tickers = [t for t in request.args.get("tickers", "").split(",") if t.strip()]
+    if not tickers:
+        return jsonify({"error": "tickers is required"}), 400
+    try:
+        quotes = get_yahoo_prices(tickers)
+        return jsonify({"quotes": quotes})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -19,13 +45,67 @@ def yahoo_history():
     ticker = request.args.get("ticker", "").strip()
     interval = request.args.get("interval", "1m")  # 1m,5m,15m,1h
     period = request.args.get("period", "1d")      # 1d,5d,1mo
-    limit = int(request.args.get("limit", "300"))  # nb points max
+    fmt = request.args.get("format", "points")     # points|columnar
 
     if not ticker:
         return jsonify({"error": "ticker is required"}), 400
+    try:
+        limit = int(request.args.get("limit", "300"))  # nb points max
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        return jsonify({"error": "limit must be a non-negative integer"}), 400
 
     try:
-        points = get_yahoo_history(ticker, period=period, interval=interval, limit=limit)
-        return jsonify({"ticker": ticker, "points": points})
+        if fmt == "columnar":
+            columns = get_yahoo_history_columns(ticker, period=period, interval=interval, limit=limit)
+            payload = {"ticker": ticker, **columns}
+            times = columns["time"]
+            first = times[0] if times else None
+            last_bar = tuple(columns[k][-1] for k in ("time", "open", "high", "low", "close")) if times else None
+        else:
+            points = get_yahoo_history(ticker, period=period, interval=interval, limit=limit)
+            payload = {"ticker": ticker, "points": points}
+            first = points[0]["time"] if points else None
+            last_bar = tuple(points[-1].values()) if points else None
+        # la version change dès qu'une bougie est ajoutée ou que la dernière bougie évolue;
+        # pas de Last-Modified: l'heure d'ouverture de la bougie en cours ne date pas ses mises à jour
+        version = (ticker, period, interval, limit, fmt, first, last_bar)
+        return conditional_json(payload, version=version, max_age=HISTORY_MAX_AGE)
+    except CircuitOpenError as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@prices_bp.get("/health")
+def sources_health():
+    """Compteurs de santé par source externe (état du circuit, échecs, prix stale servis)"""
+    return jsonify(get_sources_health())
+
+@prices_bp.get("/stream")
+def price_stream():
+    """Flux SSE des cotations: une boucle de fetch partagée pour tous les abonnés"""
+    symbols = list(dict.fromkeys(s.strip().upper() for s in request.args.get("symbols", "").split(",") if s.strip()))
+    if not symbols:
+        return jsonify({"error": "symbols is required"}), 400
+    if len(symbols) > STREAM_MAX_SYMBOLS:
+        return jsonify({"error": f"at most {STREAM_MAX_SYMBOLS} symbols per stream"}), 400
+
+    def events():
+        q = quote_hub.subscribe(symbols)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = q.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            quote_hub.unsubscribe(q, symbols)
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
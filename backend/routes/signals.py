@@ -1,19 +1,55 @@
 from flask import Blueprint, request, jsonify
-from services.signals import sma_crossover_signal
+from services.signals import get_signal, get_signals, STRATEGIES
 
 signals_bp = Blueprint("signals", __name__, url_prefix="/api")
 
+# Nombre max de symboles par requête /signals/batch
+SIGNAL_BATCH_MAX = 100
+
 @signals_bp.get("/signals")
 def signals():
-    ticker = request.args.get("symbol", "").strip()
+    ticker = request.args.get("symbol", "").strip().upper()
     if not ticker:
         return jsonify({"error": "symbol is required"}), 400
 
+    strategy = request.args.get("strategy", "sma").strip().lower()
+    if strategy not in STRATEGIES:
+        return jsonify({"error": f"strategy must be one of: {', '.join(STRATEGIES)}"}), 400
+
     fast = int(request.args.get("fast", "5"))
     slow = int(request.args.get("slow", "20"))
 
     try:
-        out = sma_crossover_signal(ticker, fast=fast, slow=slow)
+        out = get_signal(ticker, strategy=strategy, fast=fast, slow=slow)
         return jsonify(out)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@signals_bp.post("/signals/batch")
+def signals_batch():
+    data = request.get_json(silent=True) or {}
+    symbols = data.get("symbols") or []
+    if not isinstance(symbols, list):
+        return jsonify({"error": "symbols must be a list"}), 400
+    symbols = list(dict.fromkeys(str(s).strip().upper() for s in symbols if str(s).strip()))
+    if not symbols:
+        return jsonify({"error": "symbols is required"}), 400
+    if len(symbols) > SIGNAL_BATCH_MAX:
+        return jsonify({"error": f"at most {SIGNAL_BATCH_MAX} symbols per batch"}), 400
+
+    strategy = str(data.get("strategy", "sma")).strip().lower()
+    if strategy not in STRATEGIES:
+        return jsonify({"error": f"strategy must be one of: {', '.join(STRATEGIES)}"}), 400
+
+    try:
+        fast = int(data.get("fast", 5))
+        slow = int(data.get("slow", 20))
+        results = get_signals(symbols, strategy=strategy, fast=fast, slow=slow)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    signals = {s: r for s, r in results.items() if not isinstance(r, Exception)}
+    errors = {s: str(r) for s, r in results.items() if isinstance(r, Exception)}
+    return jsonify({"strategy": strategy, "signals": signals, "errors": errors})
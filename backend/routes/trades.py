@@ -1,12 +1,97 @@
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
-from models import db, UserChallenge, Plan, Trade
-from services.prices import get_yahoo_price
-from services.challenge_engine import evaluate_challenge
+from datetime import datetime, timedelta
+from models import db, UserChallenge, Plan, Trade, RestingOrder
+from services.challenge_engine import evaluate_challenge, debit_equity, credit_equity, account_value
+from services.resilience import CircuitOpenError
+from services.bvc import BVC_SYMBOLS
+from services.pnl import trade_pnl, exit_value
+from services.positions import market_price, market_quotes, mark_to_market
+from services.orders import ORDER_KINDS, cancel_trade_orders
+from services import ledger
+from services.trade_history import (TRADE_PAGE_SIZE, TRADE_PAGE_MAX, trade_filters, trade_page, iter_trades,
+                                    decode_cursor)
 
 trades_bp = Blueprint("trades", __name__, url_prefix="/api")
 
+MARKETS = ("YAHOO", "BVC")
+# Nombre max d'ordres par panier /trades/batch
+TRADE_BATCH_MAX = 50
+
+def _parse_order(order) -> tuple:
+    """Ordre d'un panier -> ((symbol, side, qty, market), None) ou (None, message d'erreur)"""
+    if not isinstance(order, dict):
+        return None, "order must be an object"
+    market = str(order.get("market") or "YAHOO").upper()
+    symbol = str(order.get("symbol") or "").strip().upper()
+    side = str(order.get("side") or "").upper()
+    try:
+        qty = float(order.get("qty", 0))
+    except (TypeError, ValueError):
+        return None, "qty must be a number"
+    if market not in MARKETS:
+        return None, f"unknown market {market}"
+    if not symbol:
+        return None, "symbol is required"
+    if market == "BVC" and symbol not in BVC_SYMBOLS:
+        return None, f"Symbol {symbol} not supported on BVC"
+    if side not in ("BUY", "SELL"):
+        return None, "side must be BUY or SELL"
+    if qty <= 0:
+        return None, "qty must be > 0"
+    return (symbol, side, qty, market), None
+
+def _parse_trigger(value, name: str) -> tuple:
+    """Seuil optionnel d'un ordre -> (prix ou None, None) ou (None, message d'erreur)"""
+    if value is None:
+        return None, None
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None, f"{name} must be a number"
+    if price <= 0:
+        return None, f"{name} must be > 0"
+    return price, None
+
+def _parse_date(value, end_of_day: bool = False):
+    """Date ou datetime ISO; une date seule en borne de fin couvre toute la journée"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"invalid date {value}")
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def _protective_orders(t: Trade, stop_loss=None, take_profit=None) -> list:
+    """SL/TP en attente attachés au trade t (à ajouter dans la transaction du trade)"""
+    return [
+        RestingOrder(challenge_id=t.challenge_id, trade_id=t.id, kind=kind, symbol=t.symbol, market=t.market,
+                     side=t.side, qty=t.qty, trigger_price=price)
+        for kind, price in (("STOP_LOSS", stop_loss), ("TAKE_PROFIT", take_profit)) if price is not None
+    ]
+
+def _order_json(o: RestingOrder) -> dict:
+    return {
+        "id": o.id,
+        "challenge_id": o.challenge_id,
+        "trade_id": o.trade_id,
+        "kind": o.kind,
+        "symbol": o.symbol,
+        "market": o.market,
+        "side": o.side,
+        "qty": o.qty,
+        "trigger_price": o.trigger_price,
+        "status": o.status,
+        "fill_price": o.fill_price,
+        "result_trade_id": o.result_trade_id,
+        "created_at": o.created_at.isoformat() if o.created_at else None,
+        "filled_at": o.filled_at.isoformat() if o.filled_at else None,
+    }
+
 @trades_bp.post("/checkout/mock")
 @jwt_required()
 def checkout_mock():
@@ -57,15 +142,21 @@ def upgrade_challenge():
     if new_plan.price_dh <= current_plan.price_dh:
         return jsonify({"error": "new plan must be superior to current plan"}), 400
     
-    # Calculer la différence d'equity
-    current_profit = ch.equity - ch.starting_balance
-    
-    # Upgrade du challenge
-    ch.plan_id = new_plan.id
-    ch.starting_balance = new_plan.starting_balance
-    ch.equity = new_plan.starting_balance + current_profit  # Conserver le profit
-    ch.day_start_equity = ch.equity
-    
+    # Upgrade du challenge en un UPDATE atomique: le profit courant (equity - starting_balance
+    # en base) est conservé même si un ordre est exécuté en parallèle
+    new_equity = new_plan.starting_balance + UserChallenge.equity - UserChallenge.starting_balance
+    upgraded = UserChallenge.query.filter_by(id=ch.id, status="active", starting_balance=ch.starting_balance).update({
+        UserChallenge.plan_id: new_plan.id,
+        UserChallenge.starting_balance: new_plan.starting_balance,
+        UserChallenge.equity: new_equity,
+        # référence journalière: valeur du compte (fonds bloqués inclus), comme pour les règles
+        UserChallenge.day_start_equity: new_plan.starting_balance - UserChallenge.starting_balance + account_value(),
+    }, synchronize_session=False)
+    if not upgraded:
+        db.session.rollback()
+        return jsonify({"error": "only active challenges can be upgraded"}), 400
+    # starting_balance vérifié par l'UPDATE: la variation journalisée est exacte
+    ledger.record(ch.id, "UPGRADE", new_plan.starting_balance - ch.starting_balance)
     db.session.commit()
     
     return jsonify({
@@ -82,10 +173,11 @@ def open_trade():
     user_id = int(get_jwt_identity())
     data = request.get_json() or {}
     challenge_id = data.get("challenge_id")
-    symbol = data.get("symbol")
+    # symboles stockés en majuscules: filtre de l'historique sur la colonne brute
+    symbol = str(data.get("symbol") or "").strip().upper()
     side = data.get("side")
     qty = float(data.get("qty", 0))
-    market = data.get("market", "YAHOO")
+    market = (data.get("market") or "YAHOO").upper()
 
     print(f"[DEBUG] Opening trade: user={user_id}, challenge={challenge_id}, symbol={symbol}, side={side}, qty={qty}")
 
@@ -100,26 +192,29 @@ def open_trade():
         print(f"[ERROR] Invalid quantity: {qty}")
         return jsonify({"error": "qty must be > 0"}), 400
 
-    if market == "YAHOO":
-        price = get_yahoo_price(symbol)
-        print(f"[DEBUG] Got price from Yahoo: {price}")
-    else:
-        return jsonify({"error": "BVC not implemented in this skeleton"}), 400
+    if market not in MARKETS:
+        return jsonify({"error": f"unknown market {market}"}), 400
+    if market == "BVC" and symbol not in BVC_SYMBOLS:
+        return jsonify({"error": f"Symbol {symbol} not supported on BVC"}), 400
+
+    # stop loss / take profit optionnels, exécutés côté serveur par le moteur d'ordres
+    stop_loss, sl_error = _parse_trigger(data.get("stop_loss"), "stop_loss")
+    take_profit, tp_error = _parse_trigger(data.get("take_profit"), "take_profit")
+    if sl_error or tp_error:
+        return jsonify({"error": sl_error or tp_error}), 400
+
+    try:
+        price = market_price(market, symbol)
+    except CircuitOpenError as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": f"price unavailable for {symbol}: {e}"}), 502
+    print(f"[DEBUG] Got price from {market}: {price}")
 
     # Calculer le coût total de la position
     total_cost = price * qty
     
-    print(f"[DEBUG] Total cost: {total_cost}, Current equity: {ch.equity}")
-    
-    # Vérifier si le solde est suffisant pour l'achat
-    if side.upper() == "BUY" and total_cost > ch.equity:
-        print(f"[ERROR] Insufficient balance. Required: {total_cost:.2f}, Available: {ch.equity:.2f}")
-        return jsonify({"error": f"Solde insuffisant. Requis: {total_cost:.2f}, Disponible: {ch.equity:.2f}"}), 400
-    
-    # Réduire l'equity pour bloquer les fonds (pour BUY et SELL)
-    ch.equity -= total_cost
-    
-    print(f"[DEBUG] Equity after blocking: {ch.equity}")
+    print(f"[DEBUG] Total cost: {total_cost}")
     
     t = Trade(
         challenge_id=ch.id,
@@ -130,11 +225,94 @@ def open_trade():
         entry_price=price,
         status="OPEN",
     )
+
+    # Bloquer les fonds (pour BUY et SELL) en un UPDATE conditionnel: le solde (pour l'achat)
+    # et le statut sont vérifiés sur l'equity courante en base, pas sur une copie en mémoire
+    if not debit_equity(ch.id, total_cost, require_funds=side.upper() == "BUY", trades=[t]):
+        db.session.rollback()
+        db.session.refresh(ch)
+        if ch.status != "active":
+            return jsonify({"error": f"challenge is {ch.status}"}), 400
+        print(f"[ERROR] Insufficient balance. Required: {total_cost:.2f}, Available: {ch.equity:.2f}")
+        return jsonify({"error": f"Solde insuffisant. Requis: {total_cost:.2f}, Disponible: {ch.equity:.2f}"}), 400
+    
     db.session.add(t)
+    db.session.flush()
+    orders = _protective_orders(t, stop_loss, take_profit)
+    db.session.add_all(orders)
     db.session.commit()
     
-    print(f"[SUCCESS] Trade created: id={t.id}, entry_price={price}")
-    return jsonify({"trade_id": t.id, "entry_price": price, "remaining_equity": ch.equity}), 201
+    print(f"[SUCCESS] Trade created: id={t.id}, entry_price={price}, equity={ch.equity}")
+    return jsonify({"trade_id": t.id, "entry_price": price, "remaining_equity": ch.equity,
+                    "orders": [_order_json(o) for o in orders]}), 201
+
+@trades_bp.post("/trades/batch")
+@jwt_required()
+def open_trades_batch():
+    """
+    Ouvre un panier d'ordres sur un challenge: une cotation groupée, un seul
+    contrôle d'equity et une seule transaction (tout ou rien).
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    orders = data.get("orders")
+    if not isinstance(orders, list) or not orders:
+        return jsonify({"error": "orders must be a non-empty list"}), 400
+    if len(orders) > TRADE_BATCH_MAX:
+        return jsonify({"error": f"at most {TRADE_BATCH_MAX} orders per batch"}), 400
+
+    ch = UserChallenge.query.get(data.get("challenge_id"))
+    if not ch or ch.user_id != user_id:
+        return jsonify({"error": "challenge not found"}), 404
+    if ch.status != "active":
+        return jsonify({"error": f"challenge is {ch.status}"}), 400
+
+    parsed = [_parse_order(order) for order in orders]
+    errors = {i: error for i, (_, error) in enumerate(parsed) if error}
+    if errors:
+        return jsonify({"error": "invalid orders", "orders": errors}), 400
+    legs = [leg for leg, _ in parsed]
+
+    try:
+        quotes = market_quotes(((market, symbol) for symbol, _, _, market in legs), fresh=True)
+    except Exception as e:
+        return jsonify({"error": f"prices unavailable: {e}"}), 502
+    prices = [quotes[(market, symbol)].get("price") for symbol, _, _, market in legs]
+    errors = {i: quotes[(leg[3], leg[0])].get("error", "No price data")
+              for i, (leg, price) in enumerate(zip(legs, prices)) if price is None}
+    if errors:
+        return jsonify({"error": "price unavailable", "orders": errors}), 502
+
+    # fonds bloqués pour toutes les jambes en un seul UPDATE; solde exigé si le panier contient un achat
+    total_cost = sum(price * qty for (_, _, qty, _), price in zip(legs, prices))
+    has_buy = any(side == "BUY" for _, side, _, _ in legs)
+    trades = [
+        Trade(challenge_id=ch.id, symbol=symbol, market=market, side=side, qty=qty, entry_price=price, status="OPEN")
+        for (symbol, side, qty, market), price in zip(legs, prices)
+    ]
+    if not debit_equity(ch.id, total_cost, require_funds=has_buy, trades=trades):
+        db.session.rollback()
+        db.session.refresh(ch)
+        if ch.status != "active":
+            return jsonify({"error": f"challenge is {ch.status}"}), 400
+        return jsonify({"error": f"Solde insuffisant. Requis: {total_cost:.2f}, Disponible: {ch.equity:.2f}"}), 400
+
+    db.session.add_all(trades)
+    db.session.flush()
+    # réponse construite avant le commit (qui expire les objets): pas de relecture par trade
+    created = [
+        {"trade_id": t.id, "symbol": t.symbol, "market": t.market, "side": t.side,
+         "qty": t.qty, "entry_price": t.entry_price}
+        for t in trades
+    ]
+    db.session.commit()
+
+    print(f"[SUCCESS] Batch of {len(trades)} trades created on challenge {ch.id}, cost={total_cost:.2f}")
+    return jsonify({
+        "trades": created,
+        "total_cost": total_cost,
+        "remaining_equity": ch.equity,
+    }), 201
 
 @trades_bp.post("/trades/close")
 @jwt_required()
@@ -153,27 +331,31 @@ def close_trade():
     if t.status != "OPEN":
         return jsonify({"error": "trade already closed"}), 400
 
-    if t.market == "YAHOO":
-        exit_price = get_yahoo_price(t.symbol)
-    else:
-        return jsonify({"error": "BVC not implemented"}), 400
-
-    if t.side == "BUY":
-        pnl = (exit_price - t.entry_price) * t.qty
-        # Pour BUY: on restitue la valeur actuelle des actions
-        exit_value = exit_price * t.qty
-    else:  # SELL (short)
-        pnl = (t.entry_price - exit_price) * t.qty
-        # Pour SELL: on a bloqué la marge d'entrée, on restitue marge + P&L
-        exit_value = (t.entry_price * t.qty) + pnl
+    try:
+        exit_price = market_price(t.market, t.symbol)
+    except CircuitOpenError as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": f"price unavailable for {t.symbol}: {e}"}), 502
+
+    # BUY: on restitue la valeur actuelle des actions; SELL: marge d'entrée bloquée + P&L
+    pnl = trade_pnl(t.side, t.entry_price, exit_price, t.qty)
+    released = exit_value(t.side, t.entry_price, exit_price, t.qty)
     
-    t.exit_price = exit_price
-    t.pnl = pnl
-    t.status = "CLOSED"
-    t.closed_at = datetime.utcnow()
+    # Clôture conditionnelle: une seule des requêtes concurrentes sur ce trade restitue les fonds
+    closed = Trade.query.filter_by(id=t.id, status="OPEN").update({
+        Trade.exit_price: exit_price,
+        Trade.pnl: pnl,
+        Trade.status: "CLOSED",
+        Trade.closed_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    if not closed:
+        db.session.rollback()
+        return jsonify({"error": "trade already closed"}), 400
 
-    # Restituer les fonds bloqués + le P&L
-    ch.equity = float(ch.equity) + exit_value
+    # Restituer les fonds bloqués + le P&L; les SL/TP du trade n'ont plus d'objet
+    credit_equity(ch.id, released, trade=t)
+    cancel_trade_orders(t.id)
     db.session.commit()
 
     # vérifie les règles après MAJ equity
@@ -187,6 +369,142 @@ def close_trade():
         "challenge_status": ch.status
     })
 
+@trades_bp.post("/orders")
+@jwt_required()
+def create_order():
+    """
+    Ordre en attente exécuté côté serveur quand le prix franchit trigger_price:
+    STOP_LOSS / TAKE_PROFIT sur un trade ouvert (trade_id), ou LIMIT d'entrée
+    (symbol, side, qty, market) au prix trigger_price ou mieux.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    kind = str(data.get("kind") or "").upper()
+    if kind not in ORDER_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(ORDER_KINDS)}"}), 400
+    trigger, error = _parse_trigger(data.get("trigger_price"), "trigger_price")
+    if trigger is None:
+        return jsonify({"error": error or "trigger_price is required"}), 400
+
+    if kind == "LIMIT":
+        ch = UserChallenge.query.get(data.get("challenge_id"))
+        if not ch or ch.user_id != user_id:
+            return jsonify({"error": "challenge not found"}), 404
+        if ch.status != "active":
+            return jsonify({"error": f"challenge is {ch.status}"}), 400
+        leg, error = _parse_order(data)
+        if error:
+            return jsonify({"error": error}), 400
+        symbol, side, qty, market = leg
+        order = RestingOrder(challenge_id=ch.id, kind=kind, symbol=symbol, market=market,
+                             side=side, qty=qty, trigger_price=trigger)
+    else:
+        t = Trade.query.get(data.get("trade_id"))
+        if not t:
+            return jsonify({"error": "trade not found"}), 404
+        ch = UserChallenge.query.get(t.challenge_id)
+        if ch.user_id != user_id:
+            return jsonify({"error": "forbidden"}), 403
+        if t.status != "OPEN":
+            return jsonify({"error": "trade already closed"}), 400
+        # un seul SL et un seul TP en attente par trade: le nouveau remplace l'ancien
+        RestingOrder.query.filter_by(trade_id=t.id, kind=kind, status="PENDING").update(
+            {RestingOrder.status: "CANCELLED"}, synchronize_session=False)
+        order = _protective_orders(t, **{kind.lower(): trigger})[0]
+
+    db.session.add(order)
+    db.session.commit()
+    return jsonify(_order_json(order)), 201
+
+@trades_bp.get("/orders")
+@jwt_required()
+def get_orders():
+    """Ordres d'un challenge (status=PENDING|FILLED|CANCELLED|REJECTED pour filtrer)"""
+    user_id = int(get_jwt_identity())
+    challenge_id = request.args.get("challenge_id", type=int)
+    if not challenge_id:
+        return jsonify({"error": "challenge_id is required"}), 400
+    ch = UserChallenge.query.get(challenge_id)
+    if not ch or ch.user_id != user_id:
+        return jsonify({"error": "challenge not found"}), 404
+
+    query = RestingOrder.query.filter_by(challenge_id=ch.id)
+    status = request.args.get("status")
+    if status:
+        query = query.filter_by(status=status.upper())
+    return jsonify([_order_json(o) for o in query.order_by(RestingOrder.id.desc()).all()])
+
+@trades_bp.post("/orders/cancel")
+@jwt_required()
+def cancel_order():
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    order = RestingOrder.query.get(data.get("order_id"))
+    if not order:
+        return jsonify({"error": "order not found"}), 404
+    ch = UserChallenge.query.get(order.challenge_id)
+    if ch.user_id != user_id:
+        return jsonify({"error": "forbidden"}), 403
+
+    # conditionnel: un ordre exécuté entre-temps par le moteur n'est pas annulé
+    cancelled = RestingOrder.query.filter_by(id=order.id, status="PENDING").update(
+        {RestingOrder.status: "CANCELLED"}, synchronize_session=False)
+    if not cancelled:
+        db.session.rollback()
+        db.session.refresh(order)
+        return jsonify({"error": f"order is {order.status}"}), 400
+    db.session.commit()
+    return jsonify({"order_id": order.id, "status": "CANCELLED"})
+
+@trades_bp.get("/positions")
+@jwt_required()
+def get_positions():
+    """Positions ouvertes d'un challenge valorisées au prix courant, avec P&L latent et equity live"""
+    user_id = int(get_jwt_identity())
+    challenge_id = request.args.get("challenge_id", type=int)
+    if not challenge_id:
+        return jsonify({"error": "challenge_id is required"}), 400
+
+    ch = UserChallenge.query.get(challenge_id)
+    if not ch or ch.user_id != user_id:
+        return jsonify({"error": "challenge not found"}), 404
+
+    trades = Trade.query.filter_by(challenge_id=ch.id, status="OPEN").all()
+    try:
+        out = mark_to_market(trades, ch.equity)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"challenge_id": ch.id, "status": ch.status, **out})
+
+@trades_bp.get("/challenges/<int:challenge_id>/equity")
+@jwt_required()
+def get_equity_at(challenge_id):
+    """Equity reconstruite depuis le journal à la date at (ISO, maintenant par défaut)"""
+    user_id = int(get_jwt_identity())
+    ch = UserChallenge.query.get(challenge_id)
+    if not ch or ch.user_id != user_id:
+        return jsonify({"error": "challenge not found"}), 404
+    try:
+        at = _parse_date(request.args.get("at"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"challenge_id": ch.id, "at": at.isoformat() if at else None, **ledger.equity_at(ch.id, at)})
+
+@trades_bp.get("/challenges/<int:challenge_id>/equity/curve")
+@jwt_required()
+def get_equity_curve(challenge_id):
+    """Courbe d'equity (un point par événement du journal) entre from et to"""
+    user_id = int(get_jwt_identity())
+    ch = UserChallenge.query.get(challenge_id)
+    if not ch or ch.user_id != user_id:
+        return jsonify({"error": "challenge not found"}), 404
+    try:
+        start = _parse_date(request.args.get("from"))
+        end = _parse_date(request.args.get("to"), end_of_day=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"challenge_id": ch.id, **ledger.equity_curve(ch.id, start, end)})
+
 @trades_bp.get("/challenges")
 @jwt_required()
 def get_user_challenges():
@@ -217,6 +535,13 @@ def get_user_challenges():
 @trades_bp.get("/trades")
 @jwt_required()
 def get_user_trades():
+    """
+    Historique des trades, du plus récent au plus ancien, paginé par curseur.
+
+    Query params: challenge_id, status (OPEN|CLOSED), symbol, from / to (date ISO,
+    to inclus pour une date seule), limit, cursor (next_cursor de la page précédente),
+    format=ndjson pour un export en flux de tous les trades filtrés.
+    """
     user_id = int(get_jwt_identity())
     challenge_id = request.args.get("challenge_id")
     
@@ -224,26 +549,36 @@ def get_user_trades():
         ch = UserChallenge.query.get(challenge_id)
         if not ch or ch.user_id != user_id:
             return jsonify({"error": "challenge not found"}), 404
-        trades = Trade.query.filter_by(challenge_id=challenge_id).all()
+        challenge_ids = [ch.id]
     else:
-        # Get all trades for all user's challenges
-        challenge_ids = [ch.id for ch in UserChallenge.query.filter_by(user_id=user_id).all()]
-        trades = Trade.query.filter(Trade.challenge_id.in_(challenge_ids)).all() if challenge_ids else []
-    
-    result = []
-    for t in trades:
-        result.append({
-            "id": t.id,
-            "challenge_id": t.challenge_id,
-            "symbol": t.symbol,
-            "market": t.market,
-            "side": t.side,
-            "qty": t.qty,
-            "entry_price": t.entry_price,
-            "exit_price": t.exit_price,
-            "pnl": t.pnl,
-            "status": t.status,
-            "opened_at": t.opened_at.isoformat() if t.opened_at else None,
-            "closed_at": t.closed_at.isoformat() if t.closed_at else None,
+        # Tous les challenges de l'utilisateur
+        challenge_ids = [row.id for row in db.session.query(UserChallenge.id).filter_by(user_id=user_id)]
+
+    try:
+        start = _parse_date(request.args.get("from"))
+        end = _parse_date(request.args.get("to"), end_of_day=True)
+        limit = min(max(int(request.args.get("limit", TRADE_PAGE_SIZE)), 1), TRADE_PAGE_MAX)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    status = request.args.get("status")
+    if status and status.upper() not in ("OPEN", "CLOSED"):
+        return jsonify({"error": "status must be OPEN or CLOSED"}), 400
+    filters = trade_filters(challenge_ids, status, request.args.get("symbol"), start, end)
+    cursor = request.args.get("cursor")
+
+    if request.args.get("format") == "ndjson":
+        try:
+            if cursor:
+                decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        lines = (json.dumps(t) + "\n" for t in iter_trades(filters, cursor))
+        return Response(stream_with_context(lines), mimetype="application/x-ndjson", headers={
+            "Content-Disposition": "attachment; filename=trades.ndjson",
         })
-    return jsonify(result)
+
+    try:
+        trades, next_cursor = trade_page(filters, cursor, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"trades": trades, "next_cursor": next_cursor})
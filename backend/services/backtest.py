@@ -0,0 +1,194 @@
+"""
+Backtest vectorisé des stratégies de signaux et balayage de paramètres.
+
+Les bougies (en cache dans le store local) sont rejouées d'un bloc: chaque
+configuration produit un tableau de positions (+1 long, -1 short, 0 à plat)
+à partir des mêmes règles que services.signals, puis les trades et la
+courbe d'equity sont calculés sans boucle par bougie. Les grilles sont
+réparties sur un pool de processus.
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from services import indicators
+from services.pnl import trade_pnl
+
+# Nombre de processus du pool (0 = un par CPU) et capital engagé par trade
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", "0")) or os.cpu_count() or 1
+BACKTEST_CAPITAL = float(os.getenv("BACKTEST_CAPITAL", "10000"))
+# Configurations envoyées par tâche au pool
+CHUNK_SIZE = 64
+
+DEFAULT_GRIDS = {
+    "sma": {"fast": list(range(2, 31)), "slow": list(range(10, 201, 5))},
+    "ema": {"fast": list(range(2, 31)), "slow": list(range(10, 201, 5))},
+    "rsi": {"n": [7, 9, 14, 21, 28], "lower": [20, 25, 30, 35], "upper": [65, 70, 75, 80]},
+    "macd": {"fast": [6, 8, 10, 12, 16], "slow": [17, 21, 26, 34, 40], "signal": [5, 7, 9, 12]},
+    "bollinger": {"n": [10, 15, 20, 30, 50], "k": [1.5, 2.0, 2.5, 3.0]},
+}
+
+
+def _sma(n):
+    return _memo(("sma", n), lambda: indicators.sma(_candles["close"], n))
+
+
+def _ema(n):
+    return _memo(("ema", n), lambda: indicators.ema(_candles["close"], n))
+
+
+def _directions(strategy: str, p: dict) -> np.ndarray:
+    """+1 BUY, -1 SELL, 0 NEUTRAL (ou indicateur pas encore défini), bougie par bougie"""
+    close = _candles["close"]
+    if strategy in ("sma", "ema"):
+        ma = _sma if strategy == "sma" else _ema
+        fast, slow = ma(p["fast"]), ma(p["slow"])
+        return np.sign(np.nan_to_num(fast - slow))
+    if strategy == "rsi":
+        r = _memo(("rsi", p["n"]), lambda: indicators.rsi(close, p["n"]))
+        return np.where(r < p["lower"], 1, np.where(r > p["upper"], -1, 0))
+    if strategy == "macd":
+        line = _ema(p["fast"]) - _ema(p["slow"])
+        signal = indicators.ema(line, p["signal"])
+        return np.sign(np.nan_to_num(line - signal))
+    if strategy == "bollinger":
+        mid, upper, lower = _memo(("bollinger", p["n"], p["k"]), lambda: indicators.bollinger(close, p["n"], p["k"]))
+        return np.where(close < lower, 1, np.where(close > upper, -1, 0))
+    raise ValueError(f"Unknown strategy {strategy}")
+
+
+def positions(directions: np.ndarray) -> np.ndarray:
+    """Position tenue après chaque bougie: dernier signal BUY/SELL, conservé pendant les NEUTRAL"""
+    n = len(directions)
+    last = np.where(directions != 0, np.arange(n), -1)
+    np.maximum.accumulate(last, out=last)
+    return np.where(last >= 0, directions[np.maximum(last, 0)], 0).astype(np.int8)
+
+
+def simulate(pos: np.ndarray, close: np.ndarray, capital: float = BACKTEST_CAPITAL, moves=None) -> dict:
+    """
+    Trades et equity d'une série de positions exécutées au close de la bougie du signal.
+
+    Chaque trade engage `capital` (qty = capital / prix d'entrée) et son P&L
+    suit la règle de close_trade; la position ouverte en fin de série est
+    clôturée au dernier close. moves: np.diff(close) précalculé.
+    """
+    n = len(close)
+    changed = np.flatnonzero(np.diff(pos, prepend=0) != 0)
+    starts = changed[pos[changed] != 0]
+    after = np.searchsorted(changed, starts, side="right")
+    ends = np.where(after < len(changed), changed[np.minimum(after, len(changed) - 1)], n - 1)
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+
+    entry, exit_ = close[starts], close[ends]
+    qty = capital / entry
+    pnl = trade_pnl(pos[starts].astype(np.float64), entry, exit_, qty)
+
+    # equity marquée au marché à chaque bougie: qty du trade en cours x variation du close
+    # (pos est nul avant le premier trade: l'index 0 par défaut n'y a pas d'effet)
+    run_start = np.zeros(n, dtype=np.int64)
+    run_start[starts] = starts
+    np.maximum.accumulate(run_start, out=run_start)
+    exposure = pos[:-1] * (capital / close[run_start[:-1]])
+    equity = np.empty(n)
+    equity[0] = capital
+    np.cumsum(exposure * (moves if moves is not None else np.diff(close)), out=equity[1:])
+    equity[1:] += capital
+    peak = np.maximum.accumulate(equity)
+    drawdown = peak - equity
+
+    trades = len(pnl)
+    return {
+        "trades": trades,
+        "hit_rate": float((pnl > 0).mean()) if trades else 0.0,
+        "pnl": float(pnl.sum()),
+        "return_pct": float(pnl.sum() / capital * 100),
+        "max_drawdown": float(drawdown.max()),
+        "max_drawdown_pct": float((drawdown / peak).max() * 100),
+    }
+
+
+def run(strategy: str, params: dict) -> dict:
+    """Backtest d'une configuration sur les bougies du process (cf. _load)"""
+    pos = positions(_directions(strategy, params))
+    return {"strategy": strategy, "params": params, **simulate(pos, _candles["close"], _candles["capital"], _candles["moves"])}
+
+
+def expand_grid(strategy: str, grid: dict = None) -> list:
+    """Produit cartésien de la grille, sans les configurations incohérentes (fast >= slow...)"""
+    grid = grid or DEFAULT_GRIDS[strategy]
+    keys = list(grid)
+    configs = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    if strategy in ("sma", "ema", "macd"):
+        configs = [c for c in configs if c["fast"] < c["slow"]]
+    if strategy == "rsi":
+        configs = [c for c in configs if c["lower"] < c["upper"]]
+    return configs
+
+
+def sweep(candles: dict, strategy: str, grid: dict = None, capital: float = BACKTEST_CAPITAL,
+          workers: int = BACKTEST_WORKERS, rank_by: str = "pnl") -> list:
+    """
+    Backtest de toutes les configurations d'une grille, classées par rank_by.
+
+    Args:
+        candles: Bougies en colonnes {time, open, high, low, close}
+        grid: Paramètre -> liste de valeurs (DEFAULT_GRIDS[strategy] par défaut)
+        rank_by: pnl, hit_rate, return_pct ou max_drawdown (croissant pour ce dernier)
+    """
+    if strategy not in DEFAULT_GRIDS:
+        raise ValueError(f"Unknown strategy {strategy} (expected one of {', '.join(DEFAULT_GRIDS)})")
+    configs = expand_grid(strategy, grid)
+    chunks = [configs[i:i + CHUNK_SIZE] for i in range(0, len(configs), CHUNK_SIZE)]
+    close = np.asarray(candles["close"], dtype=np.float64)
+
+    if workers <= 1 or len(chunks) <= 1:
+        _load(close, capital)
+        results = [r for chunk in chunks for r in _run_chunk(strategy, chunk)]
+    else:
+        # bougies transmises une fois par processus; seules les configurations circulent ensuite
+        with ProcessPoolExecutor(max_workers=workers, initializer=_load, initargs=(close, capital)) as pool:
+            results = [r for part in pool.map(_run_chunk, itertools.repeat(strategy), chunks) for r in part]
+
+    reverse = rank_by != "max_drawdown"
+    results.sort(key=lambda r: r[rank_by], reverse=reverse)
+    for rank, result in enumerate(results, 1):
+        result["rank"] = rank
+    return results
+
+
+def load_candles(ticker: str, period: str = "1y", interval: str = "1h") -> dict:
+    """Bougies en colonnes depuis le store local (synchronisé avec Yahoo si besoin)"""
+    from services.prices import get_yahoo_history_columns
+    return get_yahoo_history_columns(ticker, period=period, interval=interval, limit=None)
+
+
+def backtest(ticker: str, strategy: str, params: dict, period: str = "1y", interval: str = "1h",
+             capital: float = BACKTEST_CAPITAL) -> dict:
+    """Backtest d'une seule configuration sur l'historique d'un ticker"""
+    close = np.asarray(load_candles(ticker, period, interval)["close"], dtype=np.float64)
+    _load(close, capital)
+    return run(strategy, params)
+
+
+# Bougies et indicateurs du process courant (worker du pool ou appelant)
+_candles = {}
+_cache = {}
+
+
+def _load(close: np.ndarray, capital: float):
+    _candles.clear()
+    _cache.clear()
+    _candles.update(close=close, capital=capital, moves=np.diff(close))
+
+
+def _memo(key, compute):
+    if key not in _cache:
+        _cache[key] = compute()
+    return _cache[key]
+
+
+def _run_chunk(strategy: str, configs: list) -> list:
+    return [run(strategy, params) for params in configs]
+
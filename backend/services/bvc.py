@@ -1,28 +1,87 @@
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import os
 import re
+import threading
+import time
+import unicodedata
+from html import unescape as html_unescape
+from concurrent.futures import ThreadPoolExecutor, wait
 import urllib3
 import random
 from datetime import datetime
+from services.providers import get_provider
+from services.cache import TTLCache
+from services.resilience import get_breaker, CircuitOpenError
 
 # Désactiver les avertissements SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+BVC_BASE_URL = "https://www.casablanca-bourse.com"
+BVC_TIMEOUT = 10
+# Requêtes instrument simultanées et durée max d'un rafraîchissement complet (secondes)
+BVC_CONCURRENCY = int(os.getenv("BVC_CONCURRENCY", "5"))
+BVC_DEADLINE = float(os.getenv("BVC_DEADLINE", "12"))
+BVC_POOL_SIZE = max(10, BVC_CONCURRENCY)
+BVC_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
+}
+
+# Patterns compilés une seule fois (et non à chaque requête)
+_PRICE_ATTR_RE = re.compile(r'cours|price|dernier|last.*price', re.I)
+_PRICE_ATTRS = [{'class': _PRICE_ATTR_RE}, {'id': _PRICE_ATTR_RE}]
+# Chemin rapide: balises ouvrantes span/div, attribut class/id, texte direct jusqu'à la balise suivante
+_FAST_TAG_RES = {tag: re.compile(rf'<{tag}\b([^>]*)>', re.I) for tag in ('span', 'div')}
+_FAST_ATTR_RES = {attr: re.compile(rf'(?<![\w-]){attr}\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+                  for attr in ('class', 'id')}
+_FAST_TEXT_RE = re.compile(r'([^<]*)<(/?)([a-zA-Z0-9]*)')
+_RAW_BLOCKS = (('<!--', '-->'), ('<script', '</script'), ('<style', '</style'))
+_NUMBER_RE = re.compile(r'([0-9]+\.?[0-9]*)')
+_SIGNED_NUMBER_RE = re.compile(r'[-+]?[0-9]+\.?[0-9]*')
+_NAME_HEADER_RE = re.compile(r'instrument|valeur|libell|ticker|symbole|emetteur|émetteur')
+
+# lxml (C) si installé, sinon le parser pur Python de la stdlib
+try:
+    import lxml  # noqa: F401
+    _HTML_PARSER = "lxml"
+except ImportError:
+    _HTML_PARSER = "html.parser"
+
+# Seuls les éléments utiles à l'extraction sont construits dans l'arbre
+_PRICE_STRAINER = SoupStrainer(["span", "div", "tr"])
+
+_session = None
+_session_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=BVC_CONCURRENCY, thread_name_prefix="bvc")
+
 # Mapping des symboles pour la Bourse de Casablanca
 # Prix récupérés uniquement depuis le site BVC en temps réel
 BVC_SYMBOLS = {
-    "IAM": {"code": "9000"},        # Maroc Telecom
-    "ATW": {"code": "1"},           # Attijariwafa Bank
-    "BCP": {"code": "4"},           # Banque Centrale Populaire
-    "GAZ": {"code": "12300"},       # Afriquia Gaz
-    "CIH": {"code": "11"},          # CIH Bank
-    "CDM": {"code": "18"},          # Crédit du Maroc
-    "LBL": {"code": "1200"},        # Label Vie
-    "MNG": {"code": "17200"},       # Managem
-    "SNI": {"code": "6"},           # SNI
-    "TQM": {"code": "8"},           # Taqa Morocco
+    "IAM": {"code": "9000", "names": ["ITISSALAT AL-MAGHRIB", "MAROC TELECOM"]},
+    "ATW": {"code": "1", "names": ["ATTIJARIWAFA BANK"]},
+    "BCP": {"code": "4", "names": ["BCP", "BANQUE CENTRALE POPULAIRE"]},
+    "GAZ": {"code": "12300", "names": ["AFRIQUIA GAZ"]},
+    "CIH": {"code": "11", "names": ["CIH", "CIH BANK"]},
+    "CDM": {"code": "18", "names": ["CREDIT DU MAROC"]},
+    "LBL": {"code": "1200", "names": ["LABEL VIE"]},
+    "MNG": {"code": "17200", "names": ["MANAGEM"]},
+    "SNI": {"code": "6", "names": ["SNI", "AL MADA"]},
+    "TQM": {"code": "8", "names": ["TAQA MOROCCO"]},
 }
 
+# Snapshot du marché: une seule page pour tous les symboles, rafraîchie au plus toutes les N secondes
+BVC_MARKET_PATH = os.getenv("BVC_MARKET_PATH", "/fr/live-market/marche-actions-listing")
+BVC_SNAPSHOT_TTL = float(os.getenv("BVC_SNAPSHOT_TTL", "30"))
+# Au-delà du TTL, le dernier prix connu reste servi (marqué stale) pendant ce délai
+BVC_MAX_STALE = float(os.getenv("BVC_MAX_STALE", "600"))
+
+_snapshot_cache = TTLCache(ttl=BVC_SNAPSHOT_TTL, maxsize=1, max_stale=BVC_MAX_STALE)
+_instrument_cache = TTLCache(ttl=BVC_SNAPSHOT_TTL, maxsize=len(BVC_SYMBOLS), max_stale=BVC_MAX_STALE)
+# Dernier échec par page instrument: pas de nouvelle tentative avant BVC_SNAPSHOT_TTL
+_instrument_errors = TTLCache(ttl=BVC_SNAPSHOT_TTL, maxsize=len(BVC_SYMBOLS))
+
 def get_bvc_price(symbol: str) -> float:
     """
     Récupère le prix d'une action de la Bourse de Casablanca (BVC).
@@ -37,86 +96,350 @@ def get_bvc_price(symbol: str) -> float:
     Raises:
         ValueError: Si le symbole n'est pas supporté ou si le prix ne peut pas être récupéré
     """
+    return get_bvc_quote(symbol)["price"]
+
+
+def get_bvc_quote(symbol: str) -> dict:
+    """
+    Cotation BVC {"price", "age", "stale"}: snapshot du marché, sinon page instrument.
+
+    Un prix périmé (stale) est servi pendant son rafraîchissement en arrière-plan.
+    """
     symbol = symbol.upper()
     
     if symbol not in BVC_SYMBOLS:
         raise ValueError(f"Symbol {symbol} not supported. Available: {', '.join(BVC_SYMBOLS.keys())}")
     
-    symbol_data = BVC_SYMBOLS[symbol]
-    code = symbol_data["code"]
+    # Prix réel depuis le snapshot du marché, sinon depuis la page de l'instrument
+    try:
+        snapshot = get_bvc_snapshot()
+        quote = snapshot["quotes"].get(symbol)
+    except Exception as e:
+        print(f"[BVC] Snapshot indisponible, page instrument pour {symbol}: {e}")
+        quote = None
+    if quote is not None:
+        return {"price": quote["price"], "age": snapshot["age"], "stale": snapshot["stale"]}
     
-    # Récupérer le prix réel depuis le site BVC (pas de fallback)
-    return _fetch_real_bvc_price(code, symbol)
+    price, age = _instrument_cache.get(symbol, lambda: get_provider("BVC").price(symbol))
+    return {"price": price, "age": round(age, 3), "stale": _is_stale(age)}
+
+
+def get_bvc_instrument_quotes(symbols: list, max_age: float = None) -> dict:
+    """
+    Cotations de plusieurs symboles par leur page instrument, via _instrument_cache.
+
+    Une page n'est re-téléchargée qu'une fois par BVC_SNAPSHOT_TTL, échec compris:
+    un symbole absent du listing ne déclenche pas un scraping à chaque tick.
+    max_age: âge max accepté, sans dernier prix connu (stale) en cas d'échec.
+
+    Returns:
+        symbol -> {"price", "age", "stale"}, ou l'exception du dernier échec
+    """
+    ttl = BVC_SNAPSHOT_TTL if max_age is None else min(BVC_SNAPSHOT_TTL, max_age)
+    results, due = {}, []
+    for symbol in symbols:
+        cached = _instrument_cache.peek(symbol)
+        failed = _instrument_errors.peek(symbol)
+        if cached is not None and cached[1] < ttl:
+            results[symbol] = {"price": cached[0], "age": round(cached[1], 3), "stale": _is_stale(cached[1])}
+        elif failed is not None and failed[1] < BVC_SNAPSHOT_TTL:
+            results[symbol] = _last_known(symbol, failed[0], max_age)
+        else:
+            due.append(symbol)
+
+    if due:
+        for symbol, price in get_provider("BVC").prices(due).items():
+            if isinstance(price, Exception):
+                _instrument_errors.set(symbol, price)
+                results[symbol] = _last_known(symbol, price, max_age)
+            else:
+                _instrument_cache.set(symbol, price)
+                results[symbol] = {"price": price, "age": 0.0, "stale": False}
+    return results
+
+
+def _last_known(symbol: str, error: Exception, max_age: float = None):
+    """Dernier prix connu (stale) d'une page instrument en échec, sinon l'erreur"""
+    cached = _instrument_cache.peek(symbol)
+    if max_age is None and cached is not None and cached[1] < BVC_SNAPSHOT_TTL + BVC_MAX_STALE:
+        return {"price": cached[0], "age": round(cached[1], 3), "stale": _is_stale(cached[1])}
+    return error
+
+
+def get_bvc_snapshot(max_age: float = None) -> dict:
+    """
+    Cotations de tous les symboles BVC depuis une seule page du marché.
+
+    max_age: âge max du snapshot, sans service stale (voir TTLCache.get).
+
+    Returns:
+        {"quotes": {symbol: {"price", "variation", "volume"}}, "age": secondes, "stale": bool}
+    """
+    quotes, age = _snapshot_cache.get("market", lambda: get_provider("BVC").snapshot(list(BVC_SYMBOLS)),
+                                      max_age=max_age)
+    return {"quotes": quotes, "age": round(age, 3), "stale": _is_stale(age)}
+
+
+def _is_stale(age: float) -> bool:
+    stale = age >= BVC_SNAPSHOT_TTL
+    if stale:
+        get_breaker("bvc").record_stale()
+    return stale
+
+
+def _fetch_bvc_market() -> dict:
+    """Télécharge et parse la page listing du marché actions"""
+    url = f"{BVC_BASE_URL}{BVC_MARKET_PATH}"
+    html = get_breaker("bvc").call(_get_page, url, BVC_TIMEOUT)
+    quotes = parse_bvc_market(html)
+    if not quotes:
+        raise ValueError("Aucune cotation trouvée dans la page du marché")
+    print(f"[BVC] Snapshot marché: {len(quotes)} symboles")
+    return quotes
+
+
+def parse_bvc_market(html: str) -> dict:
+    """
+    Parse un tableau listing (instrument, cours, variation, volume) en
+    {symbol: {"price", "variation", "volume"}} pour les symboles de BVC_SYMBOLS.
+
+    Les colonnes sont repérées par les libellés de l'en-tête.
+    """
+    soup = BeautifulSoup(html, _HTML_PARSER, parse_only=SoupStrainer("tr"))
+    quotes = {}
+    columns = None
+    for row in soup.find_all("tr"):
+        cells = [c.get_text(" ", strip=True) for c in row.find_all(["td", "th"])]
+        header = _market_columns(cells)
+        if header is not None:
+            columns = header
+            continue
+        if columns is None or len(cells) <= max(columns.values()):
+            continue
+        symbol = _match_symbol(cells[columns["name"]])
+        if symbol is None or symbol in quotes:
+            continue
+        price = _parse_price_text(cells[columns["price"]])
+        if price is None:
+            continue
+        quotes[symbol] = {
+            "price": price,
+            "variation": _parse_signed(cells[columns["variation"]]) if "variation" in columns else None,
+            "volume": _parse_signed(cells[columns["volume"]]) if "volume" in columns else None,
+        }
+    return quotes
+
+
+def _market_columns(cells: list):
+    """Index des colonnes d'un en-tête de tableau listing, None si ce n'est pas un en-tête"""
+    columns = {}
+    for i, cell in enumerate(cells):
+        label = cell.lower()
+        if "name" not in columns and _NAME_HEADER_RE.search(label):
+            columns["name"] = i
+        elif "price" not in columns and ("cours" in label or "dernier" in label or "last" in label):
+            columns["price"] = i
+        elif "variation" not in columns and "var" in label:
+            columns["variation"] = i
+        elif "volume" not in columns and "volume" in label:
+            columns["volume"] = i
+    if "name" in columns and "price" in columns:
+        return columns
+    return None
+
+
+def _match_symbol(text: str):
+    """Symbole BVC correspondant au libellé (ticker ou nom de l'instrument)"""
+    label = _normalize(text)
+    for symbol, data in BVC_SYMBOLS.items():
+        if label == symbol or label.startswith(symbol + " "):
+            return symbol
+        for name in data["names"]:
+            if label == name or label.startswith(name):
+                return symbol
+    return None
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return " ".join(text.upper().split())
+
+
+def _parse_signed(text: str):
+    text = text.replace(" ", "").replace("\xa0", "").replace(",", ".").replace("%", "")
+    match = _SIGNED_NUMBER_RE.search(text)
+    return float(match.group(0)) if match else None
+
+
+def fetch_bvc_prices(symbols: list, deadline: float = BVC_DEADLINE) -> dict:
+    """
+    Récupère les pages instrument de plusieurs symboles en parallèle.
 
+    Au plus BVC_CONCURRENCY requêtes simultanées; la durée totale est bornée
+    par `deadline`, les symboles non terminés à temps sont en erreur.
 
-def _fetch_real_bvc_price(code: str, symbol: str) -> float:
+    Returns:
+        dict symbol -> prix, ou l'exception pour les symboles en échec (résultats partiels)
+    """
+    started = time.monotonic()
+    timeout = min(BVC_TIMEOUT, deadline)
+    futures = {
+        _executor.submit(_fetch_real_bvc_price, BVC_SYMBOLS[symbol]["code"], symbol, timeout): symbol
+        for symbol in symbols
+    }
+    done, not_done = wait(futures, timeout=deadline)
+
+    results = {}
+    for future in done:
+        symbol = futures[future]
+        try:
+            results[symbol] = future.result()
+        except Exception as e:
+            results[symbol] = e
+    for future in not_done:
+        future.cancel()
+        results[futures[future]] = TimeoutError(f"Deadline {deadline}s dépassée pour {futures[future]}")
+
+    print(f"[BVC] {len(done)}/{len(futures)} pages instrument en {time.monotonic() - started:.2f}s")
+    return results
+
+
+def _fetch_real_bvc_price(code: str, symbol: str, timeout: float = BVC_TIMEOUT) -> float:
     """Récupère le prix réel depuis le site de la BVC (sans fallback)"""
     # URL correcte de la Bourse de Casablanca
-    url = f"https://www.casablanca-bourse.com/fr/live-market/instruments/{symbol}"
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-        'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
-    }
+    url = f"{BVC_BASE_URL}/fr/live-market/instruments/{symbol}"
     
     try:
-        r = requests.get(url, timeout=10, headers=headers, verify=False)
-        
-        if r.status_code != 200:
-            raise ValueError(f"Erreur HTTP {r.status_code} pour {url}")
-        
-        soup = BeautifulSoup(r.text, "html.parser")
-        
-        # Chercher le prix dans différentes structures possibles
-        price_element = None
-        
-        # Méthode 1: Chercher avec des classes/IDs spécifiques
-        price_patterns = [
-            {'class': re.compile(r'cours|price|dernier|last.*price', re.I)},
-            {'id': re.compile(r'cours|price|dernier|last.*price', re.I)},
-        ]
+        html = get_breaker("bvc").call(_get_page, url, timeout)
         
-        for pattern in price_patterns:
-            price_element = soup.find('span', pattern) or soup.find('div', pattern)
-            if price_element:
-                break
-        
-        # Méthode 2: Chercher dans les tableaux
-        if not price_element:
-            tables = soup.find_all('table')
-            for table in tables:
-                rows = table.find_all('tr')
-                for row in rows:
-                    cells = row.find_all(['td', 'th'])
-                    for i, cell in enumerate(cells[:-1]):
-                        text = cell.get_text(strip=True).lower()
-                        if 'dernier' in text or 'cours' in text or 'last price' in text:
-                            price_element = cells[i + 1]
-                            break
-                    if price_element:
-                        break
-                if price_element:
-                    break
-        
-        if price_element:
-            price_text = price_element.get_text(strip=True)
-            price_text = price_text.replace(" ", "").replace(",", ".")
-            price_match = re.search(r'([0-9]+\.?[0-9]*)', price_text)
-            if price_match:
-                price = float(price_match.group(1))
-                if price > 0:
-                    print(f"[BVC] Prix réel récupéré pour {symbol}: {price} MAD")
-                    return price
+        price = parse_bvc_price(html)
+        if price is not None:
+            print(f"[BVC] Prix réel récupéré pour {symbol}: {price} MAD")
+            return price
         
         raise ValueError(f"Prix non trouvé dans la page HTML pour {symbol}")
         
+    except CircuitOpenError:
+        raise
     except Exception as e:
         error_msg = f"Impossible de récupérer le prix réel pour {symbol}: {str(e)}"
         print(f"[BVC] {error_msg}")
         raise ValueError(error_msg)
 
 
+def parse_bvc_price(html: str):
+    """
+    Extrait le dernier cours d'une page instrument BVC.
+
+    Essaie d'abord une extraction ciblée par regex sur le HTML brut, puis
+    le parsing complet (lxml si disponible) avec recherche dans les tableaux.
+
+    Returns:
+        Prix (float > 0) ou None si introuvable
+    """
+    # Méthode rapide: même élément que la méthode 1 si son texte est direct
+    found, price = _fast_parse_price(html)
+    if found:
+        return price
+    return _soup_parse_price(html)
+
+
+def _soup_parse_price(html: str):
+    """Parsing complet de parse_bvc_price (méthode 1 puis tableaux)"""
+    soup = BeautifulSoup(html, _HTML_PARSER, parse_only=_PRICE_STRAINER)
+    
+    # Chercher le prix dans différentes structures possibles
+    price_element = None
+    
+    # Méthode 1: Chercher avec des classes/IDs spécifiques
+    for pattern in _PRICE_ATTRS:
+        price_element = soup.find('span', pattern) or soup.find('div', pattern)
+        if price_element:
+            break
+    
+    # Méthode 2: Chercher dans les tableaux
+    if not price_element:
+        for row in soup.find_all('tr'):
+            cells = row.find_all(['td', 'th'])
+            for i, cell in enumerate(cells[:-1]):
+                text = cell.get_text(strip=True).lower()
+                if 'dernier' in text or 'cours' in text or 'last price' in text:
+                    price_element = cells[i + 1]
+                    break
+            if price_element:
+                break
+    
+    if price_element:
+        return _parse_price_text(price_element.get_text(strip=True))
+    return None
+
+
+def _fast_parse_price(html: str) -> tuple:
+    """
+    Méthode 1 de parse_bvc_price sur le HTML brut, sans construire d'arbre.
+
+    Même priorité que soup.find: span puis div, par classe puis par id, premier
+    élément dans l'ordre du document. Si cet élément contient d'autres balises
+    (texte non direct), abandonne au profit du parsing complet.
+
+    Returns:
+        (trouvé, prix): trouvé est False s'il faut passer au parsing complet
+    """
+    for attr in ('class', 'id'):
+        for tag in ('span', 'div'):
+            for match in _FAST_TAG_RES[tag].finditer(html):
+                attr_match = _FAST_ATTR_RES[attr].search(match.group(1))
+                if not attr_match:
+                    continue
+                value = next(v for v in attr_match.groups() if v is not None)
+                if not _PRICE_ATTR_RE.search(html_unescape(value)) or _in_raw_block(html, match.start()):
+                    continue
+                text = _FAST_TEXT_RE.match(html, match.end())
+                if match.group(1).endswith('/') or text is None or text.group(2) != '/' \
+                        or text.group(3).lower() != tag:
+                    return False, None
+                return True, _parse_price_text(html_unescape(text.group(1)).strip())
+    return False, None
+
+
+def _in_raw_block(html: str, pos: int) -> bool:
+    """pos est dans un commentaire, un script ou un style (invisible pour le parseur HTML)"""
+    for start, end in _RAW_BLOCKS:
+        if html.rfind(start, 0, pos) > html.rfind(end, 0, pos):
+            return True
+    return False
+
+
+def _parse_price_text(text: str):
+    text = text.replace(" ", "").replace("\xa0", "").replace(",", ".")
+    price_match = _NUMBER_RE.search(text)
+    if price_match:
+        price = float(price_match.group(1))
+        if price > 0:
+            return price
+    return None
+
+
+def _get_page(url: str, timeout: float) -> str:
+    r = _get_session().get(url, timeout=timeout, verify=False)
+    if r.status_code != 200:
+        raise requests.HTTPError(f"Erreur HTTP {r.status_code} pour {url}", response=r)
+    return r.text
+
+
+def _get_session() -> requests.Session:
+    """Session HTTP keep-alive partagée (pool de connexions vers le site BVC)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers.update(BVC_HEADERS)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=BVC_POOL_SIZE)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
 def get_bvc_symbols():
     """Retourne la liste des symboles BVC disponibles"""
     return list(BVC_SYMBOLS.keys())
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """Un fetch amont en cours, partagé par tous les appelants de la même clé"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Cache mémoire process-wide avec TTL et éviction LRU bornée.
+
+    Les appels concurrents sur une clé absente/expirée sont coalescés
+    (single-flight): un seul loader tourne, les autres attendent son résultat.
+
+    Avec max_stale, une entrée expirée depuis moins de max_stale secondes est
+    servie immédiatement (stale-while-revalidate) pendant qu'un thread de
+    fond la rafraîchit.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024, max_stale: float = 0):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.max_stale = max_stale
+        self._data = OrderedDict()   # key -> (value, fetched_at)
+        self._flights = {}           # key -> _Flight
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, max_age=None):
+        """
+        Retourne (value, age) pour key, en appelant loader() si nécessaire.
+
+        Args:
+            key: Clé de cache (ex: ticker)
+            loader: Callable sans argument qui récupère la valeur fraîche
+            max_age: Âge max accepté (au plus ttl); jamais de valeur périmée servie,
+                au-delà le chargement est synchrone (toujours single-flight)
+
+        Returns:
+            Tuple (valeur, âge en secondes); âge > ttl si la valeur servie est périmée
+        """
+        ttl = self.ttl if max_age is None else min(self.ttl, max_age)
+        with self._lock:
+            entry = self._data.get(key)
+            now = time.monotonic()
+            if entry is not None and now - entry[1] < ttl:
+                self._data.move_to_end(key)
+                return entry[0], now - entry[1]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+
+            if max_age is None and entry is not None and now - entry[1] < self.ttl + self.max_stale:
+                # valeur périmée servie tout de suite, rafraîchie en arrière-plan
+                if leader:
+                    threading.Thread(target=self._refresh, args=(key, loader, flight), daemon=True).start()
+                return entry[0], now - entry[1]
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, 0.0
+
+        self._load(key, loader, flight)
+        return flight.value, 0.0
+
+    def _load(self, key, loader, flight):
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            self.set(key, flight.value)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def _refresh(self, key, loader, flight):
+        try:
+            self._load(key, loader, flight)
+        except Exception as e:
+            print(f"[CACHE] Rafraîchissement en arrière-plan échoué pour {key}: {e}")
+
+    def peek(self, key):
+        """Retourne (value, age) sans fetch ni contrôle du TTL, ou None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            return entry[0], time.monotonic() - entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,193 @@
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+# Base SQLite locale des bougies OHLCV (indépendante de la base applicative),
+# un fichier par provider: candles.db -> candles.yahoo.db, candles.synthetic.db...
+CANDLE_DB_PATH = os.getenv(
+    "CANDLE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "candles.db"),
+)
+
+# Durée approximative des périodes yfinance, en secondes
+PERIOD_SECONDS = {
+    "1d": 86400,
+    "5d": 5 * 86400,
+    "1mo": 31 * 86400,
+    "3mo": 92 * 86400,
+    "6mo": 183 * 86400,
+    "1y": 366 * 86400,
+    "2y": 2 * 366 * 86400,
+    "5y": 5 * 366 * 86400,
+    "10y": 10 * 366 * 86400,
+    "ytd": 366 * 86400,
+}
+
+
+def period_seconds(period: str):
+    """Durée d'une période yfinance en secondes, None si illimitée (max)"""
+    return PERIOD_SECONDS.get(period)
+
+
+def resample(rows, seconds: int) -> list:
+    """
+    Agrège des bougies (time, open, high, low, close, volume) triées en bougies
+    de `seconds` secondes alignées sur l'epoch UTC.
+
+    open = premier open, high = max, low = min, close = dernier close,
+    volume = somme. La dernière bougie peut être partielle (en cours).
+    """
+    if not rows:
+        return []
+    data = np.asarray(rows, dtype=np.float64)
+    times = data[:, 0].astype(np.int64)
+    buckets = times - times % seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+
+    volume = np.nan_to_num(data[:, 5])
+    out = zip(
+        buckets[starts].tolist(),
+        data[starts, 1].tolist(),
+        np.maximum.reduceat(data[:, 2], starts).tolist(),
+        np.minimum.reduceat(data[:, 3], starts).tolist(),
+        data[ends, 4].tolist(),
+        np.add.reduceat(volume, starts).tolist(),
+    )
+    return list(out)
+
+
+class CandleStore:
+    """
+    Stockage SQLite des bougies par (ticker, interval), avec ajout incrémental.
+
+    Une connexion par thread; les écritures sont des upserts sur
+    (ticker, interval, time) pour que la dernière bougie (en cours) soit
+    remplacée à chaque synchronisation.
+    """
+
+    def __init__(self, path: str = CANDLE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._init_schema()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS candles (
+                ticker TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                time INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL,
+                PRIMARY KEY (ticker, interval, time)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS candle_series (
+                ticker TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                covered_seconds INTEGER,
+                synced_at REAL,
+                PRIMARY KEY (ticker, interval)
+            );
+        """)
+        conn.commit()
+
+    def last_time(self, ticker: str, interval: str, until=None):
+        """Début de la dernière bougie stockée (jusqu'à until inclus si renseigné), None si aucune"""
+        sql = "SELECT MAX(time) FROM candles WHERE ticker = ? AND interval = ?"
+        params = [ticker, interval]
+        if until is not None:
+            sql += " AND time <= ?"
+            params.append(int(until))
+        return self._conn().execute(sql, params).fetchone()[0]
+
+    def covered_seconds(self, ticker: str, interval: str):
+        """Plus longue période déjà téléchargée en entier pour cette série (0 si aucune)"""
+        row = self._conn().execute(
+            "SELECT covered_seconds FROM candle_series WHERE ticker = ? AND interval = ?",
+            (ticker, interval),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def synced_at(self, ticker: str, interval: str):
+        """Timestamp de la dernière synchronisation de la série (None si jamais synchronisée)"""
+        row = self._conn().execute(
+            "SELECT synced_at FROM candle_series WHERE ticker = ? AND interval = ?",
+            (ticker, interval),
+        ).fetchone()
+        return row[0] if row else None
+
+    def append(self, ticker: str, interval: str, rows, covered_seconds=None):
+        """
+        Upsert des bougies (time, open, high, low, close, volume).
+
+        Args:
+            covered_seconds: Si renseigné, la période complète qui vient d'être téléchargée
+        """
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO candles (ticker, interval, time, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((ticker, interval, *row) for row in rows),
+            )
+            conn.execute(
+                "INSERT INTO candle_series (ticker, interval, covered_seconds, synced_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ticker, interval) DO UPDATE SET synced_at = excluded.synced_at, "
+                "covered_seconds = MAX(COALESCE(candle_series.covered_seconds, 0), COALESCE(excluded.covered_seconds, 0))",
+                (ticker, interval, covered_seconds or 0, time.time()),
+            )
+
+    def load(self, ticker: str, interval: str, since=None, limit=None, until=None):
+        """Bougies triées par time croissant, les `limit` plus récentes entre `since` et `until`"""
+        sql = "SELECT time, open, high, low, close, volume FROM candles WHERE ticker = ? AND interval = ?"
+        params = [ticker, interval]
+        if since is not None:
+            sql += " AND time >= ?"
+            params.append(int(since))
+        if until is not None:
+            sql += " AND time <= ?"
+            params.append(int(until))
+        sql += " ORDER BY time DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        rows = self._conn().execute(sql, params).fetchall()
+        rows.reverse()
+        return rows
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def candle_db_path(provider: str) -> str:
+    """Fichier du store d'un provider: les bougies synthétiques ou rejouées ne se mélangent pas à Yahoo"""
+    if CANDLE_DB_PATH == ":memory:":
+        return CANDLE_DB_PATH
+    root, ext = os.path.splitext(CANDLE_DB_PATH)
+    return f"{root}.{provider}{ext or '.db'}"
+
+
+def get_candle_store(provider: str) -> CandleStore:
+    """Instance partagée du store d'un provider, créée au premier usage"""
+    with _stores_lock:
+        if provider not in _stores:
+            _stores[provider] = CandleStore(candle_db_path(provider))
+        return _stores[provider]
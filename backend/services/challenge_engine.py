@@ -1,27 +1,98 @@
 from datetime import date
-from models import db, UserChallenge
+from sqlalchemy import case, func, or_
+from models import db, UserChallenge, Trade
+from services import ledger
 
 DAILY_LOSS_LIMIT = 0.05
 TOTAL_LOSS_LIMIT = 0.10
 PROFIT_TARGET = 0.10
 
+# Les mutations d'equity sont des UPDATE conditionnels exécutés par la base:
+# deux requêtes concurrentes (workers gunicorn différents) ne peuvent pas
+# s'écraser, et les contrôles (statut, solde) se font sur la valeur courante.
+
+def debit_equity(challenge_id: int, amount: float, require_funds: bool = False, trades: list = ()) -> bool:
+    """
+    Débite atomiquement `amount` d'un challenge actif (sans commit).
+
+    trades: trades ouverts par ce débit, un événement TRADE_OPEN chacun dans le
+    journal (entry_price * qty); à défaut un seul événement DEBIT
+
+    Returns:
+        False si le challenge n'est plus actif ou, avec require_funds, si
+        l'equity courante est inférieure à amount
+    """
+    query = UserChallenge.query.filter(UserChallenge.id == challenge_id, UserChallenge.status == "active")
+    if require_funds:
+        query = query.filter(UserChallenge.equity >= amount)
+    if query.update({UserChallenge.equity: UserChallenge.equity - amount}, synchronize_session=False) != 1:
+        return False
+    for t in trades:
+        ledger.record(challenge_id, "TRADE_OPEN", -t.entry_price * t.qty, t)
+    if not trades:
+        ledger.record(challenge_id, "DEBIT", -amount)
+    return True
+
+def credit_equity(challenge_id: int, amount: float, trade=None):
+    """Crédite atomiquement `amount` (sans commit), quel que soit le statut du challenge"""
+    UserChallenge.query.filter(UserChallenge.id == challenge_id).update(
+        {UserChallenge.equity: UserChallenge.equity + amount}, synchronize_session=False)
+    ledger.record(challenge_id, "TRADE_CLOSE" if trade is not None else "CREDIT", amount, trade)
+
+def account_value():
+    """
+    Expression SQL de la valeur du compte: equity (liquidités, fonds bloqués
+    déduits) + fonds bloqués dans les trades ouverts (entry_price * qty, la
+    valeur restituée à P&L nul). Ouvrir une position ne change donc pas cette
+    valeur; seules les clôtures (P&L réalisé) la font varier.
+    """
+    blocked = db.session.query(func.sum(Trade.entry_price * Trade.qty)) \
+        .filter(Trade.challenge_id == UserChallenge.id, Trade.status == "OPEN") \
+        .correlate(UserChallenge).scalar_subquery()
+    return UserChallenge.equity + func.coalesce(blocked, 0.0)
+
+def rollover_day(*filters, today: date = None) -> int:
+    """
+    Nouvelle journée pour les challenges actifs (filtrés par filters) pas encore
+    passés à today: la référence journalière devient la valeur courante du compte.
+    Un seul UPDATE ensembliste, sans commit.
+    """
+    today = today or date.today()
+    return UserChallenge.query.filter(*filters, UserChallenge.status == "active", UserChallenge.day_start_date != today) \
+        .update({UserChallenge.day_start_date: today, UserChallenge.day_start_equity: account_value()},
+                synchronize_session=False)
+
+def apply_rules(*filters) -> int:
+    """
+    Applique perte journalière, perte totale et objectif de profit à la valeur du
+    compte (account_value) des challenges actifs filtrés, en un seul UPDATE, sans
+    commit. Les pertes sont prioritaires sur l'objectif.
+    """
+    value = account_value()
+    failed = or_(
+        value <= UserChallenge.day_start_equity * (1 - DAILY_LOSS_LIMIT),
+        value <= UserChallenge.starting_balance * (1 - TOTAL_LOSS_LIMIT),
+    )
+    passed = value >= UserChallenge.starting_balance * (1 + PROFIT_TARGET)
+    return UserChallenge.query.filter(*filters, UserChallenge.status == "active", or_(failed, passed)) \
+        .update({UserChallenge.status: case((failed, "failed"), else_="passed")}, synchronize_session=False)
+
+# Les règles passent avant la bascule journalière: une perte survenue depuis la
+# dernière évaluation est jugée contre la référence de la veille, pas effacée par elle.
+
 def evaluate_challenge(challenge_id: int):
-    ch = UserChallenge.query.get(challenge_id)
-    if not ch or ch.status != "active":
-        return ch
-
-    today = date.today()
-    if ch.day_start_date != today:
-        ch.day_start_date = today
-        ch.day_start_equity = ch.equity
-        db.session.commit()
-
-    if ch.equity <= ch.day_start_equity * (1 - DAILY_LOSS_LIMIT):
-        ch.status = "failed"
-    elif ch.equity <= ch.starting_balance * (1 - TOTAL_LOSS_LIMIT):
-        ch.status = "failed"
-    elif ch.equity >= ch.starting_balance * (1 + PROFIT_TARGET):
-        ch.status = "passed"
+    apply_rules(UserChallenge.id == challenge_id)
+    rollover_day(UserChallenge.id == challenge_id)
+    db.session.commit()
+    return db.session.get(UserChallenge, challenge_id)
 
+def sweep_challenges(today: date = None) -> dict:
+    """
+    Évalue tous les challenges actifs: règles puis bascule journalière, deux
+    UPDATE ensemblistes et un commit quel que soit le nombre de challenges.
+    Couvre aussi les challenges sans clôture (jamais évalués par close_trade).
+    """
+    decided = apply_rules()
+    rolled = rollover_day(today=today)
     db.session.commit()
-    return ch
+    return {"rolled_over": rolled, "decided": decided}
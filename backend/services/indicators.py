@@ -0,0 +1,149 @@
+"""
+Indicateurs techniques vectorisés (NumPy) sur tableaux de bougies.
+
+Chaque fonction prend des tableaux (ou séquences) de prix et retourne des
+tableaux float64 de même longueur; les valeurs de chauffe sont NaN.
+"""
+import numpy as np
+
+# Exposant max de la pondération d'un bloc EMA (évite under/overflow de w**k)
+_EMA_BLOCK_EXPONENT = 500.0
+
+
+def _ewma(values: np.ndarray, alpha: float, start: int, seed: float) -> np.ndarray:
+    """
+    Moyenne exponentielle y[t] = (1 - alpha) * y[t-1] + alpha * x[t] à partir
+    de y[start] = seed, sans boucle par élément.
+
+    Forme fermée par blocs: y = w**k * (y0 + alpha * cumsum(x / w**k)), avec
+    des blocs assez courts pour que w**k reste représentable.
+    """
+    out = np.full(len(values), np.nan)
+    if start >= len(values):
+        return out
+    out[start] = seed
+    if alpha >= 1:
+        out[start + 1:] = values[start + 1:]
+        return out
+    w = 1.0 - alpha
+    block = max(1, int(_EMA_BLOCK_EXPONENT / -np.log(w)))
+    powers = w ** np.arange(1, block + 1)
+    prev = seed
+    for s in range(start + 1, len(values), block):
+        chunk = values[s:s + block]
+        pw = powers[:len(chunk)]
+        y = pw * (prev + alpha * np.cumsum(chunk / pw))
+        out[s:s + len(chunk)] = y
+        prev = y[-1]
+    return out
+
+
+def _first_valid(values: np.ndarray) -> int:
+    valid = np.flatnonzero(~np.isnan(values))
+    return int(valid[0]) if len(valid) else len(values)
+
+
+def sma(values, n: int) -> np.ndarray:
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        csum = np.cumsum(np.r_[0.0, x])
+        out[n - 1:] = (csum[n:] - csum[:-n]) / n
+    return out
+
+
+def ema(values, n: int) -> np.ndarray:
+    """EMA de période n (alpha = 2 / (n + 1)), initialisée par la SMA des n premières valeurs"""
+    x = np.asarray(values, dtype=np.float64)
+    start = _first_valid(x) + n - 1
+    if start >= len(x):
+        return np.full(len(x), np.nan)
+    return _ewma(x, 2.0 / (n + 1), start, x[start - n + 1:start + 1].mean())
+
+
+def _wilder(values: np.ndarray, n: int, offset: int = 0) -> np.ndarray:
+    """Lissage de Wilder (alpha = 1 / n) initialisé par la moyenne des n premières valeurs"""
+    start = offset + n - 1
+    if start >= len(values):
+        return np.full(len(values), np.nan)
+    return _ewma(values, 1.0 / n, start, values[offset:start + 1].mean())
+
+
+def rsi(close, n: int = 14) -> np.ndarray:
+    """RSI de Wilder, entre 0 et 100"""
+    c = np.asarray(close, dtype=np.float64)
+    delta = np.diff(c, prepend=np.nan)
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    avg_gain = _wilder(gains, n, offset=1)
+    avg_loss = _wilder(losses, n, offset=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    out[(avg_loss == 0) & (avg_gain > 0)] = 100.0
+    out[(avg_loss == 0) & (avg_gain == 0)] = 50.0
+    return out
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9):
+    """Retourne (macd, ligne de signal, histogramme)"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, n: int = 20, k: float = 2.0):
+    """Retourne (moyenne, bande haute, bande basse) à k écarts-types (population)"""
+    c = np.asarray(close, dtype=np.float64)
+    mid = np.full(len(c), np.nan)
+    std = np.full(len(c), np.nan)
+    if len(c) >= n:
+        # sommes glissantes sur les écarts à la moyenne globale (limite la cancellation de E[x²] - E[x]²)
+        center = np.nanmean(c)
+        d = c - center
+        s1 = np.cumsum(np.r_[0.0, d])
+        s2 = np.cumsum(np.r_[0.0, d * d])
+        mean = (s1[n:] - s1[:-n]) / n
+        var = (s2[n:] - s2[:-n]) / n - mean * mean
+        mid[n - 1:] = mean + center
+        std[n - 1:] = np.sqrt(np.maximum(var, 0.0))
+    return mid, mid + k * std, mid - k * std
+
+
+def true_range(high, low, close) -> np.ndarray:
+    h = np.asarray(high, dtype=np.float64)
+    l = np.asarray(low, dtype=np.float64)
+    c = np.asarray(close, dtype=np.float64)
+    prev = np.r_[np.nan, c[:-1]]
+    return np.fmax(h - l, np.fmax(np.abs(h - prev), np.abs(l - prev)))
+
+
+def atr(high, low, close, n: int = 14) -> np.ndarray:
+    """Average True Range (lissage de Wilder); la première bougie compte pour high - low"""
+    return _wilder(true_range(high, low, close), n)
+
+
+def compute_indicators(candles: dict) -> dict:
+    """
+    Calcule tous les indicateurs sur des bougies en colonnes
+    {time, open, high, low, close} (cf. get_yahoo_history_columns).
+    """
+    high = np.asarray(candles["high"], dtype=np.float64)
+    low = np.asarray(candles["low"], dtype=np.float64)
+    close = np.asarray(candles["close"], dtype=np.float64)
+    macd_line, macd_signal, macd_hist = macd(close)
+    bb_mid, bb_upper, bb_lower = bollinger(close)
+    return {
+        "close": close,
+        "sma_fast": sma(close, 5),
+        "sma_slow": sma(close, 20),
+        "ema_fast": ema(close, 12),
+        "ema_slow": ema(close, 26),
+        "rsi": rsi(close),
+        "macd": macd_line,
+        "macd_signal": macd_signal,
+        "macd_hist": macd_hist,
+        "bb_mid": bb_mid,
+        "bb_upper": bb_upper,
+        "bb_lower": bb_lower,
+        "atr": atr(high, low, close),
+    }
@@ -0,0 +1,194 @@
+"""
+Journal append-only des mouvements d'equity et snapshots périodiques.
+
+Chaque variation de UserChallenge.equity produit un EquityEvent (montant
+signé) écrit dans la même transaction que la variation: les événements sont
+accumulés pendant la transaction puis insérés en un seul INSERT multi-lignes
+juste avant le commit (perdus avec elle en cas de rollback).
+
+Les variations atomiques (debit_equity, credit_equity, upgrade) enregistrent
+leur événement explicitement via record(); les créations de challenges et les
+modifications ORM de equity (scripts d'administration) sont captées
+automatiquement au flush.
+
+L'equity à une date quelconque = dernier snapshot antérieur + somme des
+événements suivants: take_snapshots() fige périodiquement l'equity des
+challenges actifs pour borner cette relecture.
+"""
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, insert, inspect
+from sqlalchemy.orm import Session
+from models import db, UserChallenge, EquityEvent, EquitySnapshot
+
+# Événements minimum depuis le dernier snapshot pour en prendre un nouveau,
+# et âge minimum (s) d'un événement figé (transactions concurrentes commitées)
+LEDGER_SNAPSHOT_EVENTS = int(os.getenv("LEDGER_SNAPSHOT_EVENTS", "200"))
+LEDGER_SNAPSHOT_LAG = float(os.getenv("LEDGER_SNAPSHOT_LAG", "60"))
+# Points max d'une courbe d'equity
+LEDGER_CURVE_MAX = int(os.getenv("LEDGER_CURVE_MAX", "5000"))
+
+_PENDING = "ledger_events"
+
+
+def record(challenge_id: int, kind: str, amount: float, trade=None):
+    """
+    Ajoute un événement à la transaction en cours (inséré au commit).
+
+    trade: Trade à l'origine du mouvement; son id est lu au commit, le trade
+    peut donc ne pas encore être flushé.
+    """
+    _append(db.session, challenge_id, kind, amount, trade)
+
+
+def _append(session, challenge_id, kind, amount, trade=None):
+    session.info.setdefault(_PENDING, []).append((challenge_id, kind, float(amount), trade, datetime.utcnow()))
+
+
+@event.listens_for(Session, "after_flush")
+def _capture_orm_changes(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, UserChallenge):
+            _append(session, obj.id, "DEPOSIT", obj.equity)
+    for obj in session.dirty:
+        if isinstance(obj, UserChallenge):
+            history = inspect(obj).attrs.equity.history
+            if history.added and history.deleted:
+                _append(session, obj.id, "ADJUST", history.added[0] - history.deleted[0])
+            elif history.added:
+                print(f"[LEDGER] Equity du challenge {obj.id} modifiée sans valeur précédente chargée")
+
+
+@event.listens_for(Session, "before_commit")
+def _insert_pending(session):
+    session.flush()
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        session.execute(insert(EquityEvent), [
+            {"challenge_id": challenge_id, "kind": kind, "amount": amount,
+             "trade_id": trade.id if trade is not None else None, "created_at": created_at}
+            for challenge_id, kind, amount, trade, created_at in pending
+        ])
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop(_PENDING, None)
+
+
+def _latest_snapshots(at=None):
+    """Sous-requête: dernier snapshot (event_id max) par challenge, antérieur à at"""
+    query = db.session.query(EquitySnapshot.challenge_id, func.max(EquitySnapshot.event_id).label("event_id"))
+    if at is not None:
+        query = query.filter(EquitySnapshot.as_of <= at)
+    last = query.group_by(EquitySnapshot.challenge_id).subquery()
+    return db.session.query(EquitySnapshot.challenge_id, EquitySnapshot.event_id, EquitySnapshot.equity,
+                            EquitySnapshot.as_of) \
+        .join(last, (last.c.challenge_id == EquitySnapshot.challenge_id) & (last.c.event_id == EquitySnapshot.event_id)) \
+        .subquery()
+
+
+def ledger_equities(challenge_ids: list = None, at: datetime = None) -> dict:
+    """
+    Equity reconstruite depuis le journal: dernier snapshot + relecture des événements suivants.
+
+    Returns:
+        challenge_id -> {"equity", "snapshot_event_id", "replayed"}
+    """
+    snap = _latest_snapshots(at)
+    base = db.session.query(snap)
+    if challenge_ids is not None:
+        base = base.filter(snap.c.challenge_id.in_(challenge_ids))
+    out = {row.challenge_id: {"equity": row.equity, "snapshot_event_id": row.event_id, "replayed": 0}
+           for row in base}
+
+    replay = db.session.query(EquityEvent.challenge_id, func.sum(EquityEvent.amount), func.count(EquityEvent.id)) \
+        .outerjoin(snap, snap.c.challenge_id == EquityEvent.challenge_id) \
+        .filter(EquityEvent.id > func.coalesce(snap.c.event_id, 0))
+    if challenge_ids is not None:
+        replay = replay.filter(EquityEvent.challenge_id.in_(challenge_ids))
+    if at is not None:
+        replay = replay.filter(EquityEvent.created_at <= at)
+    for challenge_id, amount, count in replay.group_by(EquityEvent.challenge_id):
+        entry = out.setdefault(challenge_id, {"equity": 0.0, "snapshot_event_id": None, "replayed": 0})
+        entry["equity"] += amount
+        entry["replayed"] = count
+    return out
+
+
+def equity_at(challenge_id: int, at: datetime = None) -> dict:
+    """Equity d'un challenge à la date at (maintenant par défaut) d'après le journal"""
+    return ledger_equities([challenge_id], at).get(
+        challenge_id, {"equity": None, "snapshot_event_id": None, "replayed": 0})
+
+
+def equity_curve(challenge_id: int, start: datetime = None, end: datetime = None,
+                 limit: int = LEDGER_CURVE_MAX) -> dict:
+    """
+    Equity après chaque événement de ]start, end].
+
+    Returns:
+        {"start_equity", "points": [{time, equity, kind, amount, trade_id}], "truncated"}
+    """
+    start_equity = equity_at(challenge_id, start)["equity"] if start else 0.0
+    query = db.session.query(EquityEvent.created_at, EquityEvent.kind, EquityEvent.amount, EquityEvent.trade_id) \
+        .filter(EquityEvent.challenge_id == challenge_id)
+    if start:
+        query = query.filter(EquityEvent.created_at > start)
+    if end:
+        query = query.filter(EquityEvent.created_at <= end)
+    rows = query.order_by(EquityEvent.id).limit(limit + 1).all()
+
+    equity = start_equity or 0.0
+    points = []
+    for created_at, kind, amount, trade_id in rows[:limit]:
+        equity += amount
+        points.append({"time": created_at.isoformat(), "equity": equity, "kind": kind,
+                       "amount": amount, "trade_id": trade_id})
+    return {"start_equity": start_equity, "points": points, "truncated": len(rows) > limit}
+
+
+def take_snapshots(min_events: int = LEDGER_SNAPSHOT_EVENTS, lag: float = LEDGER_SNAPSHOT_LAG) -> int:
+    """
+    Snapshot des challenges ayant au moins min_events événements depuis leur
+    dernier snapshot (événements de plus de lag secondes seulement). Une
+    requête groupée pour tous les challenges, un INSERT multi-lignes, un commit.
+
+    Returns:
+        Nombre de snapshots créés
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=lag)
+    snap = _latest_snapshots()
+    rows = db.session.query(
+        EquityEvent.challenge_id,
+        func.max(EquityEvent.id),
+        func.max(EquityEvent.created_at),
+        func.sum(EquityEvent.amount),
+        func.max(func.coalesce(snap.c.equity, 0.0)),
+    ).outerjoin(snap, snap.c.challenge_id == EquityEvent.challenge_id) \
+        .filter(EquityEvent.id > func.coalesce(snap.c.event_id, 0), EquityEvent.created_at <= cutoff) \
+        .group_by(EquityEvent.challenge_id) \
+        .having(func.count(EquityEvent.id) >= min_events).all()
+    if rows:
+        db.session.execute(insert(EquitySnapshot), [
+            {"challenge_id": challenge_id, "event_id": event_id, "as_of": as_of,
+             "equity": base + amount, "created_at": datetime.utcnow()}
+            for challenge_id, event_id, as_of, amount, base in rows
+        ])
+    db.session.commit()
+    return len(rows)
+
+
+def reconcile(challenge_ids: list = None, tolerance: float = 1e-6) -> list:
+    """Challenges dont l'equity en base diffère de l'equity reconstruite depuis le journal"""
+    ledger = ledger_equities(challenge_ids)
+    query = db.session.query(UserChallenge.id, UserChallenge.equity)
+    if challenge_ids is not None:
+        query = query.filter(UserChallenge.id.in_(challenge_ids))
+    mismatches = []
+    for challenge_id, equity in query:
+        rebuilt = ledger.get(challenge_id, {}).get("equity")
+        if rebuilt is None or abs(rebuilt - equity) > tolerance:
+            mismatches.append({"challenge_id": challenge_id, "equity": equity, "ledger_equity": rebuilt,
+                               "difference": None if rebuilt is None else equity - rebuilt})
+    return mismatches
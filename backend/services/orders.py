@@ -0,0 +1,256 @@
+"""
+Ordres en attente (stop loss, take profit, limite d'entrée) et moteur de déclenchement.
+
+Les ordres PENDING sont chargés en mémoire dans un carnet indexé par
+(market, symbol) et trié par prix de déclenchement: deux tas par symbole,
+l'un pour les ordres déclenchés quand le prix monte au seuil, l'autre quand
+il descend au seuil. Une cotation ne dépile que les ordres qu'elle franchit:
+O(log n + k) par tick au lieu d'un parcours de tous les ordres.
+
+L'exécution passe par les mêmes UPDATE conditionnels que les routes de
+trading: un ordre n'est exécuté qu'une fois, même si plusieurs workers font
+tourner le moteur ou si l'utilisateur clôture le trade en même temps.
+"""
+import heapq
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from models import db, RestingOrder, Trade
+from services.challenge_engine import evaluate_challenge, debit_equity, credit_equity
+from services.pnl import trade_pnl, exit_value
+from services.positions import market_quotes, _market
+
+# Fréquence de vérification des ordres (s) et de rechargement complet du carnet (s)
+ORDER_MATCH_INTERVAL = float(os.getenv("ORDER_MATCH_INTERVAL", "2"))
+ORDER_RELOAD_INTERVAL = float(os.getenv("ORDER_RELOAD_INTERVAL", "300"))
+# Fenêtre (s) de relecture des ids déjà dépassés: un ordre commité tard sous un id plus petit y est rattrapé
+ORDER_RESCAN_OVERLAP = float(os.getenv("ORDER_RESCAN_OVERLAP", "30"))
+# Moteur lancé dans chaque worker web (1) ou seulement par order_engine.py (0, par défaut:
+# un seul process interroge les cotations et exécute les ordres)
+ORDER_ENGINE_EMBEDDED = os.getenv("ORDER_ENGINE_EMBEDDED", "0") == "1"
+
+ORDER_KINDS = ("STOP_LOSS", "TAKE_PROFIT", "LIMIT")
+
+
+def trigger_direction(kind: str, side: str) -> str:
+    """
+    "above" si l'ordre se déclenche quand le prix monte au seuil, "below" s'il descend.
+
+    side est le sens du trade protégé (SL/TP) ou de l'entrée (LIMIT).
+    """
+    rises = {"STOP_LOSS": "SELL", "TAKE_PROFIT": "BUY", "LIMIT": "SELL"}
+    return "above" if side.upper() == rises[kind] else "below"
+
+
+def crossed(direction: str, trigger: float, price: float) -> bool:
+    return price >= trigger if direction == "above" else price <= trigger
+
+
+class OrderBook:
+    """
+    Carnet des ordres en attente, par (market, symbol).
+
+    above: tas min de (seuil, id), le plus bas est le premier franchi par une hausse
+    below: tas min de (-seuil, id), le plus haut est le premier franchi par une baisse
+    La suppression est paresseuse: discard retire l'id, l'entrée est ignorée au dépilage.
+    """
+
+    def __init__(self):
+        self._above = {}
+        self._below = {}
+        self._live = set()
+
+    def __len__(self):
+        return len(self._live)
+
+    def add(self, order_id: int, key: tuple, direction: str, trigger: float):
+        if order_id in self._live:
+            return
+        self._live.add(order_id)
+        if direction == "above":
+            heapq.heappush(self._above.setdefault(key, []), (trigger, order_id))
+        else:
+            heapq.heappush(self._below.setdefault(key, []), (-trigger, order_id))
+
+    def discard(self, order_id: int):
+        self._live.discard(order_id)
+
+    def keys(self) -> list:
+        """(market, symbol) ayant encore des ordres en attente"""
+        return [key for key in set(self._above) | set(self._below)
+                if self._above.get(key) or self._below.get(key)]
+
+    def match(self, key: tuple, price: float) -> list:
+        """Retire et retourne les ids des ordres de key franchis par price (les plus proches d'abord)"""
+        matched = []
+        above = self._above.get(key)
+        while above and above[0][0] <= price:
+            self._collect(heapq.heappop(above)[1], matched)
+        below = self._below.get(key)
+        while below and -below[0][0] >= price:
+            self._collect(heapq.heappop(below)[1], matched)
+        return matched
+
+    def _collect(self, order_id: int, matched: list):
+        if order_id in self._live:
+            self._live.discard(order_id)
+            matched.append(order_id)
+
+
+def cancel_trade_orders(trade_id: int) -> int:
+    """Annule (sans commit) les SL/TP encore en attente d'un trade"""
+    return RestingOrder.query.filter_by(trade_id=trade_id, status="PENDING").update(
+        {RestingOrder.status: "CANCELLED"}, synchronize_session=False)
+
+
+def fill_order(order_id: int, price: float):
+    """
+    Exécute un ordre déclenché au prix price.
+
+    SL/TP: clôture le trade (règles de close_trade) et annule l'autre ordre du trade.
+    LIMIT: ouvre le trade (règles de open_trade), REJECTED si les fonds manquent.
+
+    Returns:
+        Statut final de l'ordre, ou None s'il a déjà été traité (autre worker, annulation)
+    """
+    order = db.session.get(RestingOrder, order_id)
+    if order is None or order.status != "PENDING":
+        return None
+    now = datetime.utcnow()
+    claimed = RestingOrder.query.filter_by(id=order.id, status="PENDING").update({
+        RestingOrder.status: "FILLED",
+        RestingOrder.fill_price: price,
+        RestingOrder.filled_at: now,
+    }, synchronize_session=False)
+    if not claimed:
+        db.session.rollback()
+        return None
+
+    if order.kind == "LIMIT":
+        t = Trade(challenge_id=order.challenge_id, symbol=order.symbol, market=order.market,
+                  side=order.side, qty=order.qty, entry_price=price, status="OPEN")
+        if not debit_equity(order.challenge_id, price * order.qty, require_funds=order.side == "BUY", trades=[t]):
+            status = "REJECTED"
+        else:
+            db.session.add(t)
+            db.session.flush()
+            status = "FILLED"
+            RestingOrder.query.filter_by(id=order.id).update(
+                {RestingOrder.result_trade_id: t.id}, synchronize_session=False)
+    else:
+        t = db.session.get(Trade, order.trade_id)
+        closed = Trade.query.filter_by(id=t.id, status="OPEN").update({
+            Trade.exit_price: price,
+            Trade.pnl: trade_pnl(t.side, t.entry_price, price, t.qty),
+            Trade.status: "CLOSED",
+            Trade.closed_at: now,
+        }, synchronize_session=False)
+        if closed:
+            credit_equity(t.challenge_id, exit_value(t.side, t.entry_price, price, t.qty), trade=t)
+            cancel_trade_orders(t.id)
+            status = "FILLED"
+        else:
+            status = "CANCELLED"
+    if status != "FILLED":
+        RestingOrder.query.filter_by(id=order.id).update(
+            {RestingOrder.status: status, RestingOrder.fill_price: None, RestingOrder.filled_at: None},
+            synchronize_session=False)
+    db.session.commit()
+
+    if status == "FILLED" and order.kind != "LIMIT":
+        evaluate_challenge(order.challenge_id)
+    print(f"[ORDERS] {order.kind} #{order.id} {order.symbol} @ {price}: {status}")
+    return status
+
+
+class OrderEngine:
+    """
+    Boucle de déclenchement: charge les ordres PENDING dans un OrderBook et les
+    confronte aux cotations (market_quotes, un lookup groupé par tick).
+
+    Les nouveaux ordres sont ajoutés à chaque tick; le carnet est reconstruit
+    périodiquement pour oublier les ordres annulés ou exécutés ailleurs.
+
+    Un id est attribué à l'INSERT, pas au commit: un ordre peut devenir visible
+    après un ordre d'id plus grand. Chaque tick relit donc les ids chargés depuis
+    moins de rescan_overlap secondes (les ordres déjà dans le carnet sont ignorés).
+    """
+
+    def __init__(self, app, interval: float = ORDER_MATCH_INTERVAL, reload_interval: float = ORDER_RELOAD_INTERVAL,
+                 rescan_overlap: float = ORDER_RESCAN_OVERLAP):
+        self.app = app
+        self.interval = interval
+        self.reload_interval = reload_interval
+        self.rescan_overlap = rescan_overlap
+        self.book = OrderBook()
+        self._last_id = 0
+        self._marks = deque()  # (date, _last_id) avant chaque chargement récent
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def load(self, full: bool = False) -> int:
+        """Ajoute au carnet les ordres PENDING pas encore chargés (tous si full); retourne le nombre ajouté"""
+        now = time.time()
+        if full:
+            self.book, self._last_id, self._loaded_at = OrderBook(), 0, now
+            self._marks.clear()
+        # reprise à _last_id tel qu'il était il y a rescan_overlap secondes
+        self._marks.append((now, self._last_id))
+        while len(self._marks) > 1 and self._marks[1][0] <= now - self.rescan_overlap:
+            self._marks.popleft()
+        rows = db.session.query(RestingOrder.id, RestingOrder.kind, RestingOrder.side, RestingOrder.market,
+                                RestingOrder.symbol, RestingOrder.trigger_price) \
+            .filter(RestingOrder.status == "PENDING", RestingOrder.id > self._marks[0][1]) \
+            .order_by(RestingOrder.id).all()
+        before = len(self.book)
+        for order_id, kind, side, market, symbol, trigger in rows:
+            self.book.add(order_id, (_market(market), symbol), trigger_direction(kind, side), trigger)
+            self._last_id = max(self._last_id, order_id)
+        return len(self.book) - before
+
+    def tick(self) -> int:
+        """Un passage de déclenchement; retourne le nombre d'ordres exécutés"""
+        with self.app.app_context():
+            try:
+                self.load(full=time.time() - self._loaded_at >= self.reload_interval)
+                keys = self.book.keys()
+                if not keys:
+                    return 0
+                quotes = market_quotes(keys)
+                filled = 0
+                for key in keys:
+                    quote = quotes.get(key, {})
+                    # pas de déclenchement sur une cotation absente ou périmée
+                    if quote.get("price") is None or quote.get("stale"):
+                        continue
+                    for order_id in self.book.match(key, quote["price"]):
+                        try:
+                            filled += fill_order(order_id, quote["price"]) == "FILLED"
+                        except Exception as e:
+                            db.session.rollback()
+                            # l'ordre reste PENDING en base: il revient au prochain rechargement complet
+                            self._loaded_at = 0.0
+                            print(f"[ORDERS] Exécution de l'ordre #{order_id} échouée: {e}")
+                return filled
+            finally:
+                db.session.remove()
+
+    def start(self):
+        """Démarre la boucle dans un thread de fond (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.run, name="order-engine", daemon=True)
+                self._thread.start()
+
+    def run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[ORDERS] Tick échoué: {e}")
+            time.sleep(self.interval)
@@ -0,0 +1,27 @@
+import numpy as np
+
+
+def side_sign(side):
+    """BUY -> 1, SELL (short) -> -1"""
+    return 1 if str(side).upper() == "BUY" else -1
+
+
+def trade_pnl(side, entry_price, exit_price, qty):
+    """
+    P&L d'une position (règle de close_trade).
+
+    side peut être "BUY"/"SELL" ou un signe (+1/-1); les prix et quantités
+    peuvent être des tableaux NumPy (backtest, positions vectorisés).
+    """
+    sign = side_sign(side) if isinstance(side, str) else side
+    return sign * (exit_price - entry_price) * qty
+
+
+def exit_value(side, entry_price, exit_price, qty):
+    """Fonds restitués à la clôture: valeur des actions (BUY) ou marge d'entrée + P&L (SELL)"""
+    if not isinstance(side, str):
+        return np.where(np.asarray(side) > 0, exit_price * qty,
+                        entry_price * qty + trade_pnl(side, entry_price, exit_price, qty))
+    if side_sign(side) == 1:
+        return exit_price * qty
+    return entry_price * qty + trade_pnl(side, entry_price, exit_price, qty)
@@ -0,0 +1,92 @@
+import numpy as np
+from services.prices import get_yahoo_price, get_yahoo_prices
+from services.bvc import BVC_SNAPSHOT_TTL
+from services.quote_book import bvc_book
+from services.pnl import side_sign, trade_pnl, exit_value
+
+
+def market_price(market: str, symbol: str) -> float:
+    """Prix d'exécution frais: cache Yahoo, ou carnet BVC en mémoire (jamais de scraping par ordre)"""
+    if market == "BVC":
+        price, _ = bvc_book.get(symbol, max_age=BVC_SNAPSHOT_TTL)
+        return price
+    return get_yahoo_price(symbol)
+
+
+def market_quotes(pairs, fresh: bool = False) -> dict:
+    """
+    Cotations de plusieurs (market, symbol) en un seul lookup par marché.
+
+    fresh: prix d'exécution, une cotation périmée est remplacée par {"error"}.
+
+    Returns:
+        (market, symbol) -> {"price", "age", "stale"} ou {"error"}
+    """
+    pairs = list(dict.fromkeys((_market(market), symbol) for market, symbol in pairs))
+    quotes = {}
+    yahoo = [symbol for market, symbol in pairs if market == "YAHOO"]
+    if yahoo:
+        # un seul téléchargement groupé pour les symboles absents du cache
+        batch = get_yahoo_prices(yahoo, fresh=fresh)
+        for symbol in yahoo:
+            quotes[("YAHOO", symbol)] = batch.get(symbol.strip().upper(), {"error": "No price data"})
+    for market, symbol in pairs:
+        if market == "BVC":
+            try:
+                price, age = bvc_book.get(symbol, max_age=BVC_SNAPSHOT_TTL if fresh else None)
+                # même seuil que get_bvc_quote: le moteur d'ordres ignore les cotations périmées
+                quotes[(market, symbol)] = {"price": price, "age": round(age, 1), "stale": age >= BVC_SNAPSHOT_TTL}
+            except Exception as e:
+                quotes[(market, symbol)] = {"error": str(e)}
+    return quotes
+
+
+def _market(market: str) -> str:
+    return "BVC" if market == "BVC" else "YAHOO"
+
+
+def mark_to_market(trades: list, cash: float) -> dict:
+    """
+    Valorise des trades OPEN au prix courant (formules BUY/SELL de close_trade).
+
+    cash: equity du challenge (fonds bloqués déjà déduits). Une position sans
+    cotation est valorisée à son prix d'entrée et signalée par "error".
+    """
+    quotes = market_quotes((t.market, t.symbol) for t in trades)
+    marks = [quotes[(_market(t.market), t.symbol)] for t in trades]
+
+    sign = np.array([side_sign(t.side) for t in trades], dtype=np.float64)
+    entry = np.array([t.entry_price for t in trades], dtype=np.float64)
+    qty = np.array([t.qty for t in trades], dtype=np.float64)
+    price = np.array([m.get("price", np.nan) for m in marks], dtype=np.float64)
+    priced = ~np.isnan(price)
+    mark = np.where(priced, price, entry)
+
+    pnl = trade_pnl(sign, entry, mark, qty)
+    value = exit_value(sign, entry, mark, qty)
+
+    positions = []
+    for i, t in enumerate(trades):
+        positions.append({
+            "trade_id": t.id,
+            "symbol": t.symbol,
+            "market": t.market,
+            "side": t.side,
+            "qty": t.qty,
+            "entry_price": t.entry_price,
+            "current_price": float(price[i]) if priced[i] else None,
+            "unrealized_pnl": float(pnl[i]) if priced[i] else None,
+            "market_value": float(value[i]),
+            "age": marks[i].get("age"),
+            "stale": marks[i].get("stale", False),
+            "error": marks[i].get("error"),
+            "opened_at": t.opened_at.isoformat() if t.opened_at else None,
+        })
+
+    return {
+        "cash": cash,
+        "unrealized_pnl": float(pnl[priced].sum()),
+        "equity": float(cash + value.sum()),
+        "complete": bool(priced.all()),
+        "positions": positions,
+    }
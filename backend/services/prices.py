@@ -1,17 +1,120 @@
-import yfinance as yf
+import os
+import time
+import numpy as np
 import requests
 from bs4 import BeautifulSoup
+from services.cache import TTLCache
+from services.candles import get_candle_store, period_seconds, resample
+from services.providers import get_provider, NoDataError
+from services.resilience import get_breaker
+
+# Cache des cotations: un seul appel au provider par symbole et par fenêtre TTL
+QUOTE_CACHE_TTL = float(os.getenv("QUOTE_CACHE_TTL", "5"))
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", "1024"))
+
+# Au-delà du TTL, le dernier prix connu reste servi (marqué stale) pendant ce délai
+QUOTE_MAX_STALE = float(os.getenv("QUOTE_MAX_STALE", "300"))
+
+_quote_cache = TTLCache(ttl=QUOTE_CACHE_TTL, maxsize=QUOTE_CACHE_SIZE, max_stale=QUOTE_MAX_STALE)
+
+# Cache négatif: un symbole sans données n'est pas redemandé à Yahoo pendant ce délai (s)
+QUOTE_MISS_TTL = float(os.getenv("QUOTE_MISS_TTL", "60"))
+_missing = TTLCache(ttl=QUOTE_MISS_TTL, maxsize=QUOTE_CACHE_SIZE)
+
+# Synchronisation du store de bougies: au plus un appel Yahoo par série et par fenêtre
+HISTORY_REFRESH_TTL = float(os.getenv("HISTORY_REFRESH_TTL", "10"))
+# Couverture utilisée pour les périodes sans durée fixe (max)
+MAX_PERIOD_SECONDS = 100 * 366 * 86400
+
+_history_sync = TTLCache(ttl=HISTORY_REFRESH_TTL, maxsize=QUOTE_CACHE_SIZE)
+
+# Intervalles dérivés localement de la série 1m (en secondes)
+RESAMPLE_SECONDS = {"2m": 120, "5m": 300, "15m": 900, "30m": 1800,
+                    "60m": 3600, "1h": 3600, "90m": 5400, "1d": 86400}
+# Yahoo ne fournit des bougies 1m que sur ~7 jours
+MAX_1M_PERIOD_SECONDS = 7 * 86400
+
+def get_yahoo_quote(ticker: str, fresh: bool = False) -> dict:
+    """
+    Retourne {"price", "age", "stale"} depuis le cache, avec un seul fetch amont par symbole.
+
+    Un prix périmé (stale) est servi immédiatement pendant son rafraîchissement
+    en arrière-plan, pour que les pannes Yahoo ne bloquent pas l'affichage.
+    fresh: prix d'exécution, jamais périmé (chargement synchrone après le TTL).
+    """
+    ticker = ticker.strip().upper()
+    if _is_missing(ticker):
+        raise NoDataError("No price data")
+    try:
+        price, age = _quote_cache.get(ticker, lambda: _fetch_yahoo_price(ticker),
+                                      max_age=QUOTE_CACHE_TTL if fresh else None)
+    except NoDataError:
+        _missing.set(ticker, True)
+        raise
+    return _quote(price, age)
+
+def _is_missing(ticker: str) -> bool:
+    entry = _missing.peek(ticker)
+    return entry is not None and entry[1] < QUOTE_MISS_TTL
 
 def get_yahoo_price(ticker: str) -> float:
-    t = yf.Ticker(ticker)
-    # fast_info est souvent plus rapide
-    fi = getattr(t, "fast_info", None)
-    if fi and fi.get("lastPrice"):
-        return float(fi["lastPrice"])
-    hist = t.history(period="1d", interval="1m")
-    if hist.empty:
-        raise ValueError("No price data")
-    return float(hist["Close"].iloc[-1])
+    """Prix d'exécution: toujours frais (jamais la valeur stale du cache)"""
+    return get_yahoo_quote(ticker, fresh=True)["price"]
+
+def _fetch_yahoo_price(ticker: str) -> float:
+    return get_breaker("yahoo").call(get_provider("YAHOO").price, ticker)
+
+def _quote(price: float, age: float) -> dict:
+    stale = age >= QUOTE_CACHE_TTL
+    if stale:
+        get_breaker("yahoo").record_stale()
+    return {"price": price, "age": round(age, 3), "stale": stale}
+
+def get_yahoo_prices(tickers: list, fresh: bool = False) -> dict:
+    """
+    Cotations de plusieurs symboles en un seul téléchargement yfinance.
+
+    Les symboles encore frais dans le cache ne sont pas re-téléchargés.
+    fresh: prix d'exécution, pas de dernier prix connu (stale) en cas d'échec.
+
+    Returns:
+        dict ticker -> {"price", "age", "stale"} ou {"error"} par symbole
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    results = {}
+    missing = []
+    for ticker in tickers:
+        cached = _quote_cache.peek(ticker)
+        if cached is not None and cached[1] < QUOTE_CACHE_TTL:
+            results[ticker] = _quote(*cached)
+        elif _is_missing(ticker):
+            results[ticker] = {"error": "No price data"}
+        else:
+            missing.append(ticker)
+
+    if not missing:
+        return results
+
+    try:
+        prices = get_breaker("yahoo").call(get_provider("YAHOO").prices, missing)
+    except Exception as e:
+        prices = {ticker: e for ticker in missing}
+
+    for ticker in missing:
+        price = prices.get(ticker)
+        if isinstance(price, NoDataError):
+            _missing.set(ticker, True)
+        if price is None or isinstance(price, Exception):
+            # dernier prix connu, marqué stale, plutôt qu'une erreur
+            cached = _quote_cache.peek(ticker)
+            if not fresh and cached is not None and cached[1] < QUOTE_CACHE_TTL + QUOTE_MAX_STALE:
+                results[ticker] = _quote(*cached)
+            else:
+                results[ticker] = {"error": str(price) if price is not None else "No price data"}
+            continue
+        _quote_cache.set(ticker, price)
+        results[ticker] = _quote(price, 0.0)
+    return results
 
 def get_bvc_price(symbol: str) -> float:
     # MVP: à remplacer par ton vrai scraper BVC / BVCscrap
@@ -22,23 +125,179 @@ def get_bvc_price(symbol: str) -> float:
 
 
 def get_yahoo_history(ticker: str, period="1d", interval="1m", limit=300):
-    t = yf.Ticker(ticker)
-    hist = t.history(period=period, interval=interval)
+    """
+    Historique OHLC servi depuis le store local de bougies.
+
+    Seules les bougies postérieures à la dernière bougie stockée sont
+    demandées à Yahoo, au plus une fois par HISTORY_REFRESH_TTL et par série.
+    """
+    rows = _load_history(ticker, period, interval, limit)
+    # format pour Lightweight Charts: {time, open, high, low, close}
+    return [
+        {"time": ts, "open": o, "high": h, "low": l, "close": c}
+        for ts, o, h, l, c, _ in rows
+    ]
+
+def get_yahoo_history_columns(ticker: str, period="1d", interval="1m", limit=300) -> dict:
+    """Même historique en colonnes: {time: [...], open: [...], high, low, close}"""
+    rows = _load_history(ticker, period, interval, limit)
+    if not rows:
+        return {"time": (), "open": (), "high": (), "low": (), "close": ()}
+    times, opens, highs, lows, closes, _ = zip(*rows)
+    return {"time": times, "open": opens, "high": highs, "low": lows, "close": closes}
+
+def _candle_store():
+    """Store de bougies du provider Yahoo configuré (YAHOO_PROVIDER)"""
+    return get_candle_store(get_provider("YAHOO").name)
+
+def _last_time(store, ticker: str, interval: str):
+    """
+    Dernière bougie stockée jusqu'à l'horloge du provider: après un redémarrage
+    du replay, les bougies stockées au-delà de son horloge virtuelle sont ignorées
+    """
+    return store.last_time(ticker, interval, until=get_provider("YAHOO").now())
+
+def history_complete_until(ticker: str, period="1d", interval="1m") -> float:
+    """
+    Date (timestamp) jusqu'à laquelle l'historique stocké est définitif: fin de
+    la dernière bougie source, bornée par la dernière synchronisation. Une
+    bougie (ou bougie agrégée) se terminant après peut encore être partielle.
+    """
+    ticker = ticker.strip().upper()
+    source = "1m" if _is_resampled(period, interval) else interval
+    store = _candle_store()
+    last, synced_at = _last_time(store, ticker, source), store.synced_at(ticker, source)
+    if last is None or synced_at is None:
+        return 0.0
+    return min(last + RESAMPLE_SECONDS.get(source, 60), synced_at)
+
+def _is_resampled(period: str, interval: str) -> bool:
+    span = period_seconds(period)
+    return interval in RESAMPLE_SECONDS and bool(span) and span <= MAX_1M_PERIOD_SECONDS
+
+def _load_history(ticker: str, period: str, interval: str, limit: int) -> list:
+    ticker = ticker.strip().upper()
+    span = period_seconds(period)
+
+    # 5m/15m/1h/1d... dérivés de la série 1m en cache: changer d'unité ne coûte aucun appel réseau
+    if _is_resampled(period, interval):
+        rows = resample(_load_history(ticker, period, "1m", None), RESAMPLE_SECONDS[interval])
+        return rows[max(len(rows) - limit, 0):] if limit is not None else rows
+
+    store = _candle_store()
+    try:
+        _history_sync.get((ticker, period, interval), lambda: _sync_history(ticker, period, interval))
+    except Exception as e:
+        # Yahoo indisponible: on sert les bougies déjà stockées
+        if _last_time(store, ticker, interval) is None:
+            raise
+        print(f"[PRICES] Synchro historique {ticker} {interval} échouée, données locales servies: {e}")
+
+    last = _last_time(store, ticker, interval)
+    if last is None:
+        raise NoDataError("No history data")
+
+    return store.load(ticker, interval, since=last - span if span else None, limit=limit, until=last)
+
+def _sync_history(ticker: str, period: str, interval: str) -> int:
+    """Télécharge le delta (ou la période complète si non couverte) et l'ajoute au store"""
+    store = _candle_store()
+    span = period_seconds(period) or MAX_PERIOD_SECONDS
+    last = _last_time(store, ticker, interval)
+    provider = get_provider("YAHOO")
+    breaker = get_breaker("yahoo")
+
+    if _needs_full_sync(store, ticker, interval, span, last):
+        hist = breaker.call(provider.history, ticker, period=period, interval=interval)
+        covered = span
+    else:
+        # la dernière bougie stockée est re-téléchargée: elle était peut-être encore en cours
+        hist = breaker.call(provider.history, ticker, interval=interval, start=last)
+        covered = None
 
     if hist is None or hist.empty:
-        raise ValueError("No history data")
+        if last is None:
+            raise NoDataError("No history data")
+        return 0
 
-    # format pour Lightweight Charts: {time, open, high, low, close}
-    hist = hist.tail(limit)
-    points = []
-    for idx, row in hist.iterrows():
-        # idx est un Timestamp -> convert en unix seconds
-        ts = int(idx.to_pydatetime().timestamp())
-        points.append({
-            "time": ts, 
-            "open": float(row["Open"]),
-            "high": float(row["High"]),
-            "low": float(row["Low"]),
-            "close": float(row["Close"])
-        })
-    return points
+    rows = _frame_rows(hist)
+    store.append(ticker, interval, rows, covered_seconds=covered)
+    return len(rows)
+
+def _needs_full_sync(store, ticker: str, interval: str, span: int, last) -> bool:
+    """Période complète à télécharger (série absente, trop courte ou trop ancienne) plutôt qu'un delta"""
+    return last is None or span > store.covered_seconds(ticker, interval) or get_provider("YAHOO").now() - last > span
+
+def prefetch_history(tickers: list, period="1d", interval="1m") -> dict:
+    """
+    Synchronise en téléchargements groupés les séries dont la synchro a expiré.
+
+    Un appel pour les séries à télécharger en entier, un pour les deltas; les
+    lectures suivantes (get_yahoo_history*) sont alors servies par le store
+    sans appel réseau.
+
+    Returns:
+        ticker -> exception, pour les séries non synchronisées (elles le
+        seront unitairement à la lecture)
+    """
+    span = period_seconds(period)
+    if interval in RESAMPLE_SECONDS and span and span <= MAX_1M_PERIOD_SECONDS:
+        interval = "1m"
+    span = span or MAX_PERIOD_SECONDS
+
+    due = []
+    for ticker in dict.fromkeys(t.strip().upper() for t in tickers):
+        entry = _history_sync.peek((ticker, period, interval))
+        if entry is None or entry[1] >= HISTORY_REFRESH_TTL:
+            due.append(ticker)
+    if not due:
+        return {}
+
+    store = _candle_store()
+    full, delta = [], {}
+    for ticker in due:
+        last = _last_time(store, ticker, interval)
+        if _needs_full_sync(store, ticker, interval, span, last):
+            full.append(ticker)
+        else:
+            delta[ticker] = last
+
+    provider = get_provider("YAHOO")
+    breaker = get_breaker("yahoo")
+    groups = []
+    if full:
+        groups.append((full, {"period": period}, span))
+    if delta:
+        # start commun: le plus ancien des deltas, les bougies déjà stockées sont remplacées
+        groups.append((list(delta), {"start": min(delta.values())}, None))
+
+    errors = {}
+    for symbols, window, covered in groups:
+        try:
+            frames = breaker.call(provider.histories, symbols, interval=interval, **window)
+        except Exception as e:
+            frames = {symbol: e for symbol in symbols}
+        for symbol in symbols:
+            hist = frames.get(symbol)
+            if isinstance(hist, Exception):
+                errors[symbol] = hist
+                continue
+            rows = _frame_rows(hist) if hist is not None and not hist.empty else []
+            if not rows and _last_time(store, symbol, interval) is None:
+                errors[symbol] = NoDataError("No history data")
+                continue
+            if rows:
+                store.append(symbol, interval, rows, covered_seconds=covered)
+            _history_sync.set((symbol, period, interval), len(rows))
+    return errors
+
+def _frame_rows(hist) -> list:
+    """DataFrame yfinance -> [(time, open, high, low, close, volume)], conversion vectorisée"""
+    # index Timestamp -> unix seconds, sans passer par un objet Python par ligne
+    times = hist.index.as_unit("s").asi8.tolist()
+    ohlc = hist[["Open", "High", "Low", "Close"]].to_numpy(dtype=np.float64).T.tolist()
+    if "Volume" in hist.columns:
+        volume = hist["Volume"].to_numpy(dtype=np.float64).tolist()
+    else:
+        volume = [None] * len(times)
+    return list(zip(times, *ohlc, volume))
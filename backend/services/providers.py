@@ -0,0 +1,406 @@
+"""
+Fournisseurs de prix interchangeables.
+
+    YAHOO_PROVIDER = yahoo | replay | synthetic   (marché YAHOO)
+    BVC_PROVIDER   = bvc | replay | synthetic     (marché BVC)
+
+Les providers replay et synthetic ne font aucun appel réseau: ils servent à
+rejouer des données enregistrées ou à générer une marche aléatoire
+déterministe, pour les benchmarks et le fonctionnement hors ligne.
+"""
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from yfinance.exceptions import YFRateLimitError
+from services.candles import period_seconds, resample
+
+YAHOO_PROVIDER = os.getenv("YAHOO_PROVIDER", "yahoo")
+BVC_PROVIDER = os.getenv("BVC_PROVIDER", "bvc")
+
+# Provider replay: dossier de fichiers {SYMBOL}.csv (time,open,high,low,close,volume en 1m)
+REPLAY_DIR = os.getenv("REPLAY_DIR", "recordings")
+# Secondes de marché rejouées par seconde réelle (60 = une bougie 1m par seconde)
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1"))
+
+# Provider synthetic: graine, origine fixe de la série (timestamp unix, la même pour
+# tous les workers et redémarrages) et volatilité par minute de la marche aléatoire
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", "42"))
+SYNTHETIC_EPOCH = int(os.getenv("SYNTHETIC_EPOCH", "1735689600"))  # 2025-01-01 UTC
+SYNTHETIC_VOLATILITY = 0.001
+
+# Intervalles yfinance -> secondes, pour les providers qui agrègent du 1m
+INTERVAL_SECONDS = {"1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800,
+                    "60m": 3600, "1h": 3600, "90m": 5400, "1d": 86400}
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class NoDataError(ValueError):
+    """La source a répondu mais n'a aucune donnée pour ce symbole (pas une panne amont)"""
+
+
+@contextmanager
+def _yahoo_errors():
+    """Limitation de débit Yahoo -> ConnectionError: compte comme une panne pour le disjoncteur"""
+    try:
+        yield
+    except YFRateLimitError as e:
+        raise ConnectionError(f"Yahoo rate limit: {e}") from e
+
+
+class PriceProvider:
+    """
+    Interface commune: cotation unitaire, cotations groupées et historique.
+
+    history() retourne un DataFrame au format yfinance (colonnes Open, High,
+    Low, Close, Volume, index DatetimeIndex UTC).
+    """
+
+    name = "base"
+
+    def now(self) -> float:
+        """Horloge du provider (virtuelle pour le replay)"""
+        return time.time()
+
+    def price(self, symbol: str) -> float:
+        raise NotImplementedError
+
+    def prices(self, symbols: list) -> dict:
+        """symbol -> prix, ou l'exception levée pour ce symbole"""
+        out = {}
+        for symbol in symbols:
+            try:
+                out[symbol] = self.price(symbol)
+            except Exception as e:
+                out[symbol] = e
+        return out
+
+    def history(self, symbol: str, period=None, interval="1m", start=None) -> pd.DataFrame:
+        raise NotImplementedError(f"History not available from {self.name} provider")
+
+    def histories(self, symbols: list, period=None, interval="1m", start=None) -> dict:
+        """symbol -> DataFrame history(), ou l'exception levée pour ce symbole"""
+        out = {}
+        for symbol in symbols:
+            try:
+                out[symbol] = self.history(symbol, period=period, interval=interval, start=start)
+            except Exception as e:
+                out[symbol] = e
+        return out
+
+    def snapshot(self, symbols: list) -> dict:
+        """
+        Cotations de tout un marché: symbol -> {"price", "variation", "volume"}.
+
+        Raises:
+            Exception: La première erreur si aucun symbole n'a de prix (un snapshot
+                vide ne doit pas remplacer le dernier snapshot connu dans le cache)
+        """
+        prices = self.prices(symbols)
+        quotes = {
+            symbol: {"price": price, "variation": None, "volume": None}
+            for symbol, price in prices.items()
+            if not isinstance(price, Exception)
+        }
+        if symbols and not quotes:
+            errors = [price for price in prices.values() if isinstance(price, Exception)]
+            raise errors[0] if errors else NoDataError("No price data")
+        return quotes
+
+
+class YahooProvider(PriceProvider):
+    name = "yahoo"
+
+    def price(self, symbol: str) -> float:
+        with _yahoo_errors():
+            t = yf.Ticker(symbol)
+            # fast_info est souvent plus rapide
+            fi = getattr(t, "fast_info", None)
+            if fi and fi.get("lastPrice"):
+                return float(fi["lastPrice"])
+            hist = t.history(period="1d", interval="1m")
+        if hist.empty:
+            raise NoDataError("No price data")
+        return float(hist["Close"].iloc[-1])
+
+    def prices(self, symbols: list) -> dict:
+        # un seul téléchargement multi-tickers
+        with _yahoo_errors():
+            data = yf.download(symbols, period="1d", interval="1m", group_by="ticker",
+                               progress=False, threads=False, auto_adjust=False)
+        out = {}
+        for symbol in symbols:
+            closes = _download_closes(data, symbol)
+            if closes is None or closes.empty:
+                out[symbol] = NoDataError("No price data")
+            else:
+                out[symbol] = float(closes.iloc[-1])
+        return out
+
+    def history(self, symbol: str, period=None, interval="1m", start=None) -> pd.DataFrame:
+        t = yf.Ticker(symbol)
+        with _yahoo_errors():
+            if start is not None:
+                return t.history(start=pd.Timestamp(start, unit="s", tz="UTC"), interval=interval)
+            return t.history(period=period, interval=interval)
+
+    def histories(self, symbols: list, period=None, interval="1m", start=None) -> dict:
+        # un seul téléchargement multi-tickers; start commun (le plus ancien) pour un delta groupé
+        span = {"start": pd.Timestamp(start, unit="s", tz="UTC")} if start is not None else {"period": period}
+        with _yahoo_errors():
+            data = yf.download(symbols, interval=interval, group_by="ticker",
+                               progress=False, threads=False, auto_adjust=False, **span)
+        out = {}
+        for symbol in symbols:
+            # pas de bougie: DataFrame vide, comme history() (aucune nouvelle bougie sur un delta)
+            frame = _download_frame(data, symbol)
+            out[symbol] = frame if frame is not None else pd.DataFrame(columns=OHLCV_COLUMNS)
+        return out
+
+
+class BVCProvider(PriceProvider):
+    name = "bvc"
+
+    def price(self, symbol: str) -> float:
+        from services.bvc import BVC_SYMBOLS, _fetch_real_bvc_price
+        return _fetch_real_bvc_price(BVC_SYMBOLS[symbol]["code"], symbol)
+
+    def prices(self, symbols: list) -> dict:
+        # pages instrument en parallèle (bornées), résultats partiels
+        from services.bvc import fetch_bvc_prices
+        return fetch_bvc_prices(symbols)
+
+    def snapshot(self, symbols: list) -> dict:
+        # une seule page listing pour tout le marché, sinon les pages instrument en parallèle
+        from services.bvc import _fetch_bvc_market
+        try:
+            return _fetch_bvc_market()
+        except Exception as e:
+            print(f"[BVC] Page listing indisponible ({e}), pages instrument en parallèle")
+            return super().snapshot(symbols)
+
+
+class _OneMinuteProvider(PriceProvider):
+    """Base des providers hors ligne: une série 1m par symbole et une horloge"""
+
+    def bars(self, symbol: str) -> np.ndarray:
+        """Bougies 1m (time, open, high, low, close, volume) jusqu'à l'instant courant"""
+        raise NotImplementedError
+
+    def price(self, symbol: str) -> float:
+        bars = self.bars(symbol)
+        if len(bars) == 0:
+            raise NoDataError("No price data")
+        return float(bars[-1, 4])
+
+    def history(self, symbol: str, period=None, interval="1m", start=None) -> pd.DataFrame:
+        bars = self.bars(symbol)
+        if start is None and len(bars):
+            span = period_seconds(period) if period else None
+            start = bars[-1, 0] - span if span else None
+        if start is not None:
+            bars = bars[bars[:, 0] >= start]
+        seconds = INTERVAL_SECONDS.get(interval, 60)
+        rows = resample(bars.tolist(), seconds) if seconds > 60 else bars.tolist()
+        return _rows_frame(rows)
+
+
+class SyntheticProvider(_OneMinuteProvider):
+    """
+    Marche aléatoire géométrique déterministe par symbole, depuis SYNTHETIC_EPOCH.
+
+    Le prix d'une minute ne dépend que de (graine, symbole, minute): tous les
+    workers et tous les redémarrages servent la même série, et le store de
+    bougies partagé reste cohérent. Les clôtures journalières sont une marche
+    aléatoire (un tirage par jour depuis l'origine); chaque journée est un pont
+    brownien entre deux clôtures, généré à la demande pour les SYNTHETIC_DAYS
+    derniers jours seulement.
+    """
+
+    name = "synthetic"
+    SYNTHETIC_DAYS = 7
+    DAY_MINUTES = 1440
+    # Journées (symbole, jour) gardées en mémoire
+    CACHED_DAYS = 1024
+
+    def __init__(self, seed: int = SYNTHETIC_SEED, epoch: int = SYNTHETIC_EPOCH):
+        self.seed = seed
+        self.epoch = int(epoch) - int(epoch) % 86400
+        self._anchors = {}           # symbol -> (rng, log-clôtures journalières depuis l'origine)
+        self._days = OrderedDict()   # (symbol, jour) -> log-prix des minutes du jour
+        self._lock = threading.Lock()
+
+    def bars(self, symbol: str) -> np.ndarray:
+        last = (int(self.now()) - self.epoch) // 60
+        if last < 0:
+            return np.empty((0, 6))
+        first = max(last - self.SYNTHETIC_DAYS * self.DAY_MINUTES, 0)
+        # une minute de plus avant la fenêtre: l'ouverture est la clôture précédente
+        closes = np.exp(self._log_path(symbol, max(first - 1, 0), last))
+        opens = np.r_[closes[0], closes[:-1]]
+        if first > 0:
+            closes, opens = closes[1:], opens[1:]
+        spread = closes * SYNTHETIC_VOLATILITY / 2
+        times = self.epoch + 60 * np.arange(first, last + 1)
+        return np.column_stack([times, opens, np.maximum(opens, closes) + spread,
+                                np.minimum(opens, closes) - spread, closes, np.full(len(closes), 1000.0)])
+
+    def _log_path(self, symbol: str, first: int, last: int) -> np.ndarray:
+        """Log-prix des minutes first..last (incluses) depuis l'origine"""
+        with self._lock:
+            days = [self._day(symbol, day) for day in range(first // self.DAY_MINUTES, last // self.DAY_MINUTES + 1)]
+        offset = first - (first // self.DAY_MINUTES) * self.DAY_MINUTES
+        return np.concatenate(days)[offset:offset + last - first + 1]
+
+    def _day(self, symbol: str, day: int) -> np.ndarray:
+        key = (symbol, day)
+        path = self._days.get(key)
+        if path is None:
+            start, end = self._anchor(symbol, day), self._anchor(symbol, day + 1)
+            rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), day])
+            walk = np.r_[0.0, np.cumsum(rng.normal(0, SYNTHETIC_VOLATILITY, self.DAY_MINUTES))]
+            t = np.arange(self.DAY_MINUTES + 1) / self.DAY_MINUTES
+            # pont brownien: part de la clôture de la veille, arrive sur celle du jour
+            path = (start + walk - t * walk[-1] + t * (end - start))[:-1]
+            self._days[key] = path
+            while len(self._days) > self.CACHED_DAYS:
+                self._days.popitem(last=False)
+        self._days.move_to_end(key)
+        return path
+
+    def _anchor(self, symbol: str, day: int) -> float:
+        """Log-clôture de la veille du jour day (prolongée à la demande, même générateur)"""
+        rng, anchors = self._anchors.get(symbol) or self._new_anchors(symbol)
+        if len(anchors) <= day:
+            steps = rng.normal(0, SYNTHETIC_VOLATILITY * np.sqrt(self.DAY_MINUTES), day + 1 - len(anchors))
+            anchors = np.concatenate([anchors, anchors[-1] + np.cumsum(steps)])
+            self._anchors[symbol] = (rng, anchors)
+        return anchors[day]
+
+    def _new_anchors(self, symbol: str):
+        rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+        base = 20 + rng.random() * 480
+        return rng, np.array([np.log(base)])
+
+
+class ReplayProvider(_OneMinuteProvider):
+    """
+    Rejoue des bougies 1m enregistrées ({REPLAY_DIR}/{SYMBOL}.csv).
+
+    L'horloge virtuelle part de la première bougie du premier symbole chargé, au
+    moment de ce chargement, et avance de `speed` secondes de marché par seconde
+    réelle, et s'arrête sur la dernière bougie enregistrée. Elle repart de la
+    première bougie à chaque démarrage: le store de bougies n'est lu que jusqu'à
+    now() (prices._last_time).
+    """
+
+    name = "replay"
+
+    def __init__(self, directory: str = REPLAY_DIR, speed: float = REPLAY_SPEED):
+        self.directory = directory
+        self.speed = speed
+        self._data = {}
+        self._lock = threading.Lock()
+        self._wall_start = None
+        self._virtual_start = None
+
+    def load(self, symbol: str) -> np.ndarray:
+        with self._lock:
+            if symbol not in self._data:
+                path = os.path.join(self.directory, f"{symbol}.csv")
+                if not os.path.exists(path):
+                    raise NoDataError(f"No recording for {symbol}")
+                frame = pd.read_csv(path)
+                bars = frame[["time", "open", "high", "low", "close", "volume"]].to_numpy(dtype=np.float64)
+                self._data[symbol] = bars[np.argsort(bars[:, 0], kind="stable")]
+                if self._virtual_start is None:
+                    # les deux origines au même instant: l'horloge part bien de la première bougie
+                    self._wall_start, self._virtual_start = time.time(), self._data[symbol][0, 0]
+            return self._data[symbol]
+
+    def now(self) -> float:
+        if self._virtual_start is None:
+            return time.time()
+        return self._virtual_start + (time.time() - self._wall_start) * self.speed
+
+    def bars(self, symbol: str) -> np.ndarray:
+        bars = self.load(symbol)
+        # avant la première bougie, on sert la première bougie
+        return bars[: max(np.searchsorted(bars[:, 0], self.now(), side="right"), 1)]
+
+
+def record_history(symbol: str, period="5d", interval="1m", directory: str = REPLAY_DIR, provider=None) -> str:
+    """Enregistre l'historique d'un symbole au format lu par ReplayProvider"""
+    provider = provider or YahooProvider()
+    hist = provider.history(symbol, period=period, interval=interval)
+    if hist is None or hist.empty:
+        raise NoDataError(f"No history data for {symbol}")
+    os.makedirs(directory, exist_ok=True)
+    frame = pd.DataFrame({
+        "time": hist.index.as_unit("s").asi8,
+        "open": hist["Open"].to_numpy(),
+        "high": hist["High"].to_numpy(),
+        "low": hist["Low"].to_numpy(),
+        "close": hist["Close"].to_numpy(),
+        "volume": hist["Volume"].to_numpy() if "Volume" in hist.columns else 0.0,
+    })
+    path = os.path.join(directory, f"{symbol}.csv")
+    frame.to_csv(path, index=False)
+    return path
+
+
+PROVIDERS = {
+    "yahoo": YahooProvider,
+    "bvc": BVCProvider,
+    "replay": ReplayProvider,
+    "synthetic": SyntheticProvider,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_provider(market: str = "YAHOO") -> PriceProvider:
+    """Provider configuré pour un marché (YAHOO | BVC), instancié une fois par process"""
+    name = BVC_PROVIDER if market.upper() == "BVC" else YAHOO_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown price provider {name}. Available: {', '.join(PROVIDERS)}")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = PROVIDERS[name]()
+        return _instances[name]
+
+
+def _download_closes(data, ticker: str):
+    """Extrait la série Close d'un ticker depuis le DataFrame de yf.download"""
+    if data is None or data.empty:
+        return None
+    if data.columns.nlevels > 1:
+        if ticker not in data.columns.get_level_values(0):
+            return None
+        return data[ticker]["Close"].dropna()
+    return data["Close"].dropna()
+
+
+def _download_frame(data, ticker: str):
+    """Extrait les colonnes OHLCV d'un ticker depuis le DataFrame de yf.download"""
+    if data is None or data.empty:
+        return None
+    if data.columns.nlevels > 1:
+        if ticker not in data.columns.get_level_values(0):
+            return None
+        data = data[ticker]
+    return data.dropna(subset=["Close"])
+
+
+def _rows_frame(rows) -> pd.DataFrame:
+    """[(time, open, high, low, close, volume)] -> DataFrame au format yfinance"""
+    frame = pd.DataFrame([r[1:] for r in rows], columns=OHLCV_COLUMNS, dtype=np.float64)
+    frame.index = pd.to_datetime([int(r[0]) for r in rows], unit="s", utc=True)
+    return frame
@@ -0,0 +1,98 @@
+import threading
+import time
+from services.bvc import get_bvc_snapshot, get_bvc_instrument_quotes, BVC_SYMBOLS, BVC_SNAPSHOT_TTL, BVC_MAX_STALE
+
+# Âge max du snapshot chargé dans le carnet BVC: avec un rafraîchissement tous les
+# tiers de TTL, une cotation du carnet a moins d'un TTL (fraîche pour l'exécution)
+# tant que la source répond
+BVC_BOOK_MAX_AGE = BVC_SNAPSHOT_TTL / 2
+
+
+class QuoteBook:
+    """
+    Carnet de cotations en mémoire, rafraîchi par un thread de fond.
+
+    Les ordres lisent le dernier prix par simple lookup de dictionnaire:
+    aucun scraping n'a lieu pendant l'exécution d'un ordre. Le thread est
+    démarré au premier usage (après le fork des workers gunicorn).
+    """
+
+    def __init__(self, name: str, refresh, interval: float, max_age: float):
+        self.name = name
+        self.refresh = refresh
+        self.interval = interval
+        self.max_age = max_age
+        self._quotes = {}          # symbol -> (price, updated_at)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+
+    def get(self, symbol: str, wait: float = 15, max_age: float = None):
+        """
+        Retourne (prix, âge en secondes) pour symbol.
+
+        max_age: âge max accepté (self.max_age par défaut); les prix d'exécution
+        demandent une cotation fraîche.
+
+        Raises:
+            ValueError: Si aucun prix assez récent n'est disponible
+        """
+        self._ensure_started()
+        entry = self._quotes.get(symbol)
+        if entry is None and not self._ready.is_set():
+            # premier ordre après démarrage: attendre le premier chargement du carnet
+            self._ready.wait(wait)
+            entry = self._quotes.get(symbol)
+        if entry is None:
+            raise ValueError(f"No {self.name} quote for {symbol}")
+        age = time.time() - entry[1]
+        if age > (self.max_age if max_age is None else max_age):
+            raise ValueError(f"{self.name} quote for {symbol} is too old ({age:.0f}s)")
+        return entry[0], age
+
+    def update(self, quotes: dict):
+        """quotes: symbol -> (prix, âge en secondes); une cotation plus ancienne n'écrase pas la courante"""
+        now = time.time()
+        with self._lock:
+            for symbol, (price, age) in quotes.items():
+                current = self._quotes.get(symbol)
+                if current is None or now - age >= current[1]:
+                    self._quotes[symbol] = (price, now - age)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-quote-book", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.update(self.refresh())
+            except Exception as e:
+                print(f"[QUOTE BOOK] Rafraîchissement {self.name} échoué: {e}")
+            finally:
+                self._ready.set()
+            time.sleep(self.interval)
+
+
+def refresh_bvc_quotes() -> dict:
+    """Cotations (prix, âge) de tous les symboles BVC: snapshot du marché, pages instrument pour les absents"""
+    try:
+        # pas de snapshot stale dans le carnet: les ordres y lisent des prix d'exécution
+        snapshot = get_bvc_snapshot(max_age=BVC_BOOK_MAX_AGE)
+        quotes = {symbol: (quote["price"], snapshot["age"]) for symbol, quote in snapshot["quotes"].items()}
+    except Exception as e:
+        print(f"[QUOTE BOOK] Snapshot BVC indisponible: {e}")
+        quotes = {}
+    missing = [symbol for symbol in BVC_SYMBOLS if symbol not in quotes]
+    if missing:
+        fetched = get_bvc_instrument_quotes(missing, max_age=BVC_BOOK_MAX_AGE)
+        quotes.update({s: (q["price"], q["age"]) for s, q in fetched.items() if not isinstance(q, Exception)})
+    return quotes
+
+
+# rafraîchi trois fois par TTL du snapshot
+bvc_book = QuoteBook("BVC", refresh_bvc_quotes, interval=BVC_SNAPSHOT_TTL / 3, max_age=BVC_MAX_STALE)
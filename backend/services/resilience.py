@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+
+# Échecs consécutifs avant ouverture du circuit, et durée d'ouverture (secondes)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+
+# Erreurs qui comptent comme une panne de la source: transport, timeout et HTTP
+# (requests, curl_cffi, socket: sous-classes d'OSError). Une réponse valide sans
+# données pour un symbole (ValueError...) n'ouvre pas le circuit: sinon quelques
+# requêtes sur un ticker inexistant couperaient les prix de toute la plateforme.
+UPSTREAM_ERRORS = (OSError,)
+
+
+class CircuitOpenError(Exception):
+    """La source est en panne: l'appel est refusé sans toucher le réseau"""
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur par source externe (closed -> open -> half_open -> closed).
+
+    Après `failure_threshold` échecs consécutifs, les appels échouent
+    immédiatement pendant `reset_timeout` secondes; ensuite un seul appel
+    d'essai est autorisé et referme le circuit s'il réussit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "rejected": 0,
+            "client_errors": 0,
+            "stale_served": 0,
+            "total_latency": 0.0,
+        }
+        self.last_error = None
+        self.last_success_at = None
+        self.last_failure_at = None
+
+    def call(self, fn, *args, **kwargs):
+        self._before_call()
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except UPSTREAM_ERRORS as e:
+            self._on_failure(e, time.monotonic() - started)
+            raise
+        except Exception:
+            # la source a répondu (symbole inconnu, pas de données): elle n'est pas en panne
+            self._on_success(time.monotonic() - started, client_error=True)
+            raise
+        self._on_success(time.monotonic() - started)
+        return result
+
+    def record_stale(self):
+        with self._lock:
+            self.counters["stale_served"] += 1
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpenError(f"{self.name} indisponible (circuit ouvert)")
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self.trial_running:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpenError(f"{self.name} indisponible (essai en cours)")
+                self.trial_running = True
+            self.counters["calls"] += 1
+
+    def _on_success(self, latency: float, client_error: bool = False):
+        with self._lock:
+            self.counters["client_errors" if client_error else "successes"] += 1
+            self.counters["total_latency"] += latency
+            self.consecutive_failures = 0
+            self.trial_running = False
+            self.state = "closed"
+            self.last_success_at = time.time()
+
+    def _on_failure(self, error: Exception, latency: float):
+        with self._lock:
+            self.counters["failures"] += 1
+            self.counters["total_latency"] += latency
+            self.consecutive_failures += 1
+            self.trial_running = False
+            self.last_error = str(error)
+            self.last_failure_at = time.time()
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"[CIRCUIT] {self.name} ouvert après {self.consecutive_failures} échecs: {error}")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def health(self) -> dict:
+        with self._lock:
+            calls = self.counters["calls"]
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                **{k: v for k, v in self.counters.items() if k != "total_latency"},
+                "avg_latency_ms": round(self.counters["total_latency"] / calls * 1000, 1) if calls else None,
+                "last_error": self.last_error,
+                "last_success_at": self.last_success_at,
+                "last_failure_at": self.last_failure_at,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(source: str) -> CircuitBreaker:
+    """Disjoncteur partagé d'une source (yahoo, bvc...)"""
+    with _breakers_lock:
+        if source not in _breakers:
+            _breakers[source] = CircuitBreaker(source)
+        return _breakers[source]
+
+
+def get_sources_health() -> dict:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.health() for b in breakers}
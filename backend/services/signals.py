@@ -1,42 +1,386 @@
-import yfinance as yf
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from services.prices import (get_yahoo_history_columns, history_complete_until, prefetch_history,
+                             HISTORY_REFRESH_TTL, RESAMPLE_SECONDS)
+from services.indicators import compute_indicators
+
+# Nombre max d'états (ticker, fast, slow) / (ticker, stratégie) gardés en mémoire (LRU)
+SIGNAL_STATE_SIZE = int(os.getenv("SIGNAL_STATE_SIZE", "1024"))
+SIGNAL_PERIOD = "5d"
+SIGNAL_INTERVAL = "15m"
+# Stop loss / take profit à k ATR du dernier prix
+ATR_PERIOD = 14
+ATR_STOP_MULT = float(os.getenv("ATR_STOP_MULT", "1.5"))
+ATR_TAKE_MULT = float(os.getenv("ATR_TAKE_MULT", "3"))
+
+STRATEGIES = ("sma", "ema", "rsi", "macd", "bollinger")
+
 
 def sma(values, n):
     if len(values) < n:
         return None
     return sum(values[-n:]) / n
 
-def sma_crossover_signal(ticker: str, fast=5, slow=20):
-    t = yf.Ticker(ticker)
-    hist = t.history(period="5d", interval="15m")  # assez de points
-    if hist is None or hist.empty:
-        raise ValueError("No history data for signal")
 
-    closes = [float(x) for x in hist["Close"].tolist()]
-    last_price = closes[-1]
+class RollingSMA:
+    """Moyenne mobile sur fenêtre glissante: somme courante, O(1) par valeur"""
 
-    fast_sma = sma(closes, fast)
-    slow_sma = sma(closes, slow)
-    if fast_sma is None or slow_sma is None:
-        raise ValueError("Not enough data to compute SMA")
+    def __init__(self, n: int):
+        self.n = n
+        self.window = deque(maxlen=n)
+        self.total = 0.0
+
+    def push(self, value: float):
+        if len(self.window) == self.n:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+
+    @property
+    def value(self):
+        if len(self.window) < self.n:
+            return None
+        return self.total / self.n
+
+
+class RollingATR:
+    """ATR de Wilder incrémental, identique à services.indicators.atr"""
+
+    def __init__(self, n: int = ATR_PERIOD):
+        self.n = n
+        self.count = 0
+        self.total = 0.0
+        self.prev_close = None
+        self.value = None
+
+    def push(self, high: float, low: float, close: float):
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+        if self.count < self.n:
+            self.total += tr
+        elif self.count == self.n:
+            self.value = (self.total + tr) / self.n
+        else:
+            self.value += (tr - self.value) / self.n
+
+
+class _CrossoverState:
+    """État d'un couple (fast, slow) sur un ticker, alimenté bougie clôturée par bougie clôturée"""
+
+    def __init__(self, fast: int, slow: int):
+        self.fast = RollingSMA(fast)
+        self.slow = RollingSMA(slow)
+        self.atr = RollingATR()
+        self.last_time = None      # début de la dernière bougie clôturée intégrée
+        self.last_close = None
+        self.result = None
+        self.valid_until = 0.0     # pas de relecture de l'historique avant cette date
+        self.lock = threading.Lock()
+
+
+class _LRUStates:
+    """États de signal par clé, bornés en LRU"""
+
+    def __init__(self, factory, maxsize: int = SIGNAL_STATE_SIZE):
+        self.factory = factory
+        self.maxsize = maxsize
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = self.factory(key)
+                while len(self._states) > self.maxsize:
+                    self._states.popitem(last=False)
+            else:
+                self._states.move_to_end(key)
+            return state
+
+
+class SMACrossoverEngine:
+    """
+    Signaux de croisement SMA incrémentaux.
+
+    Chaque (ticker, fast, slow) garde ses fenêtres glissantes; seules les
+    bougies clôturées depuis le dernier appel sont intégrées. Le résultat est
+    servi depuis la mémoire jusqu'à la clôture de la bougie suivante.
+    """
+
+    def __init__(self, period: str = SIGNAL_PERIOD, interval: str = SIGNAL_INTERVAL,
+                 maxsize: int = SIGNAL_STATE_SIZE):
+        self.period = period
+        self.interval = interval
+        self.seconds = RESAMPLE_SECONDS[interval]
+        self._states = _LRUStates(lambda key: _CrossoverState(key[1], key[2]), maxsize)
+
+    def cached(self, ticker: str, fast: int, slow: int):
+        """Résultat encore valide (bougie en cours non clôturée), sinon None"""
+        state = self._states.get((ticker, fast, slow))
+        return state.result if time.time() < state.valid_until else None
+
+    def signal(self, ticker: str, fast: int, slow: int) -> dict:
+        if fast < 1 or slow < 1:
+            raise ValueError("fast and slow must be positive")
+        state = self._states.get((ticker, fast, slow))
+        if state.result is not None and time.time() < state.valid_until:
+            return state.result
+        with state.lock:
+            now = time.time()
+            if state.result is None or now >= state.valid_until:
+                self._advance(state, ticker, now)
+            if state.result is None:
+                raise ValueError("Not enough data to compute SMA")
+            return state.result
+
+    def _advance(self, state: _CrossoverState, ticker: str, now: float):
+        try:
+            history = get_yahoo_history_columns(ticker, period=self.period, interval=self.interval, limit=None)
+        except ValueError:
+            if state.result is None:
+                raise ValueError("No history data for signal")
+            history = {"time": (), "high": (), "low": (), "close": ()}
+
+        # une bougie n'est intégrée qu'une fois clôturée et couverte par les données 1m synchronisées
+        complete = min(now, history_complete_until(ticker, self.period, self.interval))
+        added = 0
+        for bar_time, high, low, close in zip(history["time"], history["high"], history["low"], history["close"]):
+            if bar_time + self.seconds > complete:
+                break
+            if state.last_time is not None and bar_time <= state.last_time:
+                continue
+            state.fast.push(close)
+            state.slow.push(close)
+            state.atr.push(high, low, close)
+            state.last_time = bar_time
+            state.last_close = close
+            added += 1
+
+        if added:
+            state.result = _crossover_result(ticker, state)
+        state.valid_until = _next_refresh(state.last_time if added else None, self.seconds, now)
+
+
+class IndicatorSignalEngine:
+    """
+    Signaux des stratégies vectorisées (EMA, RSI, MACD, Bollinger).
+
+    Les indicateurs sont recalculés en un passage NumPy sur les bougies
+    clôturées, une fois par bougie; le résultat est servi depuis la mémoire
+    jusqu'à la clôture suivante.
+    """
+
+    def __init__(self, period: str = SIGNAL_PERIOD, interval: str = SIGNAL_INTERVAL,
+                 maxsize: int = SIGNAL_STATE_SIZE):
+        self.period = period
+        self.interval = interval
+        self.seconds = RESAMPLE_SECONDS[interval]
+        self._states = _LRUStates(lambda key: {"result": None, "valid_until": 0.0, "lock": threading.Lock()},
+                                  maxsize)
+
+    def cached(self, ticker: str, strategy: str):
+        """Résultat encore valide (bougie en cours non clôturée), sinon None"""
+        state = self._states.get((ticker, strategy))
+        return state["result"] if time.time() < state["valid_until"] else None
+
+    def signal(self, ticker: str, strategy: str) -> dict:
+        state = self._states.get((ticker, strategy))
+        if state["result"] is not None and time.time() < state["valid_until"]:
+            return state["result"]
+        with state["lock"]:
+            now = time.time()
+            if state["result"] is None or now >= state["valid_until"]:
+                try:
+                    result = self._compute(ticker, strategy, now)
+                except ValueError:
+                    if state["result"] is None:
+                        raise
+                    result = None
+                if result is not None:
+                    state["result"] = result
+                last_time = result["bar_time"] if result is not None else None
+                state["valid_until"] = _next_refresh(last_time, self.seconds, now)
+            if state["result"] is None:
+                raise ValueError(f"Not enough data to compute {strategy}")
+            return state["result"]
+
+    def _compute(self, ticker: str, strategy: str, now: float):
+        try:
+            history = get_yahoo_history_columns(ticker, period=self.period, interval=self.interval, limit=None)
+        except ValueError:
+            raise ValueError("No history data for signal")
+        # bougies clôturées et couvertes par les données 1m synchronisées
+        complete = min(now, history_complete_until(ticker, self.period, self.interval))
+        closed = bisect_right(history["time"], complete - self.seconds)
+        if closed == 0:
+            return None
+
+        values = compute_indicators({k: history[k][:closed] for k in ("high", "low", "close")})
+        last = {name: _scalar(column[-1]) for name, column in values.items()}
+        signal, indicators = _STRATEGY_RULES[strategy](last)
+        if signal is None:
+            return None
+        return _result(ticker, history["time"][closed - 1], last["close"], signal, indicators, last["atr"],
+                       strategy)
+
+
+def _ema_rule(v):
+    if v["ema_slow"] is None:
+        return None, None
+    return _compare(v["ema_fast"], v["ema_slow"]), {"fast_ema": v["ema_fast"], "slow_ema": v["ema_slow"]}
 
-    # signal simple
-    if fast_sma > slow_sma:
+
+def _rsi_rule(v):
+    if v["rsi"] is None:
+        return None, None
+    if v["rsi"] < 30:
+        signal = "BUY"
+    elif v["rsi"] > 70:
+        signal = "SELL"
+    else:
+        signal = "NEUTRAL"
+    return signal, {"rsi": v["rsi"]}
+
+
+def _macd_rule(v):
+    if v["macd_signal"] is None:
+        return None, None
+    return _compare(v["macd"], v["macd_signal"]), \
+        {"macd": v["macd"], "macd_signal": v["macd_signal"], "macd_hist": v["macd_hist"]}
+
+
+def _bollinger_rule(v):
+    if v["bb_mid"] is None:
+        return None, None
+    if v["close"] < v["bb_lower"]:
         signal = "BUY"
-    elif fast_sma < slow_sma:
+    elif v["close"] > v["bb_upper"]:
         signal = "SELL"
     else:
         signal = "NEUTRAL"
+    return signal, {"bb_mid": v["bb_mid"], "bb_upper": v["bb_upper"], "bb_lower": v["bb_lower"]}
+
+
+_STRATEGY_RULES = {
+    "ema": _ema_rule,
+    "rsi": _rsi_rule,
+    "macd": _macd_rule,
+    "bollinger": _bollinger_rule,
+}
+
+
+def _compare(fast, slow) -> str:
+    if fast > slow:
+        return "BUY"
+    if fast < slow:
+        return "SELL"
+    return "NEUTRAL"
+
+
+def _scalar(value):
+    value = float(value)
+    return None if value != value else value
+
+
+def _next_refresh(last_time, seconds: int, now: float) -> float:
+    """Date de la prochaine clôture attendue, au plus tôt dans HISTORY_REFRESH_TTL"""
+    # marché fermé ou source en retard: on réessaie plus tard sans relire à chaque appel
+    if last_time is None:
+        return now + HISTORY_REFRESH_TTL
+    return max(last_time + 2 * seconds, now + HISTORY_REFRESH_TTL)
+
+
+def _stops(price: float, atr_value, signal: str):
+    """Stop loss / take profit à ATR_STOP_MULT / ATR_TAKE_MULT ATR du prix, dans le sens du signal"""
+    if atr_value is None:
+        # pas assez de bougies pour l'ATR: pourcentages fixes
+        risk, reward = price * 0.01, price * 0.02
+    else:
+        risk, reward = atr_value * ATR_STOP_MULT, atr_value * ATR_TAKE_MULT
+    if signal == "SELL":
+        return price + risk, price - reward
+    return price - risk, price + reward
 
-    # exemple stop loss / take profit “basique”
-    stop_loss = last_price * 0.99
-    take_profit = last_price * 1.02
 
+def _result(ticker, bar_time, last_price, signal, indicators, atr_value, strategy):
+    stop_loss, take_profit = _stops(last_price, atr_value, signal)
     return {
         "symbol": ticker,
+        "strategy": strategy,
         "last_price": last_price,
-        "fast_sma": fast_sma,
-        "slow_sma": slow_sma,
+        "bar_time": bar_time,
+        **indicators,
+        "atr": atr_value,
         "signal": signal,
         "suggested_stop_loss": stop_loss,
         "suggested_take_profit": take_profit
     }
+
+
+def _crossover_result(ticker: str, state: _CrossoverState):
+    fast_sma = state.fast.value
+    slow_sma = state.slow.value
+    if fast_sma is None or slow_sma is None:
+        return None
+    return _result(ticker, state.last_time, state.last_close, _compare(fast_sma, slow_sma),
+                   {"fast_sma": fast_sma, "slow_sma": slow_sma}, state.atr.value, "sma")
+
+
+sma_engine = SMACrossoverEngine()
+indicator_engine = IndicatorSignalEngine()
+
+
+def sma_crossover_signal(ticker: str, fast=5, slow=20):
+    """Signal de croisement SMA sur bougies 15m clôturées, servi depuis l'état incrémental"""
+    return sma_engine.signal(ticker, fast, slow)
+
+
+def get_signal(ticker: str, strategy: str = "sma", fast=5, slow=20):
+    """Signal de la stratégie demandée (sma, ema, rsi, macd, bollinger)"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy} (expected one of {', '.join(STRATEGIES)})")
+    if strategy == "sma":
+        return sma_crossover_signal(ticker, fast=fast, slow=slow)
+    return indicator_engine.signal(ticker, strategy)
+
+
+def get_signals(tickers: list, strategy: str = "sma", fast=5, slow=20) -> dict:
+    """
+    Signaux d'une liste de symboles: ticker -> résultat, ou l'exception levée.
+
+    Les signaux encore valides sont servis depuis la mémoire; les historiques
+    des autres sont synchronisés en un téléchargement groupé avant le calcul.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy} (expected one of {', '.join(STRATEGIES)})")
+    if fast < 1 or slow < 1:
+        raise ValueError("fast and slow must be positive")
+
+    results, due = {}, []
+    for ticker in tickers:
+        if strategy == "sma":
+            cached = sma_engine.cached(ticker, fast, slow)
+        else:
+            cached = indicator_engine.cached(ticker, strategy)
+        if cached is not None:
+            results[ticker] = cached
+        else:
+            due.append(ticker)
+
+    if due:
+        # échecs du téléchargement groupé: chaque symbole retente unitairement (ou sert le store)
+        for ticker, error in prefetch_history(due, SIGNAL_PERIOD, SIGNAL_INTERVAL).items():
+            print(f"[SIGNALS] Synchro groupée échouée pour {ticker}: {error}")
+        for ticker in due:
+            try:
+                results[ticker] = get_signal(ticker, strategy, fast=fast, slow=slow)
+            except Exception as e:
+                results[ticker] = e
+    return results
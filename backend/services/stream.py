@@ -0,0 +1,128 @@
+import os
+import queue
+import threading
+import time
+from services.prices import get_yahoo_prices
+from services.bvc import get_bvc_snapshot, get_bvc_instrument_quotes, BVC_SYMBOLS
+
+# Intervalle de la boucle de fetch partagée (secondes)
+STREAM_INTERVAL = float(os.getenv("STREAM_INTERVAL", "2"))
+# Nombre max de symboles par abonnement (SSE) ou par connexion (passerelle WebSocket)
+STREAM_MAX_SYMBOLS = int(os.getenv("STREAM_MAX_SYMBOLS", "50"))
+# Nombre max d'événements en attente par abonné avant de jeter les plus anciens
+STREAM_QUEUE_SIZE = 100
+
+
+class QuoteHub:
+    """
+    Boucle de fetch unique par process qui diffuse les cotations aux abonnés.
+
+    Chaque symbole est récupéré une fois par intervalle quel que soit le nombre
+    d'abonnés; chaque abonné reçoit les mises à jour dans sa propre queue.
+    """
+
+    def __init__(self, interval: float = STREAM_INTERVAL):
+        self.interval = interval
+        self._subs = {}      # symbol -> set(queue.Queue)
+        self._last = {}      # symbol -> dernier événement diffusé
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, symbols: list) -> queue.Queue:
+        q = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        with self._lock:
+            for symbol in symbols:
+                self._subs.setdefault(symbol, set()).add(q)
+                if symbol in self._last:
+                    q.put_nowait(self._last[symbol])
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="quote-hub", daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q: queue.Queue, symbols: list):
+        with self._lock:
+            for symbol in symbols:
+                subs = self._subs.get(symbol)
+                if subs is None:
+                    continue
+                subs.discard(q)
+                if not subs:
+                    del self._subs[symbol]
+                    self._last.pop(symbol, None)
+
+    def publish(self, event: dict):
+        """Diffuse un événement {symbol, ...} à tous les abonnés du symbole"""
+        symbol = event["symbol"]
+        with self._lock:
+            previous = self._last.get(symbol)
+            if symbol not in self._subs:
+                return
+            self._last[symbol] = event
+            if previous is not None and previous.get("price") == event.get("price") \
+                    and previous.get("error") == event.get("error"):
+                return
+            targets = list(self._subs[symbol])
+        for q in targets:
+            _offer(q, event)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                symbols = list(self._subs.keys())
+            if symbols:
+                try:
+                    for event in fetch_quotes(symbols):
+                        self.publish(event)
+                except Exception as e:
+                    print(f"[STREAM] Erreur boucle de fetch: {e}")
+            time.sleep(self.interval)
+
+
+def fetch_quotes(symbols: list) -> list:
+    """Récupère les cotations (Yahoo en batch, BVC par symbole) sous forme d'événements"""
+    bvc = [s for s in symbols if s in BVC_SYMBOLS]
+    yahoo = [s for s in symbols if s not in BVC_SYMBOLS]
+    now = int(time.time())
+    events = []
+
+    if yahoo:
+        for symbol, quote in get_yahoo_prices(yahoo).items():
+            events.append({"symbol": symbol, "market": "YAHOO", "time": now, **quote})
+
+    if bvc:
+        # une seule page pour tout le marché BVC, page instrument pour les symboles absents
+        try:
+            snapshot = get_bvc_snapshot()["quotes"]
+        except Exception:
+            snapshot = {}
+        prices = {symbol: quote["price"] for symbol, quote in snapshot.items()}
+        missing = [symbol for symbol in bvc if symbol not in prices]
+        if missing:
+            quotes = get_bvc_instrument_quotes(missing)
+            prices.update({s: q if isinstance(q, Exception) else q["price"] for s, q in quotes.items()})
+        for symbol in bvc:
+            price = prices[symbol]
+            if isinstance(price, Exception):
+                events.append({"symbol": symbol, "market": "BVC", "time": now, "error": str(price)})
+            else:
+                events.append({"symbol": symbol, "market": "BVC", "time": now,
+                               "price": price, "currency": "MAD"})
+
+    return events
+
+
+def _offer(q: queue.Queue, event: dict):
+    """Ajoute sans bloquer; un client lent perd ses événements les plus anciens"""
+    while True:
+        try:
+            q.put_nowait(event)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+quote_hub = QuoteHub()
@@ -0,0 +1,102 @@
+"""
+Historique des trades paginé par clé (keyset) sur (opened_at, id), du plus récent au plus ancien.
+
+Chaque page est une requête bornée qui reprend après le dernier trade de la
+page précédente (curseur opaque): pas d'OFFSET, coût constant quelle que soit
+la profondeur, et l'export NDJSON enchaîne les pages sans jamais garder plus
+d'une page en mémoire.
+"""
+import base64
+import os
+from datetime import datetime
+from sqlalchemy import and_, or_
+from models import db, Trade
+
+# Taille de page par défaut et maximale de GET /api/trades (aussi taille des lots de l'export)
+TRADE_PAGE_SIZE = int(os.getenv("TRADE_PAGE_SIZE", "100"))
+TRADE_PAGE_MAX = int(os.getenv("TRADE_PAGE_MAX", "1000"))
+
+_COLUMNS = (Trade.id, Trade.challenge_id, Trade.symbol, Trade.market, Trade.side, Trade.qty,
+            Trade.entry_price, Trade.exit_price, Trade.pnl, Trade.status, Trade.opened_at, Trade.closed_at)
+
+
+def encode_cursor(opened_at: datetime, trade_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{opened_at.isoformat()}|{trade_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Raises:
+        ValueError: Si le curseur n'a pas été produit par encode_cursor
+    """
+    try:
+        opened_at, trade_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(opened_at), int(trade_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def trade_filters(challenge_ids: list, status=None, symbol=None, start=None, end=None) -> list:
+    """
+    Conditions SQL: challenges, statut, symbole, start <= opened_at < end.
+
+    Les trades sans opened_at (lignes antérieures au défaut de la colonne, voir
+    migrate_trade_index.py) sont exclus: ils n'ont pas de place dans l'ordre du curseur.
+    Les symboles sont stockés en majuscules, comparés sur la colonne brute.
+    """
+    filters = [Trade.challenge_id.in_(challenge_ids), Trade.opened_at.isnot(None)]
+    if status:
+        filters.append(Trade.status == status.upper())
+    if symbol:
+        filters.append(Trade.symbol == symbol.strip().upper())
+    if start:
+        filters.append(Trade.opened_at >= start)
+    if end:
+        filters.append(Trade.opened_at < end)
+    return filters
+
+
+def trade_page(filters: list, cursor: str = None, limit: int = TRADE_PAGE_SIZE) -> tuple:
+    """
+    Une page de trades après cursor.
+
+    Returns:
+        (liste de dicts, curseur de la page suivante ou None si c'est la dernière)
+    """
+    query = db.session.query(*_COLUMNS).filter(*filters)
+    if cursor:
+        opened_at, trade_id = decode_cursor(cursor)
+        query = query.filter(or_(Trade.opened_at < opened_at,
+                                 and_(Trade.opened_at == opened_at, Trade.id < trade_id)))
+    # une ligne de plus que demandé indique s'il reste une page
+    rows = query.order_by(Trade.opened_at.desc(), Trade.id.desc()).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].opened_at, rows[-1].id) if more else None
+    return [trade_json(row) for row in rows], next_cursor
+
+
+def iter_trades(filters: list, cursor: str = None, batch: int = TRADE_PAGE_MAX):
+    """Tous les trades après cursor, page par page (mémoire bornée à un lot)"""
+    while True:
+        trades, cursor = trade_page(filters, cursor, batch)
+        yield from trades
+        if cursor is None:
+            return
+
+
+def trade_json(t) -> dict:
+    return {
+        "id": t.id,
+        "challenge_id": t.challenge_id,
+        "symbol": t.symbol,
+        "market": t.market,
+        "side": t.side,
+        "qty": t.qty,
+        "entry_price": t.entry_price,
+        "exit_price": t.exit_price,
+        "pnl": t.pnl,
+        "status": t.status,
+        "opened_at": t.opened_at.isoformat() if t.opened_at else None,
+        "closed_at": t.closed_at.isoformat() if t.closed_at else None,
+    }
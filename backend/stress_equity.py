@@ -0,0 +1,146 @@
+"""
+Test de charge concurrent des mutations d'equity (open/close).
+
+Lance N processus (comme N workers gunicorn) x M threads qui ouvrent puis
+ferment des trades sur le même challenge, avec deux clôtures concurrentes
+par trade. Vérifie ensuite en base:
+
+    equity == starting_balance - Σ entry_price * qty (OPEN) + Σ pnl (CLOSED)
+
+qu'une seule des clôtures concurrentes a restitué les fonds, et que le
+journal d'equity (services/ledger.py) reconstruit la même equity.
+
+    python stress_equity.py [--workers 4] [--orders 8] [--rounds 10]
+
+Utilise DATABASE_URL (SQLite instance/stress.db par défaut, base recréée) et
+les providers synthétiques (aucun appel réseau) sauf si YAHOO_PROVIDER est défini.
+"""
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("YAHOO_PROVIDER", "synthetic")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "stress.db"))
+
+from flask_jwt_extended import create_access_token
+from app import create_app
+from services import ledger
+from models import db, User, Plan, UserChallenge, Trade
+
+SYMBOLS = ["AAPL", "TSLA", "MSFT", "BTC-USD"]
+STARTING_BALANCE = 1_000_000.0
+
+
+def option(args, name, default):
+    if name in args:
+        return int(args[args.index(name) + 1])
+    return default
+
+
+def setup():
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(email="stress@tradesense.local", password_hash="-")
+        plan = Plan(name="Stress", price_dh=0, starting_balance=STARTING_BALANCE)
+        db.session.add_all([user, plan])
+        db.session.commit()
+        ch = UserChallenge(user_id=user.id, plan_id=plan.id, starting_balance=STARTING_BALANCE,
+                           equity=STARTING_BALANCE, day_start_equity=STARTING_BALANCE)
+        db.session.add(ch)
+        db.session.commit()
+        return user.id, ch.id
+
+
+def worker(user_id, challenge_id, orders, rounds, results):
+    app = create_app()
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+    stats = {"opened": 0, "closed": 0, "double_closes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def close(client, trade_id, outcome):
+        r = client.post("/api/trades/close", json={"trade_id": trade_id}, headers=headers)
+        outcome.append(r.status_code)
+
+    def run(n):
+        client = app.test_client()
+        for i in range(rounds):
+            side = "BUY" if (n + i) % 2 == 0 else "SELL"
+            r = client.post("/api/trades/open", headers=headers, json={
+                "challenge_id": challenge_id, "symbol": SYMBOLS[(n + i) % len(SYMBOLS)], "side": side, "qty": 1})
+            if r.status_code != 201:
+                with lock:
+                    stats["errors"] += 1
+                continue
+            trade_id = r.get_json()["trade_id"]
+            # deux clôtures simultanées du même trade: une seule doit réussir
+            outcome = []
+            pair = [threading.Thread(target=close, args=(app.test_client(), trade_id, outcome)) for _ in range(2)]
+            for t in pair:
+                t.start()
+            for t in pair:
+                t.join()
+            with lock:
+                stats["opened"] += 1
+                stats["closed"] += outcome.count(200)
+                stats["double_closes"] += outcome.count(200) > 1
+                stats["errors"] += sum(1 for code in outcome if code not in (200, 400))
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(orders)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put(stats)
+
+
+def main():
+    args = sys.argv[1:]
+    workers = option(args, "--workers", 4)
+    orders = option(args, "--orders", 8)
+    rounds = option(args, "--rounds", 10)
+
+    user_id, challenge_id = setup()
+    results = multiprocessing.Queue()
+    started = time.perf_counter()
+    procs = [multiprocessing.Process(target=worker, args=(user_id, challenge_id, orders, rounds, results))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    totals = {}
+    for _ in procs:
+        for k, v in results.get().items():
+            totals[k] = totals.get(k, 0) + v
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    app = create_app()
+    with app.app_context():
+        ch = db.session.get(UserChallenge, challenge_id)
+        trades = Trade.query.filter_by(challenge_id=challenge_id).all()
+        blocked = sum(t.entry_price * t.qty for t in trades if t.status == "OPEN")
+        realized = sum(t.pnl for t in trades if t.status == "CLOSED")
+        expected = ch.starting_balance - blocked + realized
+        rebuilt = ledger.equity_at(challenge_id)["equity"]
+
+    print("=" * 70)
+    print(f"STRESS EQUITY: {workers} processus x {orders} threads x {rounds} ordres ({elapsed:.1f} s)")
+    print("=" * 70)
+    print(f"Trades ouverts: {totals['opened']} (en base: {len(trades)})  clôturés: {totals['closed']}  "
+          f"erreurs: {totals['errors']}")
+    print(f"Clôtures doubles: {totals['double_closes']}")
+    print(f"Equity en base: {ch.equity:.6f}  attendue: {expected:.6f}  journal: {rebuilt:.6f}  statut: {ch.status}")
+    ok = abs(ch.equity - expected) < 1e-6 and abs(ch.equity - rebuilt) < 1e-6 \
+        and totals["double_closes"] == 0 and len(trades) == totals["opened"]
+    print("✅ Equity cohérente" if ok else "❌ Equity incohérente")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 Script pour modifier les données dans la base de données
 """
 from app import create_app
-from models import db, User, Plan, UserChallenge, Trade
+from models import db, User, Plan, UserChallenge, Trade, RestingOrder, EquityEvent, EquitySnapshot
 
 def update_user_name(email, first_name, last_name):
     """Mettre à jour le nom d'un utilisateur"""
@@ -35,11 +35,12 @@ def delete_user(email):
     with app.app_context():
         user = User.query.filter_by(email=email).first()
         if user:
-            # Supprimer d'abord les challenges et trades associés
-            challenges = UserChallenge.query.filter_by(user_id=user.id).all()
-            for ch in challenges:
-                Trade.query.filter_by(challenge_id=ch.id).delete()
-                db.session.delete(ch)
+            # Supprimer d'abord les lignes filles: ordres en attente, journal
+            # d'equity, trades, puis les challenges
+            challenge_ids = [ch.id for ch in UserChallenge.query.filter_by(user_id=user.id)]
+            for model in (RestingOrder, EquitySnapshot, EquityEvent, Trade):
+                model.query.filter(model.challenge_id.in_(challenge_ids)).delete(synchronize_session=False)
+            UserChallenge.query.filter_by(user_id=user.id).delete(synchronize_session=False)
             
             db.session.delete(user)
             db.session.commit()
@@ -159,16 +159,42 @@ export async function fetchLeaderboard() {
 }
 
 // Signals API
+export type SignalStrategy = 'sma' | 'ema' | 'rsi' | 'macd' | 'bollinger';
+
 export interface Signal {
   symbol: string;
+  strategy: SignalStrategy;
   signal: string;
-  fast_sma: number;
-  slow_sma: number;
   last_price: number;
+  bar_time: number;
+  atr: number | null;
+  suggested_stop_loss: number;
+  suggested_take_profit: number;
+  fast_sma?: number;
+  slow_sma?: number;
+  fast_ema?: number;
+  slow_ema?: number;
+  rsi?: number;
+  macd?: number;
+  macd_signal?: number;
+  macd_hist?: number;
+  bb_mid?: number;
+  bb_upper?: number;
+  bb_lower?: number;
+}
+
+export async function fetchSignals(symbol: string, fast = 5, slow = 20, strategy: SignalStrategy = 'sma') {
+  return apiGet<Signal>(`/api/signals?symbol=${symbol}&fast=${fast}&slow=${slow}&strategy=${strategy}`);
+}
+
+export interface SignalsBatch {
+  strategy: SignalStrategy;
+  signals: Record<string, Signal>;
+  errors: Record<string, string>;
 }
 
-export async function fetchSignals(symbol: string, fast = 5, slow = 20) {
-  return apiGet<Signal>(`/api/signals?symbol=${symbol}&fast=${fast}&slow=${slow}`);
+export async function fetchSignalsBatch(symbols: string[], strategy: SignalStrategy = 'sma', fast = 5, slow = 20) {
+  return apiPost<SignalsBatch>("/api/signals/batch", { symbols, strategy, fast, slow });
 }
 
 // Challenges API
@@ -227,21 +253,119 @@ export interface Trade {
   closed_at: string | null;
 }
 
-export async function fetchTrades(challengeId?: number) {
-  const url = challengeId ? `/api/trades?challenge_id=${challengeId}` : "/api/trades";
-  return apiGet<Trade[]>(url);
+export interface Position {
+  trade_id: number;
+  symbol: string;
+  market: string;
+  side: string;
+  qty: number;
+  entry_price: number;
+  current_price: number | null;
+  unrealized_pnl: number | null;
+  market_value: number;
+  age: number | null;
+  stale: boolean;
+  error: string | null;
+  opened_at: string | null;
+}
+
+export interface Positions {
+  challenge_id: number;
+  status: string;
+  cash: number;
+  equity: number;
+  unrealized_pnl: number;
+  complete: boolean;
+  positions: Position[];
+}
+
+export async function fetchPositions(challengeId: number) {
+  return apiGet<Positions>(`/api/positions?challenge_id=${challengeId}`);
 }
 
-export async function openTrade(challengeId: number, symbol: string, side: string, qty: number, market = "YAHOO") {
-  return apiPost<{ trade_id: number; entry_price: number }>("/api/trades/open", {
+export interface TradeFilters {
+  status?: "OPEN" | "CLOSED";
+  symbol?: string;
+  from?: string;
+  to?: string;
+}
+
+export interface TradePage {
+  trades: Trade[];
+  next_cursor: string | null;
+}
+
+function tradesQuery(challengeId?: number, filters: TradeFilters = {}, extra: Record<string, string> = {}) {
+  const params = new URLSearchParams(extra);
+  if (challengeId) params.set("challenge_id", String(challengeId));
+  for (const [key, value] of Object.entries(filters)) {
+    if (value) params.set(key, value);
+  }
+  return `/api/trades?${params.toString()}`;
+}
+
+// Une page de l'historique (du plus récent au plus ancien); passer next_cursor pour la suivante
+export async function fetchTradesPage(challengeId?: number, filters: TradeFilters = {}, cursor?: string, limit = 100) {
+  return apiGet<TradePage>(tradesQuery(challengeId, filters, { limit: String(limit), ...(cursor ? { cursor } : {}) }));
+}
+
+// Tous les trades correspondant aux filtres, page par page
+export async function fetchTrades(challengeId?: number, filters: TradeFilters = {}) {
+  const trades: Trade[] = [];
+  let cursor: string | undefined;
+  do {
+    const page = await fetchTradesPage(challengeId, filters, cursor, 1000);
+    trades.push(...page.trades);
+    cursor = page.next_cursor ?? undefined;
+  } while (cursor);
+  return trades;
+}
+
+// Export NDJSON (un trade JSON par ligne) de tous les trades filtrés
+export async function exportTrades(challengeId?: number, filters: TradeFilters = {}) {
+  const path = tradesQuery(challengeId, filters, { format: "ndjson" });
+  const token = getToken();
+  const res = await fetch(API_BASE ? `${API_BASE}${path}` : path, {
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+    credentials: "same-origin",
+  });
+  if (!res.ok) throw { status: res.status, data: await res.json().catch(() => null) } as ApiError;
+  return res.blob();
+}
+
+export async function openTrade(
+  challengeId: number,
+  symbol: string,
+  side: string,
+  qty: number,
+  market = "YAHOO",
+  stops: { stop_loss?: number; take_profit?: number } = {}
+) {
+  return apiPost<{ trade_id: number; entry_price: number; orders: RestingOrder[] }>("/api/trades/open", {
     challenge_id: challengeId,
     symbol,
     side,
     qty,
     market,
+    ...stops,
   });
 }
 
+export interface BatchOrder {
+  symbol: string;
+  side: string;
+  qty: number;
+  market?: string;
+}
+
+export async function openTrades(challengeId: number, orders: BatchOrder[]) {
+  return apiPost<{
+    trades: { trade_id: number; symbol: string; market: string; side: string; qty: number; entry_price: number }[];
+    total_cost: number;
+    remaining_equity: number;
+  }>("/api/trades/batch", { challenge_id: challengeId, orders });
+}
+
 export async function closeTrade(tradeId: number) {
   return apiPost<{ trade_id: number; exit_price: number; pnl: number; equity: number; challenge_status: string }>(
     "/api/trades/close",
@@ -249,6 +373,47 @@ export async function closeTrade(tradeId: number) {
   );
 }
 
+// Ordres en attente (SL/TP/limite) exécutés côté serveur
+export type OrderKind = "STOP_LOSS" | "TAKE_PROFIT" | "LIMIT";
+
+export interface RestingOrder {
+  id: number;
+  challenge_id: number;
+  trade_id: number | null;
+  kind: OrderKind;
+  symbol: string;
+  market: string;
+  side: string;
+  qty: number;
+  trigger_price: number;
+  status: "PENDING" | "FILLED" | "CANCELLED" | "REJECTED";
+  fill_price: number | null;
+  result_trade_id: number | null;
+  created_at: string | null;
+  filled_at: string | null;
+}
+
+export async function setTradeStop(tradeId: number, kind: "STOP_LOSS" | "TAKE_PROFIT", triggerPrice: number) {
+  return apiPost<RestingOrder>("/api/orders", { kind, trade_id: tradeId, trigger_price: triggerPrice });
+}
+
+export async function placeLimitOrder(challengeId: number, order: BatchOrder, triggerPrice: number) {
+  return apiPost<RestingOrder>("/api/orders", {
+    kind: "LIMIT",
+    challenge_id: challengeId,
+    ...order,
+    trigger_price: triggerPrice,
+  });
+}
+
+export async function fetchOrders(challengeId: number, status?: RestingOrder["status"]) {
+  return apiGet<RestingOrder[]>(`/api/orders?challenge_id=${challengeId}${status ? `&status=${status}` : ""}`);
+}
+
+export async function cancelOrder(orderId: number) {
+  return apiPost<{ order_id: number; status: string }>("/api/orders/cancel", { order_id: orderId });
+}
+
 // Prices API
 export interface PricePoint {
   time: number;
@@ -286,6 +451,39 @@ export async function fetchCurrentPrice(ticker: string) {
   }
 }
 
+export interface BatchQuote {
+  price?: number;
+  age?: number;
+  error?: string;
+}
+
+export async function fetchYahooPrices(tickers: string[]) {
+  return apiGet<{ quotes: Record<string, BatchQuote> }>(`/api/prices/yahoo/batch?tickers=${tickers.join(",")}`);
+}
+
+// Flux SSE des cotations (remplace le polling des prix)
+export interface QuoteEvent {
+  symbol: string;
+  market: string;
+  time: number;
+  price?: number;
+  age?: number;
+  error?: string;
+}
+
+export function subscribeQuotes(symbols: string[], onQuote: (quote: QuoteEvent) => void) {
+  const path = `/api/prices/stream?symbols=${symbols.join(",")}`;
+  const source = new EventSource(API_BASE ? `${API_BASE}${path}` : path);
+  source.onmessage = (e) => {
+    try {
+      onQuote(JSON.parse(e.data) as QuoteEvent);
+    } catch (err) {
+      console.warn("Invalid quote event", err);
+    }
+  };
+  return () => source.close();
+}
+
 // User Profile API
 export interface UserProfile {
   id: number;
@@ -17,8 +17,10 @@ import {
   fetchUserChallenges,
   fetchTrades,
   fetchPriceHistory,
-  fetchSignals,
+  fetchSignalsBatch,
   fetchCurrentPrice,
+  fetchPositions,
+  subscribeQuotes,
   fetchUserProfile,
   openTrade,
   closeTrade,
@@ -139,15 +141,35 @@ const Dashboard = () => {
       loadCurrentPrice(selectedSymbol);
 
       // Rafraîchir automatiquement le chart toutes les 10 secondes
+      // (les prix arrivent en continu via le flux SSE ci-dessous)
       const interval = setInterval(() => {
         loadChartData(selectedSymbol);
-        loadCurrentPrice(selectedSymbol);
         loadSignals(selectedSymbol);
-        loadPositionPrices(trades);
       }, 10000);
 
       return () => clearInterval(interval);
     }
+  }, [selectedSymbol]);
+
+  useEffect(() => {
+    const positionSymbols = trades.filter(t => t.status === 'OPEN').map(t => t.symbol);
+    const symbols = [...new Set([selectedSymbol, ...positionSymbols].map(s => s.toUpperCase()))];
+
+    const unsubscribe = subscribeQuotes(symbols, (quote) => {
+      if (quote.price === undefined) return;
+      if (quote.symbol === selectedSymbol.toUpperCase()) {
+        setCurrentPrice(quote.price);
+      }
+      setSymbolPrices(prev => {
+        const updated = { ...prev };
+        positionSymbols
+          .filter(s => s.toUpperCase() === quote.symbol)
+          .forEach(s => { updated[s] = quote.price as number; });
+        return updated;
+      });
+    });
+
+    return unsubscribe;
   }, [selectedSymbol, trades]);
 
   const loadDashboardData = async () => {
@@ -165,11 +187,12 @@ const Dashboard = () => {
 
       // Load trades for active challenge
       if (activeChallenge) {
-        const tradesData = await fetchTrades(activeChallenge.id);
+        // seules les positions ouvertes sont affichées: l'historique complet n'est pas chargé
+        const tradesData = await fetchTrades(activeChallenge.id, { status: 'OPEN' });
         setTrades(tradesData);
 
         // Charger les prix pour toutes les positions ouvertes
-        await loadPositionPrices(tradesData);
+        await loadPositionPrices(activeChallenge.id);
       }
 
       // Load ticker prices
@@ -204,23 +227,23 @@ const Dashboard = () => {
     setTickers(updatedTickers);
   };
 
-  const loadPositionPrices = async (tradesData: ApiTrade[]) => {
-    const openTrades = tradesData.filter(t => t.status === 'OPEN');
-    const uniqueSymbols = [...new Set(openTrades.map(t => t.symbol))];
-
-    const prices: Record<string, number> = {};
-    await Promise.all(
-      uniqueSymbols.map(async (symbol) => {
-        try {
-          const data = await fetchCurrentPrice(symbol);
-          prices[symbol] = data.price;
-        } catch (error) {
-          console.error(`Erreur chargement prix pour ${symbol}:`, error);
+  const loadPositionPrices = async (challengeId?: number) => {
+    if (!challengeId) return;
+    try {
+      // Toutes les positions ouvertes valorisées côté serveur en une seule requête
+      const { positions } = await fetchPositions(challengeId);
+      const prices: Record<string, number> = {};
+      positions.forEach((position) => {
+        if (position.current_price !== null) {
+          prices[position.symbol] = position.current_price;
+        } else {
+          console.error(`Erreur chargement prix pour ${position.symbol}:`, position.error);
         }
-      })
-    );
-
-    setSymbolPrices(prices);
+      });
+      setSymbolPrices(prices);
+    } catch (error) {
+      console.error('Erreur chargement positions:', error);
+    }
   };
 
   const loadChartData = async (symbol: string) => {
@@ -285,11 +308,13 @@ const Dashboard = () => {
 
   const loadSignals = async (symbol: string) => {
     try {
+      const cards: Signal[] = [];
+
       // Vérifier si c'est un symbole BVC (pas de signaux IA disponibles)
       if (BVC_SYMBOLS.includes(symbol.toUpperCase())) {
         console.log(`Symbole BVC ${symbol}: signaux IA non disponibles`);
         const currentData = await fetchCurrentPrice(symbol);
-        const signal: Signal = {
+        cards.push({
           id: Date.now(),
           symbol: symbol,
           type: 'hold',
@@ -297,22 +322,30 @@ const Dashboard = () => {
           price: currentData.price,
           reasoning: 'Analyse IA non disponible pour les actions BVC',
           timestamp: new Date().toISOString(),
-        };
-        setSignals([signal]);
-        return;
+        });
       }
 
-      const data = await fetchSignals(symbol);
-      const signal: Signal = {
-        id: Date.now(),
-        symbol: data.symbol,
-        type: data.signal === 'BUY' ? 'buy' : data.signal === 'SELL' ? 'sell' : 'hold',
-        confidence: 75,
-        price: data.last_price,
-        reasoning: `SMA ${data.fast_sma.toFixed(2)} vs ${data.slow_sma.toFixed(2)}`,
-        timestamp: new Date().toISOString(),
-      };
-      setSignals([signal]);
+      // Symbole sélectionné puis le reste de la watchlist, en une seule requête
+      const watchlist = [symbol, ...tickers.map(t => t.symbol)]
+        .map(s => s.toUpperCase())
+        .filter((s, i, arr) => !BVC_SYMBOLS.includes(s) && arr.indexOf(s) === i);
+      if (watchlist.length > 0) {
+        const { signals: results } = await fetchSignalsBatch(watchlist);
+        watchlist.forEach((s, i) => {
+          const data = results[s];
+          if (!data) return;
+          cards.push({
+            id: Date.now() + i,
+            symbol: data.symbol,
+            type: data.signal === 'BUY' ? 'buy' : data.signal === 'SELL' ? 'sell' : 'hold',
+            confidence: 75,
+            price: data.last_price,
+            reasoning: `SMA ${data.fast_sma!.toFixed(2)} vs ${data.slow_sma!.toFixed(2)}`,
+            timestamp: new Date().toISOString(),
+          });
+        });
+      }
+      setSignals(cards);
     } catch (error) {
       console.error('Erreur chargement signaux:', error);
       setSignals([]);
@@ -334,7 +367,7 @@ const Dashboard = () => {
       loadDashboardData(),
       loadChartData(selectedSymbol),
       loadSignals(selectedSymbol),
-      loadPositionPrices(trades),
+      loadPositionPrices(currentChallenge?.id),
     ]).finally(() => {
       setTimeout(() => setIsRefreshing(false), 1000);
     });
@@ -348,7 +381,8 @@ const Dashboard = () => {
 
     try {
       const side = action.toUpperCase();
-      const result = await openTrade(currentChallenge.id, selectedSymbol, side, quantity);
+      const market = BVC_SYMBOLS.includes(selectedSymbol.toUpperCase()) ? 'BVC' : 'YAHOO';
+      const result = await openTrade(currentChallenge.id, selectedSymbol, side, quantity, market);
 
       toast.success(`Trade ${action === 'buy' ? 'achat' : 'vente'} exécuté avec succès!`);
       console.log('Trade créé:', result.trade_id, 'Prix:', result.entry_price);